@@ -1,8 +1,13 @@
 import paramiko
-import time
-import re
-from typing import List, Dict, Optional, Tuple
+import sys
+from typing import List, Dict, Optional, Tuple, Union
 import pwinput  # 需要先 pip install pwinput
+from prompt_expect import GENERIC_PROMPT, INTERACTIVE_PROMPT, channel_reader, expect, learn_prompt, prompt_pattern
+from fingerprint import FingerprintCache, plausible_prompt, ssh_remote_version, vendor_from_ssh_version
+from device_classifier import detect_device_type
+from inspection_store import InspectionStore
+from output_parsers import parse_results
+import output_cleaner
 
 """
 程序版本说明（最新版）：
@@ -10,82 +15,47 @@ import pwinput  # 需要先 pip install pwinput
 - 从 ip_list.txt 读取 IP 列表（每行一个 IP，支持 # 注释）
 - 自动检测设备类型（基于登录 banner / 初始输出）
 - 支持权限提升（enable / super）
-- 命令列表根据设备类型自动适配（show / display）
+- 命令列表根据设备类型自动适配（show / display），在同一次登录内完成检测 + 执行
 - 输出每条命令的发送提示 + 清理后结果，带 [IP] 前缀
 - 改进清理逻辑：更宽松，避免误删有效内容
 - 去除 ANSI 颜色码，输出更干净
 - 错误处理更健壮，一台设备失败不影响其他
+- 设备指纹：握手时的 SSH 版本串或 fingerprints.json 缓存能确定类型时，提示符一出现就开始执行，
+  不再固定等待 4.5 秒收集 banner；识别结果写回缓存，下次运行直接命中
+- 关分页、提权和每条命令都等登录时学到的提示符（或 Password: 等提问）出现就继续，不再固定 sleep；
+  超时或连接断开算失败，半截输出不入库
+- 巡检结果写入 inspections.db（inspection_store.py），按设备 / 类型 / 命令 / 时间查询，保留 30 天
+- version / ip interface brief 的输出按模板解析成结构化记录（output_parsers.py），和原文一起入库
+- 加 --async 参数时改用 asyncio 引擎（async_ssh_engine.py，需要 asyncssh）同时巡检所有设备，
+  不用指纹缓存，结果同样入库：python 2026-2-3-paramiko-ssh-v3.0.py --async
 """
 
-def detect_device_type(initial_output: str) -> str:
-    """根据初始 banner 判断设备类型"""
-    lower_text = initial_output.lower()
-    if any(word in lower_text for word in ['huawei', 'vrp', 'ne', 's series', '<huawei>', '[quidway]', 'sysname']):
-        return 'huawei'
-    if any(word in lower_text for word in ['cisco', 'ios', 'xe', 'catalyst', 'nexus']):
-        return 'cisco'
-    print("警告：无法自动识别设备类型，默认使用 Cisco 配置")
-    return 'cisco'
-
 
 def clean_output(raw_output: str, sent_command: str) -> str:
-    """
-    改进版输出清理函数：
-    - 更宽松匹配回显，避免误删有效内容
-    - 去除 ANSI 颜色码（Cisco 新版常带）
-    - 去除多余空行和纯提示符行
-    """
-    # 先去除 ANSI 颜色码
-    raw_output = re.sub(r'\x1B\[[0-9;]*[mK]', '', raw_output)
-
-    lines = raw_output.splitlines()
-    cleaned = []
-    skip_next = False
-
-    for line in lines:
-        stripped = line.rstrip()
-
-        # 跳过空行
-        if not stripped:
-            continue
-
-        # 跳过命令回显（包含命令本身或提示符+命令）
-        if sent_command in stripped or stripped.endswith(sent_command) or stripped.startswith(sent_command):
-            skip_next = True
-            continue
-
-        if skip_next:
-            skip_next = False
-            continue
-
-        # 跳过纯提示符行
-        if re.match(r'^[\w\.-]*[>#\[\]<]\s*$', stripped):
-            continue
-
-        cleaned.append(stripped)
-
-    result = "\n".join(cleaned).strip()
-    # 去除连续多个空行
-    result = re.sub(r'\n{3,}', '\n\n', result)
-
-    return result if result else '[无有效输出，可能权限不足或命令无返回]'
+    """去除 ANSI 颜色码、命令回显和纯提示符行，无内容时给出提示"""
+    return output_cleaner.clean_output(raw_output, sent_command, empty='[无有效输出，可能权限不足或命令无返回]')
 
 
 def network_ssh_execute(
         host: str,
         username: str,
         password: str,
-        commands: List[str],
+        commands: Union[List[str], Dict[str, List[str]]],
         port: int = 22,
         timeout_per_cmd: float = 15.0,
         privilege_password: Optional[str] = None,
-        privilege_level: str = "3"
+        privilege_level: str = "3",
+        fingerprints: Optional[FingerprintCache] = None
 ) -> Tuple[str, Dict[str, str]]:
     """
     通用网络设备 SSH 执行器
+    commands 可以是命令列表，也可以是 {设备类型: 命令列表}，
+    后者在检测出设备类型后于同一会话内选择命令，无需为检测类型单独登录一次
+    fingerprints: 设备指纹缓存，命中时跳过 banner 收集
     返回 (device_type, {命令: 清理后输出})
     """
     outputs = {}
+    device_type = "unknown"
     ssh = paramiko.SSHClient()
     ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # 生产环境建议改 RejectPolicy
 
@@ -100,47 +70,68 @@ def network_ssh_execute(
             timeout=20
         )
 
-        chan = ssh.invoke_shell(width=200, height=500)
-        chan.settimeout(2.0)
-
-        # 收集初始输出用于类型检测
-        time.sleep(1.5)
-        initial_output = ""
-        start = time.time()
-        while time.time() - start < 3.0:
-            if chan.recv_ready():
-                chunk = chan.recv(8192).decode('utf-8', errors='replace')
-                initial_output += chunk
-            time.sleep(0.1)
+        ssh_version = ssh_remote_version(ssh)
+        if fingerprints:
+            hint = fingerprints.identify(host, ssh_version)
+        else:
+            vendor = vendor_from_ssh_version(ssh_version)
+            hint = {'vendor': vendor, 'source': 'ssh-version', 'prompt': ""} if vendor else None
 
-        device_type = detect_device_type(initial_output)
-        print(f"[{host}] 自动检测设备类型：{device_type.upper()}")
+        chan = ssh.invoke_shell(width=200, height=500)
+        read = channel_reader(chan)
+
+        # 等到第一个提示符（类型检测用的 banner 就在这段输出里），同时学习真实提示符（如 SW1# / <HUAWEI>）
+        idx, initial_output = expect(read, chan, [GENERIC_PROMPT], 10.0)
+        if idx == -1:
+            raise ConnectionError("登录后 10 秒内未出现提示符")
+        prompt = learn_prompt(initial_output)
+        source = 'banner'
+        hinted = hint and hint['vendor'] in ('cisco', 'huawei')
+        if hinted and plausible_prompt(hint['vendor'], prompt):
+            device_type, source = hint['vendor'], hint['source']
+        else:
+            if hinted and fingerprints and hint['source'] == 'cache':
+                fingerprints.forget(host)  # 缓存过时（设备被替换等）
+            device_type = detect_device_type(initial_output)
+
+        print(f"[{host}] 自动检测设备类型：{device_type.upper()}（{source}）")
+        if fingerprints:
+            fingerprints.put(host, device_type, source, ssh_version, prompt or "")
 
         # 根据类型设置环境参数
         if device_type == 'cisco':
-            paging_cmd = "terminal length 0\n"
-            privilege_cmd = "enable\n"
-            prompt_pattern = r'[>#]\s*$'
-            clean_prompt_pattern = r'^[\w\.-]+[>#]\s*$'
+            paging_cmd = "terminal length 0"
+            privilege_cmd = "enable"
         else:  # huawei
-            paging_cmd = "screen-length 0 temporary\n"
-            privilege_cmd = f"super {privilege_level}\n"
-            prompt_pattern = r'[\<\[][\w\.-]+[\>\]]\s*$'
-            clean_prompt_pattern = r'^[\<\[][\w\.-]+[\>\]]\s*$'
+            paging_cmd = "screen-length 0 temporary"
+            privilege_cmd = f"super {privilege_level}"
+        wait_for = [prompt_pattern(prompt), INTERACTIVE_PROMPT]
+
+        def run(cmd: str) -> Tuple[int, str]:
+            """发送一条命令，等到提示符或设备提问（Password: 等）；没等到就是失败"""
+            chan.send(cmd + "\n")
+            idx, output = expect(read, chan, wait_for, timeout_per_cmd)
+            if idx == -1:
+                if chan.closed or chan.eof_received:
+                    raise ConnectionError(f"等待 {cmd} 的提示符时连接断开")
+                raise TimeoutError(f"等待提示符超时: {cmd}")
+            return idx, output
 
         # 关闭分页
-        chan.send(paging_cmd)
-        time.sleep(0.5)
-        _ = chan.recv(4096)
+        run(paging_cmd)
 
         # 权限提升
         if privilege_password:
             print(f"[{host}] 正在提升权限...")
-            chan.send(privilege_cmd)
-            time.sleep(0.4)
-            chan.send(privilege_password + "\n")
-            time.sleep(0.8)
-            _ = chan.recv(8192)
+            if run(privilege_cmd)[0] == 1:  # Password:
+                run(privilege_password)
+
+        # 按设备类型选择命令集
+        if isinstance(commands, dict):
+            commands = commands.get(device_type, commands.get('cisco', []))
+            print(f"[{host}] 将执行 {len(commands)} 条命令：")
+            for cmd in commands:
+                print(f"  - {cmd}")
 
         for cmd in commands:
             cmd = cmd.strip()
@@ -148,21 +139,8 @@ def network_ssh_execute(
                 continue
 
             print(f"[{host}] 发送: {cmd}")
-            chan.send(cmd + "\n")
-
-            output = ""
-            start_time = time.time()
-
-            while time.time() - start_time < timeout_per_cmd:
-                if chan.recv_ready():
-                    chunk = chan.recv(8192).decode('utf-8', errors='replace')
-                    output += chunk
-
-                if re.search(prompt_pattern, output, re.MULTILINE | re.DOTALL):
-                    break
-
-                time.sleep(0.08)
-
+            # 提示符一出现就返回，timeout_per_cmd 只是兜底；大配置也只在末尾窗口里找提示符
+            _, output = run(cmd)
             cleaned = clean_output(output, cmd)
             outputs[cmd] = cleaned
 
@@ -183,6 +161,9 @@ def network_ssh_execute(
 # ─── 主程序 ────────────────────────────────────────────────
 if __name__ == '__main__':
     PORT = 22
+    INSPECTION_DB = "inspections.db"
+    USE_ASYNC = '--async' in sys.argv[1:]
+    ASYNC_MAX_SESSIONS = 500   # --async 时同时在线的会话数上限
 
     # 从文件读取 IP 列表
     ip_list_file = "ip_list.txt"
@@ -217,58 +198,62 @@ if __name__ == '__main__':
     print("\n" + "="*60)
     print("开始批量执行...\n")
 
-    for host in ip_list:
-        print(f"\n{'='*30} 处理设备：{host} {'='*30}\n")
-
-        # 定义命令集（可扩展）
-        command_sets = {
-            'cisco': [
-                "show version",
-                "show ip interface brief",
-                "show running-config | include hostname",
-            ],
-            'huawei': [
-                "display version",
-                "display ip interface brief",
-                "display current-configuration | include sysname",
-            ]
-        }
-
-        # 先获取类型
-        try:
-            device_type, _ = network_ssh_execute(
-                host=host,
-                username=username,
-                password=password,
-                commands=[],  # 只检测类型
-                port=PORT,
-                privilege_password=privilege_password,
-                privilege_level=privilege_level
-            )
-        except Exception as e:
-            print(f"[{host}] 检测类型失败，跳过: {e}")
-            continue
-
-        # 选择对应命令
-        commands = command_sets.get(device_type, command_sets['cisco'])
-
-        print(f"[{host}] 将执行 {len(commands)} 条命令：")
-        for cmd in commands:
-            print(f"  - {cmd}")
-
-        # 执行命令
-        try:
-            _, result = network_ssh_execute(
-                host=host,
-                username=username,
-                password=password,
-                commands=commands,
-                port=PORT,
-                privilege_password=privilege_password,
-                privilege_level=privilege_level
-            )
-        except Exception as e:
-            print(f"[{host}] 执行失败: {e}")
-
+    fingerprints = FingerprintCache()
+    store = InspectionStore(INSPECTION_DB)
+    run_id = store.begin_run()
+
+    # 定义命令集（可扩展），登录后按检测到的设备类型选择
+    command_sets = {
+        'cisco': [
+            "show version",
+            "show ip interface brief",
+            "show running-config | include hostname",
+        ],
+        'huawei': [
+            "display version",
+            "display ip interface brief",
+            "display current-configuration | include sysname",
+        ]
+    }
+
+    if USE_ASYNC:
+        import asyncio
+        from async_ssh_engine import run_fleet_async
+
+        # 所有设备并发巡检，跑完后按设备打印并入库（失败的设备为 ("unknown", {})，计入失败数）
+        fleet = asyncio.run(run_fleet_async(ip_list, username, password, command_sets,
+                                            max_sessions=ASYNC_MAX_SESSIONS, port=PORT,
+                                            privilege_password=privilege_password, privilege_level=privilege_level))
+        for host, (device_type, result) in fleet.items():
+            print(f"\n{'='*30} 设备：{host}（{device_type.upper()}）{'='*30}\n")
+            for cmd, cleaned in result.items():
+                print(f"[{host}] 结果 ({cmd}):")
+                print(cleaned)
+                print("─" * 80)
+            store.add(run_id, host, device_type, result, parsed=parse_results(device_type, result))
+    else:
+        for host in ip_list:
+            print(f"\n{'='*30} 处理设备：{host} {'='*30}\n")
+
+            # 一次登录：检测类型 + 执行对应命令
+            try:
+                device_type, result = network_ssh_execute(
+                    host=host,
+                    username=username,
+                    password=password,
+                    commands=command_sets,
+                    port=PORT,
+                    privilege_password=privilege_password,
+                    privilege_level=privilege_level,
+                    fingerprints=fingerprints
+                )
+                store.add(run_id, host, device_type, result, parsed=parse_results(device_type, result))
+            except Exception as e:
+                print(f"[{host}] 执行失败: {e}")
+                store.add(run_id, host, "unknown", {})
+            fingerprints.save()
+
+    store.finish_run(run_id)
+    store.close()
     print("\n" + "="*60)
-    print("批量执行完毕。")
\ No newline at end of file
+    print(f"批量执行完毕，结果已写入 {INSPECTION_DB}（第 {run_id} 次运行）。")
\ No newline at end of file
@@ -1,4 +1,7 @@
-from ping3 import ping
+from icmp_sweeper import IcmpSweeper
+from reach_monitor import ReachabilityMonitor
+from sweep_targets import TargetSet, int_to_ip
+import sys
 import time
 import os  # 添加 os 以检查文件路径
 
@@ -7,52 +10,97 @@ V1.0版本：
 搜索指定网段中的存活设备（ping3库），原理是发送 ICMP ping 请求并获取响应时间：
 1.每个 IP 尝试 3 次 ping（间隔 0.3 秒），只要有一次成功就视为在线（取平均延迟）
 2.排序结果：按 IP 数字顺序排序，便于查看
+V1.1：
+3.改用 icmp_sweeper 并发扫描：一个 ICMP socket 同时发出所有探测，按 (IP, 序号) 匹配回包，
+  每秒发包数可限制（PPS），/24 几秒扫完；无 raw socket 权限时自动退回 ping3 + 线程池
+4.目标可以是任意多个网段 / 地址段，并可排除部分地址；结果存位图 + 数组，天然按 IP 顺序，无需再排序
+  用法：python 2026-2-6-aliveswitch-v1.0.py 10.0.0.0/16 192.168.1.10-200 -x 10.0.5.0/24
+  不带参数时扫描 TARGETS
+5.监控模式：--monitor [间隔秒数]，持续扫描，打印 UP / DOWN 事件并写入 EVENT_FILE，
+  每台设备保留最近 MONITOR_HISTORY 轮的延迟（环形缓冲），Ctrl+C 结束时打印丢包 / 延迟最差的设备
+  用法：python 2026-2-6-aliveswitch-v1.0.py 10.0.0.0/16 --monitor 30
 """
 
-network = "192.168.93"  # 根据你的网段调整
+TARGETS = ["192.168.93.0/24"]  # 根据你的网段调整，可写多个
+EXCLUDE = []                   # 不扫描的地址 / 网段
 output_file = "alive.txt"
+PPS = 2000                     # 每秒最多发出的探测包数
+VERBOSE_LIMIT = 4096           # 目标数超过此值时不逐条打印回包
+MONITOR_HISTORY = 120          # 监控模式下每台设备保留的轮数
+MONITOR_DOWN_AFTER = 3         # 连续几轮不通判定为 DOWN
+EVENT_FILE = "reach_events.log"
+
+cli_targets, cli_exclude, monitor_interval = [], [], None
+args = iter(sys.argv[1:])
+for arg in args:
+    if arg == '-x':
+        cli_exclude.append(next(args, ''))
+    elif arg == '--monitor':
+        monitor_interval = 30.0
+        value = next(args, None)
+        if value is not None:
+            try:
+                monitor_interval = float(value)
+            except ValueError:
+                cli_targets.append(value)
+    else:
+        cli_targets.append(arg)
+TARGETS = cli_targets or TARGETS
+EXCLUDE = EXCLUDE + cli_exclude
+
+targets = TargetSet(TARGETS, EXCLUDE)
+
+
+def show_event(ip, event, ts):
+    line = f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}\t{ip}\t{event}"
+    print(line)
+    with open(EVENT_FILE, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
 
-alive = []
 
-print("扫描开始...\n")
+if monitor_interval is not None:
+    monitor = ReachabilityMonitor(targets, interval=monitor_interval, history=MONITOR_HISTORY,
+                                  down_after=MONITOR_DOWN_AFTER,
+                                  sweeper=IcmpSweeper(timeout=2, attempts=1, pps=PPS),
+                                  on_event=show_event)
+    def show_round(monitor, elapsed):
+        up, down = monitor.counts()
+        print(f"[{time.strftime('%H:%M:%S')}] 第 {monitor.rounds} 轮：在线 {up}，离线 {down}，用时 {elapsed:.2f} 秒")
+
+    print(f"监控开始：{len(targets)} 个地址，每 {monitor_interval:g} 秒一轮，Ctrl+C 结束\n")
+    try:
+        monitor.run(on_round=show_round)
+    except KeyboardInterrupt:
+        print("\n丢包 / 延迟最差的设备：")
+        for st in monitor.worst(10):
+            p50, p95 = st['p50'] or 0.0, st['p95'] or 0.0
+            print(f"  {st['ip']:15} {st['state']:5} 丢包 {st['loss']:.0%}  p50 {p50:.1f}ms  p95 {p95:.1f}ms")
+    sys.exit(0)
+
+print(f"扫描开始...目标 {len(targets)} 个地址\n")
 
 start = time.time()
 
-for i in range(1, 255):
-    ip = f"{network}.{i}"
-
-    # 尝试 3 次 ping，容忍偶尔丢包
-    success_attempts = 0
-    delays = []  # 收集成功延迟
-    for attempt in range(1, 4):  # 最多尝试 3 次
-        delay = ping(ip, timeout=2, unit='s')  # 超时加大到 2 秒
-        if delay is not None:
-            success_attempts += 1
-            ms = round(delay * 1000, 1)
-            delays.append(ms)
-            print(f"在线 → {ip:15} {ms:5.1f}ms (第 {attempt} 次尝试)")
-        time.sleep(0.3)  # 每次尝试间稍等，避免过度负载
-
-    if success_attempts > 0:
-        # 取平均延迟（或最小值，根据需要）
-        avg_ms = sum(delays) / len(delays) if delays else 0
-        alive.append((ip, round(avg_ms, 1)))
-    else:
-        # 可选：打印不通的 IP（调试用）
-        # print(f"  ×  {ip}")
-        pass
 
-# 按 IP 排序
-alive.sort(key=lambda x: tuple(map(int, x[0].split('.'))))
+def show_reply(ip, attempt, ms):
+    print(f"在线 → {ip:15} {ms:5.1f}ms (第 {attempt} 次尝试)")
+
+
+# 尝试 3 次 ping，容忍偶尔丢包；超时 2 秒，同一地址两次尝试间隔 0.3 秒
+sweeper = IcmpSweeper(timeout=2, attempts=3, interval=0.3, pps=PPS,
+                      on_reply=show_reply if len(targets) <= VERBOSE_LIMIT else None)
+results = sweeper.sweep_compact(targets)
+alive_count = results.count_alive()
 
 print(f"\n扫描结束，用时 {time.time() - start:.2f} 秒")
-print(f"发现 {len(alive)} 个在线设备\n")
+print(f"发现 {alive_count} 个在线设备\n")
 
-# 写入文件
+# 写入文件（结果已按 IP 顺序，边遍历边写）
 with open(output_file, "w", encoding="utf-8") as f:
     f.write(f"扫描时间：{time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-    f.write(f"在线数量：{len(alive)}\n\n")
-    for ip, ms in alive:
-        f.write(f"{ip}\t{ms:.1f} ms\n")
+    f.write(f"在线数量：{alive_count}\n\n")
+    for ip, ms in results.iter_alive():
+        f.write(f"{int_to_ip(ip)}\t{ms:.1f} ms\n")
 
-print(f"结果已保存至：{os.path.abspath(output_file)}")  # 显示完整路径，便于查找
\ No newline at end of file
+print(f"结果已保存至：{os.path.abspath(output_file)}")  # 显示完整路径，便于查找
+print("下一步：python discovery.py 探测 22/23 端口，生成 ip_list_ssh.txt / ip_list_telnet.txt / inventory.json")
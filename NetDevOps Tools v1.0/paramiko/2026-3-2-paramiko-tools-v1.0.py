@@ -3,6 +3,8 @@ import time
 import re
 from typing import List, Dict, Optional, Tuple
 import pwinput  # 需要先 pip install pwinput
+from device_classifier import detect_device_type
+import output_cleaner
 
 """
 我的网络工具箱 1.0 - 工具1：批量远程保存交换机配置
@@ -18,45 +20,10 @@ import pwinput  # 需要先 pip install pwinput
 - 不下载配置文件到本地，只在设备上执行保存
 """
 
-def detect_device_type(initial_output: str) -> str:
-    """根据初始 banner 判断设备类型"""
-    lower_text = initial_output.lower()
-    if any(word in lower_text for word in ['huawei', 'vrp', 'ne', 's series', '<huawei>', '[quidway]', 'sysname']):
-        return 'huawei'
-    if any(word in lower_text for word in ['cisco', 'ios', 'xe', 'catalyst', 'nexus']):
-        return 'cisco'
-    print("警告：无法自动识别设备类型，默认使用 Cisco 配置")
-    return 'cisco'
-
 
 def clean_output(raw_output: str, sent_command: str) -> str:
     """清理输出，保留关键提示信息（如 [OK]、Building configuration... 等）"""
-    # 去除 ANSI 颜色码
-    raw_output = re.sub(r'\x1B\[[0-9;]*[mK]', '', raw_output)
-
-    lines = raw_output.splitlines()
-    cleaned = []
-    skip_patterns = [
-        sent_command,                   # 命令本身
-        r'^\s*$',                       # 纯空行
-        r'^[\w\.-]*[>#\[\]<]\s*$',      # 纯提示符行
-    ]
-
-    for line in lines:
-        stripped = line.rstrip()
-        if not stripped:
-            continue
-        # 保留包含 OK、Building、Configuration、成功等关键词的行
-        if any(pat in stripped for pat in ['OK', 'Building configuration', 'Configuration', '成功', 'committed', '保存成功']):
-            cleaned.append(stripped)
-            continue
-        # 跳过明显是回显或无关的
-        if any(re.search(p, stripped) for p in skip_patterns):
-            continue
-        cleaned.append(stripped)
-
-    result = "\n".join(cleaned).strip()
-    return result if result else '[无明显反馈，可能已成功保存]'
+    return output_cleaner.clean_output(raw_output, sent_command, empty='[无明显反馈，可能已成功保存]')
 
 
 def network_ssh_execute(
@@ -5,6 +5,9 @@ from typing import List, Dict, Optional, Tuple
 import pwinput  # pip install pwinput
 import sys
 import getpass
+from device_classifier import detect_device_type
+import output_cleaner
+from output_cleaner import SAVE_FEEDBACK_KEYWORDS
 
 """
 我的网络工具箱 1.0
@@ -15,32 +18,10 @@ import getpass
 
 # ─── 通用函数（从之前保留并微调） ────────────────────────────────────────────────
 
-def detect_device_type(initial_output: str) -> str:
-    lower_text = initial_output.lower()
-    if any(word in lower_text for word in ['huawei', 'vrp', 'ne', 's series', '<huawei>', '[quidway]', 'sysname']):
-        return 'huawei'
-    if any(word in lower_text for word in ['cisco', 'ios', 'xe', 'catalyst', 'nexus']):
-        return 'cisco'
-    print("警告：无法识别设备类型，默认当作 Cisco 处理")
-    return 'cisco'
-
-
 def clean_output(raw_output: str, sent_command: str) -> str:
-    raw_output = re.sub(r'\x1B\[[0-9;]*[mK]', '', raw_output)
-    lines = raw_output.splitlines()
-    cleaned = []
-    for line in lines:
-        stripped = line.rstrip()
-        if not stripped:
-            continue
-        if sent_command in stripped or stripped.endswith(sent_command):
-            continue
-        if re.match(r'^[\w\.-]*[>#\[\]<]\s*$', stripped):
-            continue
-        if any(kw in stripped.lower() for kw in ['ok', 'building configuration', 'configuration', '成功', 'committed']):
-            cleaned.append(stripped)
-    result = "\n".join(cleaned).strip()
-    return result if result else '[操作完成，通常无额外提示]'
+    """只保留保存结果相关的反馈行（[OK]、Building configuration、成功 等）"""
+    return output_cleaner.clean_output(raw_output, sent_command, keywords=SAVE_FEEDBACK_KEYWORDS,
+                                       empty='[操作完成，通常无额外提示]')
 
 
 def network_ssh_execute(
@@ -1,10 +1,14 @@
 import paramiko
 import telnetlib
-import time
-import re
 import sys
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 import pwinput
+from prompt_expect import (GENERIC_PROMPT, INTERACTIVE_PROMPT, learn_prompt, prompt_pattern,
+                           channel_reader, telnet_reader, expect)
+from device_session import LOGIN_RETRY_PROMPT
+from device_classifier import detect_device_type
+import output_cleaner
+from output_cleaner import SAVE_FEEDBACK_KEYWORDS
 
 
 """
@@ -15,35 +19,16 @@ import pwinput
 - 当前功能：批量保存交换机配置
 """
 
+SSH_PORT = 22      # 批量保存使用的端口（模拟设备测试时改成本地端口）
+TELNET_PORT = 23
 
-# ─── 通用辅助函数 ────────────────────────────────────────────────
-
-def detect_device_type(initial_output: str) -> str:
-    lower_text = initial_output.lower()
-    if any(word in lower_text for word in ['huawei', 'vrp', 'ne', 's series', '<huawei>', '[quidway]', 'sysname']):
-        return 'huawei'
-    if any(word in lower_text for word in ['cisco', 'ios', 'xe', 'catalyst', 'nexus']):
-        return 'cisco'
-    print("警告：无法识别设备类型，默认当作 Cisco 处理")
-    return 'cisco'
 
+# ─── 通用辅助函数 ────────────────────────────────────────────────
 
 def clean_output(raw_output: str, sent_command: str) -> str:
-    raw_output = re.sub(r'\x1B\[[0-9;]*[mK]', '', raw_output)  # 去除 ANSI 颜色
-    lines = raw_output.splitlines()
-    cleaned = []
-    for line in lines:
-        stripped = line.rstrip()
-        if not stripped:
-            continue
-        if sent_command in stripped or stripped.endswith(sent_command):
-            continue
-        if re.match(r'^[\w\.-]*[>#\[\]<]\s*$', stripped):
-            continue
-        if any(kw in stripped.lower() for kw in ['ok', 'building configuration', 'configuration', '成功', 'committed', 'wrote']):
-            cleaned.append(stripped)
-    result = "\n".join(cleaned).strip()
-    return result if result else '[操作完成，通常无额外提示]'
+    """只保留保存结果相关的反馈行（[OK]、Building configuration、成功 等）"""
+    return output_cleaner.clean_output(raw_output, sent_command, keywords=SAVE_FEEDBACK_KEYWORDS,
+                                       empty='[操作完成，通常无额外提示]')
 
 
 # ─── SSH 处理函数 ────────────────────────────────────────────────
@@ -52,12 +37,16 @@ def network_ssh_execute(
         host: str,
         username: str,
         password: str,
-        commands: List[str],
+        commands: Union[List[str], Dict[str, List[str]]],
         port: int = 22,
         timeout_per_cmd: float = 25.0,
         privilege_password: Optional[str] = None,
         privilege_level: str = "3"
 ) -> Tuple[str, Dict[str, str]]:
+    """
+    commands 为 {设备类型: 命令列表} 时，登录后按检测结果选择命令（同一会话内完成）
+    返回 (device_type, {命令: 清理后输出})，失败时 device_type 为 "unknown"
+    """
     outputs = {}
     ssh = paramiko.SSHClient()
     ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
@@ -75,16 +64,11 @@ def network_ssh_execute(
         )
 
         chan = ssh.invoke_shell(width=200, height=500)
-        chan.settimeout(3.0)
+        read = channel_reader(chan)
 
-        # 读取初始 banner
-        time.sleep(1.5)
-        initial_output = ""
-        start = time.time()
-        while time.time() - start < 5.0:
-            if chan.recv_ready():
-                initial_output += chan.recv(8192).decode('utf-8', errors='replace')
-            time.sleep(0.1)
+        # 读取初始 banner：出现第一个提示符即可，同时学习真实提示符（如 SW1# / <HUAWEI>）
+        _, initial_output = expect(read, chan, [GENERIC_PROMPT], 10.0)
+        prompt_re = prompt_pattern(learn_prompt(initial_output))
 
         device_type = detect_device_type(initial_output)
         print(f"[{host}] 设备类型：{device_type.upper()}")
@@ -93,23 +77,28 @@ def network_ssh_execute(
         if device_type == 'cisco':
             paging_cmd = "terminal length 0\n"
             privilege_cmd = "enable\n"
-            prompt_pattern = r'[>#]\s*$'
         else:
             paging_cmd = "screen-length 0 temporary\n"
             privilege_cmd = f"super {privilege_level}\n"
-            prompt_pattern = r'[\<\[][\w\.-]+[\>\]]\s*$'
+        wait_for = [prompt_re, INTERACTIVE_PROMPT]
 
         chan.send(paging_cmd)
-        time.sleep(0.8)
-        _ = chan.recv(8192)
+        expect(read, chan, wait_for, timeout_per_cmd)
 
         if privilege_password:
             print(f"[{host}] 进入特权模式...")
             chan.send(privilege_cmd)
-            time.sleep(0.6)
-            chan.send(privilege_password + "\n")
-            time.sleep(1.8)
-            _ = chan.recv(8192)
+            idx, _ = expect(read, chan, wait_for, timeout_per_cmd)
+            if idx == 1:  # Password:
+                chan.send(privilege_password + "\n")
+                _, out = expect(read, chan, wait_for, timeout_per_cmd)
+                new_prompt = learn_prompt(out)  # SW1> → SW1#
+                if new_prompt:
+                    wait_for = [prompt_pattern(new_prompt), INTERACTIVE_PROMPT]
+
+        if isinstance(commands, dict):
+            commands = commands.get(device_type, commands.get('cisco', []))
+            print(f"[{host}] 将执行命令：{' '.join(commands)}")
 
         for cmd in commands:
             if not cmd.strip():
@@ -117,19 +106,10 @@ def network_ssh_execute(
             print(f"[{host}] 执行: {cmd}")
             chan.send(cmd + "\n")
 
-            output = ""
-            start_time = time.time()
-            while time.time() - start_time < timeout_per_cmd:
-                if chan.recv_ready():
-                    output += chan.recv(8192).decode('utf-8', errors='replace')
-                if re.search(prompt_pattern, output[-400:], re.DOTALL | re.MULTILINE):
-                    break
-                time.sleep(0.08)
-
-            time.sleep(1.0)
-            while chan.recv_ready():
-                output += chan.recv(8192).decode('utf-8', errors='replace')
-                time.sleep(0.15)
+            # 提示符或 [Y/N] 之类的问题一出现就返回，timeout_per_cmd 只是兜底
+            idx, output = expect(read, chan, wait_for, timeout_per_cmd)
+            if idx == -1:  # 没回到提示符，保存结果未知，算失败
+                raise TimeoutError(f"等待提示符超时: {cmd}")
 
             cleaned = clean_output(output, cmd)
             outputs[cmd] = cleaned
@@ -158,10 +138,11 @@ def network_telnet_execute(
         commands: List[str],
         timeout: int = 25,
         privilege_password: Optional[str] = None,
-        privilege_level: str = "3"
+        privilege_level: str = "3",
+        port: int = 23
 ) -> bool:
     try:
-        tn = telnetlib.Telnet(host, timeout=timeout)
+        tn = telnetlib.Telnet(host, port, timeout=timeout)
 
         # 等待登录提示（根据实际情况可能为 login: 或 Username:）
         tn.read_until(b"Username:", timeout=timeout)
@@ -170,47 +151,39 @@ def network_telnet_execute(
         tn.read_until(b"Password:", timeout=timeout)
         tn.write(password.encode('ascii') + b"\r\n")
 
-        time.sleep(1.2)
-        banner = tn.read_very_eager().decode('ascii', errors='ignore')
+        # 登录后等到第一个提示符即可，同时学习真实提示符；之后每一步都等提示符 / 提问出现，不再固定 sleep
+        read, sock = telnet_reader(tn), tn.get_socket()
+        idx, banner = expect(read, sock, [GENERIC_PROMPT, LOGIN_RETRY_PROMPT], timeout)
+        if idx == 1:
+            raise ConnectionError("认证失败（设备重新要求登录）")
+        if idx == -1:
+            raise ConnectionError("登录后未出现提示符")
+        wait_for = [prompt_pattern(learn_prompt(banner)), INTERACTIVE_PROMPT]
 
         device_type = detect_device_type(banner)
         print(f"[{host}] Telnet 设备类型：{device_type.upper()}")
 
+        def run(cmd: str) -> Tuple[int, str]:
+            tn.write(cmd.encode('ascii') + b"\r\n")
+            idx, output = expect(read, sock, wait_for, timeout)
+            if idx == -1:
+                raise TimeoutError(f"等待提示符超时: {cmd}")
+            return idx, output
+
         # 进入特权模式
         if privilege_password:
-            if device_type == 'cisco':
-                tn.write(b"enable\r\n")
-                tn.read_until(b"Password:", timeout=timeout)
-                tn.write(privilege_password.encode('ascii') + b"\r\n")
-            else:
-                tn.write(f"super {privilege_level}\r\n".encode('ascii'))
-                tn.read_until(b"Password:", timeout=timeout)
-                tn.write(privilege_password.encode('ascii') + b"\r\n")
-
-            time.sleep(1.5)
+            privilege_cmd = "enable" if device_type == 'cisco' else f"super {privilege_level}"
+            if run(privilege_cmd)[0] == 1:  # Password:
+                run(privilege_password)
 
         # 关闭分页
-        if device_type == 'cisco':
-            tn.write(b"terminal length 0\r\n")
-        else:
-            tn.write(b"screen-length 0 temporary\r\n")
-        time.sleep(0.8)
-        tn.read_very_eager()
+        run("terminal length 0" if device_type == 'cisco' else "screen-length 0 temporary")
 
         success = True
 
         for cmd in commands:
             print(f"[{host}] 执行: {cmd}")
-            tn.write(cmd.encode('ascii') + b"\r\n")
-            time.sleep(2.0)
-
-            output = ""
-            start = time.time()
-            while time.time() - start < timeout:
-                output += tn.read_very_eager().decode('ascii', errors='ignore')
-                if "#" in output or ">" in output or "]" in output:
-                    break
-                time.sleep(0.3)
+            _, output = run(cmd)
 
             cleaned = clean_output(output, cmd)
             print(f"[{host}] 结果：")
@@ -294,30 +267,18 @@ def batch_save_config():
         for host in ssh_list:
             print(f"\n{'─'*30} {host} {'─'*30}\n")
             try:
-                # 第一步：探测设备类型
+                # 一次登录内完成类型探测 + 保存
                 device_type, _ = network_ssh_execute(
                     host=host,
                     username=username,
                     password=password,
-                    commands=[],
+                    commands=command_sets,
+                    port=SSH_PORT,
                     privilege_password=privilege_password,
                     privilege_level=privilege_level
                 )
-
-                # 根据类型选择保存命令
-                save_commands = command_sets.get(device_type, command_sets['cisco'])
-                print(f"将执行命令：{' '.join(save_commands)}")
-
-                # 第二步：执行保存
-                _, _ = network_ssh_execute(
-                    host=host,
-                    username=username,
-                    password=password,
-                    commands=save_commands,
-                    privilege_password=privilege_password,
-                    privilege_level=privilege_level
-                )
-                success_count += 1
+                if device_type != "unknown":
+                    success_count += 1
 
             except Exception as e:
                 print(f"[{host}] 操作异常：{e}")
@@ -333,13 +294,15 @@ def batch_save_config():
                 password=password,
                 commands=["write memory"],  # Telnet 部分暂固定为 Cisco
                 privilege_password=privilege_password,
-                privilege_level=privilege_level
+                privilege_level=privilege_level,
+                port=TELNET_PORT
             )
             if ok:
                 success_count += 1
 
     print("\n" + "═"*60)
     print(f"所有保存操作完成    成功：{success_count} / 总计：{total}")
+    return success_count
 
 
 # ─── 主菜单 ────────────────────────────────────────────────
@@ -1,139 +1,123 @@
-import paramiko
-import telnetlib
-import time
-import re
 import sys
-import ftplib
 import os
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Callable, Iterator
 import pwinput
+from fleet_executor import run_fleet, print_summary
+from device_session import DeviceSession, SessionPool
+from backup_stream import ThreadLocalFTP, stream_to_ftp
+from backup_pipeline import BackupPipeline, make_sink_factories
+from change_detect import BackupStateIndex, ConfigHasher, content_hash, read_change_marker
+from fingerprint import FingerprintCache
+from output_cleaner import clean_output, iter_clean
+from session_metrics import SessionMetrics, print_phase_table
+from tracing import Tracer
+from profiling import Profiler
 
-# ─── 配置映射表 ────────────────────────────────────────────────
-DEVICE_CONFIG = {
-    'huawei': {
-        'paging': 'screen-length 0 temporary',
-        'save': ['save', 'Y'],
-        'backup': 'display current-configuration',
-        'prompt': r'[\<\[][\w\.-]+[\>\]]\s*$'
-    },
-    'cisco': {
-        'paging': 'terminal length 0',
-        'save': ['write memory'],
-        'backup': 'show running-config',
-        'prompt': r'[>#]\s*$'
-    }
-}
-
-
-# ─── 通用辅助函数 ────────────────────────────────────────────────
-def detect_device_type(initial_output: str) -> str:
-    lower_text = initial_output.lower()
-    if any(word in lower_text for word in ['huawei', 'vrp', 'ne', 's series', '<huawei>', '[quidway]']):
-        return 'huawei'
-    if any(word in lower_text for word in ['cisco', 'ios', 'xe', 'catalyst', 'nexus']):
-        return 'cisco'
-    return 'cisco'  # 默认思科
-
-
-def clean_output(raw_output: str, sent_command: str) -> str:
-    # 去除 ANSI 颜色和控制符
-    raw_output = re.sub(r'\x1B\[[0-9;]*[mK]', '', raw_output)
-    lines = raw_output.splitlines()
-    cleaned = []
-    for line in lines:
-        stripped = line.rstrip()
-        if not stripped or sent_command in stripped: continue
-        # 过滤掉提示符行
-        if re.match(r'^[\w\.-]*[>#\[\]<]\s*$', stripped): continue
-        cleaned.append(stripped)
-    return "\n".join(cleaned).strip()
+# ─── 并发设置 ────────────────────────────────────────────────
+MAX_WORKERS = 20                              # 同时处理的设备数上限
+PROTOCOL_LIMITS = {'ssh': 20, 'telnet': 5}    # 各协议单独限流（老 Telnet 设备别压太狠）
+MAX_SESSIONS = 500                            # 会话池最多保留的已登录会话
+SESSION_IDLE_TIMEOUT = 600                    # 会话空闲多少秒后自动断开
+SAVE_TIMEOUT = 60                             # 保存命令兜底超时（秒）
+BACKUP_TIMEOUT = 300                          # 抓取大配置兜底超时（秒）
+# 备份方式：'pipeline' 采集与上传解耦（多上传线程、FTP/SFTP/本地目录多目标、失败重连）
+#          'stream'   边收边传 FTP，不整份缓存，适合超大配置
+BACKUP_MODE = 'pipeline'
+UPLOAD_WORKERS = 4                            # pipeline 模式的上传线程数
+UPLOAD_QUEUE_SIZE = 100                       # 等待上传的配置份数上限（控制内存）
+CHANGE_DETECTION = True                       # 配置未变化的设备跳过备份（记录为 UNCHANGED）
+STATE_FILE = "backup_state.json"              # 上次备份的变更标记 / 哈希索引
+FINGERPRINT_FILE = "fingerprints.json"        # 设备厂商 / 提示符缓存（下次登录不用再从 banner 识别）
+INVENTORY_FILE = "inventory.json"             # discovery.py 的探测结果，存在时导入为初始指纹
+METRICS_JSON = "session_metrics.json"         # 各阶段用时报告（退出时写出）
+METRICS_PROM = "session_metrics.prom"         # 同一份数据的 Prometheus 文本格式
+TRACE_JSONL = "fleet_trace.jsonl"             # 每次运行的 run → host → phase → command span（每行一个）
+TRACE_CHROME = "fleet_trace.json"             # 同一份追踪，Chrome trace 格式（chrome://tracing / Perfetto 打开）
 
 
 # ─── 统一执行引擎 ────────────────────────────────────────────────
 def run_task(host: str, username: str, password: str, task_mode: str,
-             priv_pwd: Optional[str] = None, method: str = 'ssh') -> Optional[str]:
+             priv_pwd: Optional[str] = None, method: str = 'ssh',
+             pool: Optional[SessionPool] = None,
+             line_sink: Optional[Callable[[str, Iterator[str]], Optional[str]]] = None,
+             state: Optional[BackupStateIndex] = None, port: Optional[int] = None) -> Optional[str]:
     """
     task_mode: 'save' 或 'backup'
     method: 'ssh' 或 'telnet'
+    pool: 传入会话池时复用已登录的会话，任务结束后归还而不是断开
+    line_sink: backup 时如传入，清理后的配置行边收边交给 line_sink(host, lines)，返回其结果
+    state: backup 时如传入，配置未变化则返回 "UNCHANGED"；变化时把新标记/哈希暂存，上传成功后再提交
+    port: 非标准端口（默认 SSH 22 / Telnet 23），模拟设备测试时使用
     """
-    print(f"[{host}] 正在通过 {method.upper()} 连接...")
-    output_result = ""
-
+    session = None
     try:
-        if method == 'ssh':
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            client.connect(host, 22, username, password, timeout=10, look_for_keys=False)
-            chan = client.invoke_shell(width=200, height=1000)
-            time.sleep(1)
-            initial = chan.recv(8192).decode('utf-8', 'ignore')
+        if pool:
+            session = pool.acquire(host, username, password, method, priv_pwd, port)
         else:
-            tn = telnetlib.Telnet(host, timeout=10)
-            tn.read_until(b"Username:", timeout=5)
-            tn.write(username.encode('ascii') + b"\n")
-            tn.read_until(b"Password:", timeout=5)
-            tn.write(password.encode('ascii') + b"\n")
-            time.sleep(1)
-            initial = tn.read_very_eager().decode('ascii', 'ignore')
-
-        dtype = detect_device_type(initial)
-        cfg = DEVICE_CONFIG[dtype]
-        print(f"[{host}] 识别为 {dtype.upper()}")
-
-        # 内部执行函数
-        def send_and_wait(cmd: str, wait_time=1.5):
-            if method == 'ssh':
-                chan.send(cmd + "\n")
-                time.sleep(wait_time)
-                res = ""
-                while chan.recv_ready():
-                    res += chan.recv(8192).decode('utf-8', 'ignore')
-                return res
+            session = DeviceSession(host, username, password, method, priv_pwd, port=port)
+            session.open()
+        cfg = session.cfg
+
+        # 执行具体任务（提示符或 [Y/N] 一出现就继续，超时只是兜底）
+        with session.trace(task_mode):
+            if task_mode == 'save':
+                for c in cfg['save']:
+                    print(f"[{host}] 执行保存: {c}")
+                    session.send_and_wait(c, timeout=SAVE_TIMEOUT)
+                output_result = "SUCCESS"
             else:
-                tn.write(cmd.encode('ascii') + b"\n")
-                time.sleep(wait_time)
-                return tn.read_very_eager().decode('ascii', 'ignore')
-
-        # 1. 提权 & 翻页设置
-        if priv_pwd:
-            p_cmd = "enable" if dtype == 'cisco' else "super 3"
-            send_and_wait(p_cmd)
-            send_and_wait(priv_pwd)
-        send_and_wait(cfg['paging'])
-
-        # 2. 执行具体任务
-        if task_mode == 'save':
-            for c in cfg['save']:
-                print(f"[{host}] 执行保存: {c}")
-                send_and_wait(c, wait_time=2.0)
-            output_result = "SUCCESS"
-        else:
-            print(f"[{host}] 正在抓取配置...")
-            raw_cfg = send_and_wait(cfg['backup'], wait_time=3.0)
-            # 处理长文本可能未读完的情况 (针对 backup)
-            if method == 'ssh':
-                while not re.search(cfg['prompt'], raw_cfg, re.M):
-                    if chan.recv_ready():
-                        raw_cfg += chan.recv(8192).decode('utf-8', 'ignore')
-                    else:
-                        time.sleep(0.5)
-            output_result = clean_output(raw_cfg, cfg['backup'])
-
-        if method == 'ssh':
-            client.close()
+                marker = read_change_marker(session) if state else None
+                if marker and state.is_unchanged(host, marker=marker):
+                    print(f"[{host}] 配置未变化（{marker}），跳过备份")
+                    output_result = "UNCHANGED"
+                elif line_sink:
+                    print(f"[{host}] 正在抓取配置...")
+                    lines = iter_clean(session.iter_lines(cfg['backup'], timeout=BACKUP_TIMEOUT), cfg['backup'])
+                    hasher = ConfigHasher(lines)
+                    output_result = line_sink(host, iter(hasher))
+                    if output_result and not hasher.complete:
+                        # line_sink 没读到提示符就返回（吞掉了异常或提前停止）：配置不完整，会话里还有残留输出
+                        raise ConnectionError("配置未完整读取")
+                    # 只有读到提示符的完整配置才记录标记 / 哈希，否则下次会按标记把残缺的备份当成未变化跳过
+                    if state and output_result:
+                        state.stage(host, marker, hasher.hexdigest())
+                        state.commit(host)
+                else:
+                    print(f"[{host}] 正在抓取配置...")
+                    # send_and_wait 没回到提示符时抛异常，走不到下面的 stage，残缺配置的标记 / 哈希不会入索引
+                    raw_cfg = session.send_and_wait(cfg['backup'], timeout=BACKUP_TIMEOUT)
+                    output_result = clean_output(raw_cfg, cfg['backup'])
+                    if state:
+                        digest = content_hash(output_result)
+                        state.stage(host, marker, digest)
+                        if state.is_unchanged(host, digest=digest):
+                            print(f"[{host}] 配置内容与上次相同，不再上传")
+                            state.commit(host)
+                            output_result = "UNCHANGED"
+
+        if pool:
+            pool.release(session)
         else:
-            tn.close()
+            session.close()
         return output_result
 
     except Exception as e:
         print(f"[{host}] 错误: {e}")
+        if session and pool:
+            pool.discard(session)
+        elif session:
+            session.close()
         return None
 
 
 # ─── 业务流程 ────────────────────────────────────────────────
-def process_all(mode: str):
-    """mode: 'save' 或 'backup'"""
+def process_all(mode: str, pool: Optional[SessionPool] = None, profile: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    mode: 'save' 或 'backup'；pool 用于在多次任务之间复用会话；返回 run_fleet 的汇总
+    profile: 为 True 时对批量执行和上传收尾做 CPU / 内存剖析（不含输入密码的等待），报告写到 profiles/
+    """
     user = input("用户名: ").strip()
     pwd = pwinput.pwinput("密码: ")
     priv_pwd = pwinput.pwinput("特权密码 (如无直接回车): ") or None
@@ -141,39 +125,75 @@ def process_all(mode: str):
     ssh_ips = load_ip_list("ip_list_ssh.txt")
     telnet_ips = load_ip_list("ip_list_telnet.txt")
 
-    ftp_client = None
+    ftp_pool = None
+    pipeline = None
+    state = BackupStateIndex(STATE_FILE) if mode == 'backup' and CHANGE_DETECTION else None
     if mode == 'backup':
         ftp_cfg = load_ftp_config()
         if not ftp_cfg: return
         try:
-            ftp_client = ftplib.FTP(ftp_cfg['host'], ftp_cfg['username'], ftp_cfg['password'])
-            ftp_client.cwd(ftp_cfg['directory'])
+            if BACKUP_MODE == 'stream':
+                ftp_pool = ThreadLocalFTP(ftp_cfg)
+                ftp_pool.get()  # 先验证一次 FTP 可用
+            else:
+                pipeline = BackupPipeline(make_sink_factories(ftp_cfg), UPLOAD_WORKERS, UPLOAD_QUEUE_SIZE)
+                pipeline.start()
         except Exception as e:
             print(f"FTP 连接失败: {e}");
             return
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-    # 合并任务处理
+    # 合并任务处理（并发执行，每台设备输出独立）
     tasks = [(ip, 'ssh') for ip in ssh_ips] + [(ip, 'telnet') for ip in telnet_ips]
 
-    for ip, method in tasks:
-        print(f"\n{'-' * 50}\n处理设备: {ip}")
-        result = run_task(ip, user, pwd, mode, priv_pwd, method)
-
-        if result and mode == 'backup':
-            filename = f"{ip}_{timestamp}.cfg"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(result)
-            with open(filename, 'rb') as f:
-                ftp_client.storbinary(f'STOR {filename}', f)
-            os.remove(filename)
-            print(f"[{ip}] 备份已上传至 FTP")
-        elif result == "SUCCESS":
-            print(f"[{ip}] 配置保存成功")
-
-    if ftp_client: ftp_client.quit()
+    def ftp_line_sink(ip: str, lines: Iterator[str]) -> str:
+        # 在 worker 线程里执行，每个线程用自己的 FTP 连接
+        size = stream_to_ftp(ftp_pool.get(), f"{ip}_{timestamp}.cfg", lines)
+        print(f"[{ip}] 备份已流式上传至 FTP ({size} 字节)")
+        return "UPLOADED"
+
+    def collect(ip: str, method: str) -> Optional[str]:
+        # 采集线程：抓到配置后放入上传队列立即返回，不等上传
+        result = run_task(ip, user, pwd, mode, priv_pwd, method, pool,
+                          ftp_line_sink if ftp_pool else None, state)
+        if result and result != "UNCHANGED" and pipeline:
+            # 上传成功后才把新的标记/哈希写入状态索引
+            on_uploaded = (lambda ok: ok and state.commit(ip)) if state else None
+            pipeline.submit(f"{ip}_{timestamp}.cfg", result, on_uploaded)
+            print(f"[{ip}] 配置已加入上传队列")
+        return result
+
+    def handle_result(record: Dict[str, Any]):
+        if record['result'] == "SUCCESS":
+            print(f"[{record['host']}] 配置保存成功")
+        elif record['result'] == "UNCHANGED":
+            unchanged.append(record['host'])
+
+    unchanged: List[str] = []
+
+    with Profiler(mode) if profile else nullcontext():
+        summary = run_fleet(
+            tasks,
+            collect,
+            max_workers=MAX_WORKERS,
+            protocol_limits=PROTOCOL_LIMITS,
+            on_done=handle_result,
+            tracer=pool.tracer if pool else None
+        )
+        print_summary(summary)
+
+        if pipeline:
+            stats = pipeline.close()
+            print(f"上传完成：成功 {stats['uploaded']} / 失败 {stats['failed']}，共 {stats['bytes']} 字节")
+            for filename in pipeline.failures:
+                print(f"  上传失败 → {filename}")
+    if ftp_pool: ftp_pool.close_all()
+    if state:
+        state.save()
+        print(f"未变化跳过：{len(unchanged)} 台")
     print("\n任务全部完成。")
+    return summary
 
 
 # ─── 辅助读取函数 (复用原脚本) ──────────────────────────────────
@@ -184,6 +204,11 @@ def load_ip_list(filename: str) -> List[str]:
 
 
 def load_ftp_config(filename: str = "ftp_config.txt") -> Optional[Dict]:
+    """
+    key=value 格式：host / username / password / directory
+    可选：protocol=ftp|sftp，local_dir=本地目录（额外保存一份），
+          store_path=本地版本库文件（压缩去重、按时间点取回，见 backup_store.py）
+    """
     if not os.path.exists(filename): return None
     config = {}
     with open(filename, 'r') as f:
@@ -195,20 +220,42 @@ def load_ftp_config(filename: str = "ftp_config.txt") -> Optional[Dict]:
 
 
 # ─── 主入口 ────────────────────────────────────────────────
-def main():
-    while True:
-        print("\n=== 网络自动备份工具 2.0 ===")
-        print("1. 批量保存配置 (Save)")
-        print("2. 备份配置到 FTP (Backup)")
-        print("0. 退出")
-        choice = input("选择: ")
-        if choice == '1':
-            process_all('save')
-        elif choice == '2':
-            process_all('backup')
-        elif choice == '0':
-            break
+def main(profile: bool = False):
+    # 整个菜单循环共用一个会话池，先 save 再 backup 时不用重新登录
+    # profile=True（命令行加 --profile）时每次批量任务都做 CPU / 内存剖析
+    fingerprints = FingerprintCache(FINGERPRINT_FILE)
+    if os.path.exists(INVENTORY_FILE):
+        fingerprints.import_inventory(INVENTORY_FILE)
+    metrics = SessionMetrics()
+    tracer = Tracer()
+    pool = SessionPool(max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT,
+                       fingerprints=fingerprints, metrics=metrics, tracer=tracer)
+    try:
+        while True:
+            print("\n=== 网络自动备份工具 2.0 ===")
+            print("1. 批量保存配置 (Save)")
+            print("2. 备份配置到 FTP (Backup)")
+            print("0. 退出")
+            choice = input("选择: ")
+            if choice == '1':
+                process_all('save', pool, profile)
+            elif choice == '2':
+                process_all('backup', pool, profile)
+            elif choice == '0':
+                break
+    finally:
+        pool.close_all()
+        fingerprints.save()
+        report = metrics.report()
+        if report['sessions']:
+            metrics.write_json(METRICS_JSON)
+            metrics.write_prometheus(METRICS_PROM)
+            print_phase_table(report)
+        if tracer.spans:
+            tracer.write_jsonl(TRACE_JSONL)
+            tracer.write_chrome(TRACE_CHROME)
+            print(f"追踪已写入 {TRACE_CHROME}（chrome://tracing 或 Perfetto 打开）")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main(profile='--profile' in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,181 @@
+import asyncio
+import sys
+from typing import List, Dict, Optional, Pattern, Tuple, Union
+import asyncssh  # 需要先 pip install asyncssh
+import pwinput
+from stream_buffer import StreamBuffer
+from prompt_expect import GENERIC_PROMPT, INTERACTIVE_PROMPT, TAIL_SIZE, learn_prompt, prompt_pattern
+from device_classifier import detect_device_type
+from output_cleaner import clean_output
+
+"""
+asyncio 版 SSH 执行引擎（v3.0 加 --async 参数时用它并发巡检，bench_ssh_engines 里和线程版对比）
+- 与 network_ssh_execute 相同的约定：返回 (device_type, {命令: 清理后输出})
+- 每个会话 await 通道数据，不再 while + recv_ready + sleep 轮询
+- 登录时学习设备真实提示符（prompt_expect.learn_prompt），之后只认这个主机名的提示符，
+  配置里以 > / # 结尾的行（banner、description 等）不会提前结束读取；没等到提示符算这台设备失败
+- 单进程单线程即可同时驱动成千上万个设备会话（受 ulimit -n 文件句柄数限制）
+- 用信号量限制同时在线的会话数量；单台设备的任何异常只让这一台失败，不会取消整批
+"""
+
+BANNER_TIMEOUT = 5.0
+
+
+# ─── 读取工具 ────────────────────────────────────────────────
+async def expect_async(stdout, patterns: List[Pattern], timeout: float) -> Tuple[int, str]:
+    """
+    prompt_expect.expect 的 asyncio 版：等待数据到达，直到末尾命中 patterns 中的某一个
+    返回 (命中的下标, 全部输出)，超时或通道关闭时下标为 -1
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    buf = StreamBuffer(TAIL_SIZE)
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return -1, buf.getvalue()
+        try:
+            chunk = await asyncio.wait_for(stdout.read(65536), remaining)
+        except asyncio.TimeoutError:
+            return -1, buf.getvalue()
+        if not chunk:  # 对端关闭
+            return -1, buf.getvalue()
+        buf.feed(chunk)
+        for i, pattern in enumerate(patterns):
+            if buf.search_tail(pattern):
+                return i, buf.getvalue()
+
+
+# ─── 单设备会话 ────────────────────────────────────────────────
+async def network_ssh_execute_async(
+        host: str,
+        username: str,
+        password: str,
+        commands: Union[List[str], Dict[str, List[str]]],
+        port: int = 22,
+        timeout_per_cmd: float = 15.0,
+        privilege_password: Optional[str] = None,
+        privilege_level: str = "3",
+        verbose: bool = True
+) -> Tuple[str, Dict[str, str]]:
+    """
+    asyncio SSH 执行器
+    commands 为 {设备类型: 命令列表} 时，在同一会话内按检测结果选择命令
+    返回 (device_type, {命令: 清理后输出})，失败时为 ("unknown", {})
+    """
+    outputs = {}
+    device_type = "unknown"
+    try:
+        async with asyncssh.connect(
+                host, port=port,
+                username=username, password=password,
+                known_hosts=None,          # 等同 AutoAddPolicy，生产环境建议校验
+                client_keys=None,
+                connect_timeout=20
+        ) as conn:
+            process = await conn.create_process(term_type='vt100', term_size=(200, 500))
+            stdin, stdout = process.stdin, process.stdout
+
+            # 等到第一个提示符，同时学习真实提示符（如 SW1# / <HUAWEI>）
+            idx, initial_output = await expect_async(stdout, [GENERIC_PROMPT], BANNER_TIMEOUT)
+            if idx == -1:
+                raise ConnectionError(f"登录后 {BANNER_TIMEOUT:.0f} 秒内未出现提示符")
+            device_type = detect_device_type(initial_output)
+            wait_for = [prompt_pattern(learn_prompt(initial_output)), INTERACTIVE_PROMPT]
+            if verbose:
+                print(f"[{host}] 设备类型：{device_type.upper()}")
+
+            async def run(cmd: str) -> Tuple[int, str]:
+                """发送一条命令，等到提示符或设备提问（Password: 等）；没等到就是失败"""
+                stdin.write(cmd + "\n")
+                idx, output = await expect_async(stdout, wait_for, timeout_per_cmd)
+                if idx == -1:
+                    if stdout.at_eof():
+                        raise ConnectionError(f"等待 {cmd} 的提示符时连接断开")
+                    raise TimeoutError(f"等待提示符超时: {cmd}")
+                return idx, output
+
+            if device_type == 'cisco':
+                paging_cmd, privilege_cmd = "terminal length 0", "enable"
+            else:
+                paging_cmd, privilege_cmd = "screen-length 0 temporary", f"super {privilege_level}"
+
+            await run(paging_cmd)
+
+            if privilege_password:
+                if (await run(privilege_cmd))[0] == 1:  # Password:
+                    await run(privilege_password)
+
+            if isinstance(commands, dict):
+                commands = commands.get(device_type, commands.get('cisco', []))
+
+            for cmd in commands:
+                cmd = cmd.strip()
+                if not cmd:
+                    continue
+                _, output = await run(cmd)
+                outputs[cmd] = clean_output(output, cmd)
+                if verbose:
+                    print(f"[{host}] 完成: {cmd}")
+
+            stdin.write("quit\n")
+            process.close()
+
+    except Exception as e:  # 任何异常都只算这台设备失败（run_fleet_async 里的其他设备继续）
+        print(f"[{host}] SSH 失败：{e or type(e).__name__}")
+        return "unknown", {}
+
+    return device_type, outputs
+
+
+# ─── 批量执行 ────────────────────────────────────────────────
+async def run_fleet_async(
+        hosts: List[str],
+        username: str,
+        password: str,
+        commands: Union[List[str], Dict[str, List[str]]],
+        max_sessions: int = 500,
+        **kwargs
+) -> Dict[str, Tuple[str, Dict[str, str]]]:
+    """并发执行所有设备，同时在线的会话不超过 max_sessions"""
+    sem = asyncio.Semaphore(max_sessions)
+
+    async def _one(host: str):
+        async with sem:
+            return await network_ssh_execute_async(host, username, password, commands, **kwargs)
+
+    # 执行器之外抛出的异常（参数错误等）也只记为该设备失败，不会取消其他设备
+    results = await asyncio.gather(*(_one(h) for h in hosts), return_exceptions=True)
+    fleet = {}
+    for host, result in zip(hosts, results):
+        if isinstance(result, BaseException):
+            print(f"[{host}] 执行异常：{result or type(result).__name__}")
+            result = ("unknown", {})
+        fleet[host] = result
+    return fleet
+
+
+# ─── 主程序 ────────────────────────────────────────────────
+if __name__ == '__main__':
+    ip_list_file = sys.argv[1] if len(sys.argv) > 1 else "ip_list.txt"
+    try:
+        with open(ip_list_file, 'r', encoding='utf-8') as f:
+            ip_list = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    except FileNotFoundError:
+        print(f"找不到 {ip_list_file}，请创建文件，每行一个 IP")
+        sys.exit(1)
+
+    username = input("请输入 SSH 用户名（所有设备共用）: ").strip()
+    password = pwinput.pwinput(prompt="请输入 SSH 密码: ", mask="*")
+    command = input("要执行的命令: ").strip()
+
+    results = asyncio.run(run_fleet_async(ip_list, username, password, [command], verbose=False))
+
+    ok = 0
+    for host, (device_type, outputs) in results.items():
+        if device_type == "unknown":
+            continue
+        ok += 1
+        print(f"\n{'=' * 30} {host} ({device_type.upper()}) {'=' * 30}")
+        print(outputs.get(command, ""))
+    print(f"\n成功 {ok} / 总计 {len(ip_list)}")
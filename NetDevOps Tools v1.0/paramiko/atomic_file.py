@@ -0,0 +1,13 @@
+import os
+
+"""
+状态 / 报告文件的原子写：先写 <path>.tmp 再 os.replace，中途崩溃或断电时旧文件保持完整，读的一方不会看到半个文件
+用于备份状态索引、指纹缓存、会话指标和追踪导出
+"""
+
+
+def atomic_write(path: str, text: str):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
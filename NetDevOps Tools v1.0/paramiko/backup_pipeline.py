@@ -0,0 +1,242 @@
+import ftplib
+import io
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import paramiko
+from backup_store import BackupStore, parse_backup_filename
+
+"""
+备份流水线：采集与上传解耦
+- 采集线程（run_fleet 的 worker）把抓到的配置放进有界队列，队列满时阻塞，内存有上限
+- 多个上传线程从队列取出，依次写到所有配置的目标（FTP / SFTP / 本地目录 / 本地版本库）
+- 每个上传线程持有自己的目标连接（本地版本库除外，所有线程共用一个），上传失败自动断开重连并重试
+- 上传慢只会让队列变满，不会拖住设备采集
+"""
+
+DEFAULT_UPLOADERS = 4
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_RETRIES = 3
+
+
+# ─── 上传目标 ────────────────────────────────────────────────
+class FtpSink:
+    name = 'ftp'
+
+    def __init__(self, cfg: Dict[str, str]):
+        self.cfg = cfg
+        self.ftp = None
+
+    def connect(self):
+        self.ftp = ftplib.FTP(self.cfg['host'], self.cfg['username'], self.cfg['password'], timeout=30)
+        self.ftp.cwd(self.cfg.get('directory', '/'))
+
+    def upload(self, filename: str, data: bytes):
+        if self.ftp is None:
+            self.connect()
+        self.ftp.storbinary(f'STOR {filename}', io.BytesIO(data))
+
+    def close(self):
+        if self.ftp:
+            try:
+                self.ftp.quit()
+            except Exception:
+                self.ftp.close()
+        self.ftp = None
+
+
+class SftpSink:
+    name = 'sftp'
+
+    def __init__(self, cfg: Dict[str, str]):
+        self.cfg = cfg
+        self.client = None
+        self.sftp = None
+
+    def connect(self):
+        self.client = paramiko.SSHClient()
+        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.client.connect(self.cfg['host'], int(self.cfg.get('port', 22)), self.cfg['username'],
+                            self.cfg['password'], timeout=30, look_for_keys=False, allow_agent=False)
+        self.sftp = self.client.open_sftp()
+        self.sftp.chdir(self.cfg.get('directory', '.'))
+
+    def upload(self, filename: str, data: bytes):
+        if self.sftp is None:
+            self.connect()
+        self.sftp.putfo(io.BytesIO(data), filename)
+
+    def close(self):
+        if self.client:
+            self.client.close()
+        self.client = self.sftp = None
+
+
+class LocalDirSink:
+    name = 'local'
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def connect(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def upload(self, filename: str, data: bytes):
+        self.connect()
+        tmp = os.path.join(self.directory, filename + '.part')
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(self.directory, filename))
+
+    def close(self):
+        pass
+
+
+class StoreSink:
+    """
+    写入本地版本化备份库（backup_store.py），文件名形如 {ip}_{timestamp}.cfg
+    同一个库文件的所有上传线程共用一个 BackupStore（一个 SQLite 连接，put 由它内部的锁串行化），
+    各开一个连接会互相抢写锁，报 database is locked
+    """
+    name = 'store'
+    _shared: Dict[str, List] = {}     # 库文件路径 → [BackupStore, 引用数]
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.store = None
+
+    def connect(self):
+        if self.store is not None:
+            return
+        with StoreSink._shared_lock:
+            entry = StoreSink._shared.get(self.path)
+            if entry is None:
+                entry = StoreSink._shared[self.path] = [BackupStore(self.path), 0]
+            entry[1] += 1
+            self.store = entry[0]
+
+    def upload(self, filename: str, data: bytes):
+        if self.store is None:
+            self.connect()
+        device, ts = parse_backup_filename(filename)
+        self.store.put(device, ts, data.decode('utf-8'))
+
+    def close(self):
+        if self.store is None:
+            return
+        with StoreSink._shared_lock:
+            entry = StoreSink._shared[self.path]
+            entry[1] -= 1
+            if entry[1] == 0:   # 最后一个使用者关闭时才真正关库
+                del StoreSink._shared[self.path]
+                entry[0].close()
+        self.store = None
+
+
+def make_sink_factories(cfg: Dict[str, str]) -> List[Callable[[], Any]]:
+    """
+    根据 ftp_config.txt 的内容生成目标工厂（每个上传线程各自创建实例）
+    protocol=ftp / sftp（默认 ftp），local_dir=目录（可选，额外保存一份本地副本），
+    store_path=数据库文件（可选，写入本地版本化备份库）
+    """
+    factories = []
+    protocol = cfg.get('protocol', 'ftp').lower()
+    if cfg.get('host'):
+        if protocol == 'sftp':
+            factories.append(lambda: SftpSink(cfg))
+        else:
+            factories.append(lambda: FtpSink(cfg))
+    if cfg.get('local_dir'):
+        factories.append(lambda: LocalDirSink(cfg['local_dir']))
+    if cfg.get('store_path'):
+        factories.append(lambda: StoreSink(cfg['store_path']))
+    return factories
+
+
+# ─── 流水线 ────────────────────────────────────────────────
+class BackupPipeline:
+    def __init__(self, sink_factories: List[Callable[[], Any]],
+                 uploaders: int = DEFAULT_UPLOADERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 retries: int = DEFAULT_RETRIES):
+        self.sink_factories = sink_factories
+        self.retries = retries
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.stats = {'queued': 0, 'uploaded': 0, 'failed': 0, 'bytes': 0}
+        self.failures: List[str] = []
+        self.workers = [threading.Thread(target=self._uploader, daemon=True) for _ in range(max(1, uploaders))]
+
+    def start(self) -> 'BackupPipeline':
+        """先逐个目标试连一次（失败直接抛异常），再启动上传线程"""
+        for factory in self.sink_factories:
+            sink = factory()
+            try:
+                sink.connect()
+            finally:
+                sink.close()
+        for w in self.workers:
+            w.start()
+        return self
+
+    def submit(self, filename: str, content: str, on_uploaded: Optional[Callable[[bool], None]] = None):
+        """由采集线程调用；队列满时阻塞（背压）。on_uploaded(是否成功) 在上传线程中回调"""
+        self.queue.put((filename, content.encode('utf-8'), on_uploaded))
+        with self.lock:
+            self.stats['queued'] += 1
+
+    def close(self) -> Dict[str, int]:
+        """等待队列清空、上传线程退出，返回统计"""
+        for _ in self.workers:
+            self.queue.put(None)
+        for w in self.workers:
+            w.join()
+        return dict(self.stats)
+
+    def _uploader(self):
+        sinks = [factory() for factory in self.sink_factories]
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    self.queue.task_done()
+                    break
+                filename, data, on_uploaded = item
+                ok = False
+                try:
+                    ok = all([self._upload_with_retry(sink, filename, data) for sink in sinks])
+                    if on_uploaded:
+                        # 回调（如写变更状态）出错不能带走上传线程，否则队列满后 submit / close 永远阻塞
+                        try:
+                            on_uploaded(ok)
+                        except Exception as e:
+                            print(f"[上传] {filename} 上传后回调失败: {e}")
+                finally:
+                    with self.lock:
+                        if ok:
+                            self.stats['uploaded'] += 1
+                            self.stats['bytes'] += len(data)
+                        else:
+                            self.stats['failed'] += 1
+                            self.failures.append(filename)
+                    self.queue.task_done()
+                print(f"[上传] {filename} {'完成' if ok else '失败'} ({len(data)} 字节)")
+        finally:
+            for sink in sinks:
+                sink.close()
+
+    def _upload_with_retry(self, sink, filename: str, data: bytes) -> bool:
+        for attempt in range(1, self.retries + 1):
+            try:
+                sink.upload(filename, data)
+                return True
+            except Exception as e:
+                print(f"[上传] {filename} → {sink.name} 第 {attempt} 次失败: {e}，重连后重试")
+                sink.close()  # 下次 upload 时自动重连
+                if attempt < self.retries:
+                    time.sleep(min(2 ** attempt, 10))
+        return False
@@ -0,0 +1,194 @@
+import hashlib
+import lzma
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+"""
+本地版本化备份库（内容寻址 + 压缩 + 去重）
+- 配置按段切块：在思科 "!" / 华为 "#" 分隔行处，由前一行内容的哈希决定是否切块（平均约 4 段一块），
+  切点只取决于内容，改了一个接口只会产生一个新块，其余块与历史版本共用
+- 块按内容哈希存储，每个块只存一份，zlib（或 lzma）压缩
+- 每个版本的块哈希列表（manifest）同样按内容寻址、压缩存储；配置没变的版本只多一行索引
+- SQLite 索引 (device, ts)，“设备 X 在时间 Y 的配置” 是一次索引查询
+用法：python backup_store.py backups.db 10.1.1.1 ["2026-03-01 00:00:00"]
+"""
+
+BLOCK_MAX_LINES = 128
+BLOCK_CUT_MODULUS = 4   # 分隔行处约 1/4 的概率切块
+DIGEST_SIZE = 16
+SEPARATOR_LINE = re.compile(r'^\s*[!#]\s*$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    hash BLOB PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS manifests (
+    hash BLOB PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    id       INTEGER PRIMARY KEY,
+    device   TEXT NOT NULL,
+    ts       TEXT NOT NULL,
+    sha      BLOB NOT NULL,
+    size     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_versions_device_ts ON versions (device, ts);
+"""
+
+
+def split_blocks(text: str) -> List[str]:
+    """内容定义切块：分隔行处按前一行的哈希决定是否切开，分隔行归入前一块"""
+    blocks, current = [], []
+    prev = ""
+    for line in text.splitlines(keepends=True):
+        current.append(line)
+        if SEPARATOR_LINE.match(line):
+            if zlib.crc32(prev.encode('utf-8')) % BLOCK_CUT_MODULUS == 0:
+                blocks.append("".join(current))
+                current = []
+        elif len(current) >= BLOCK_MAX_LINES:
+            blocks.append("".join(current))
+            current = []
+        prev = line
+    if current:
+        blocks.append("".join(current))
+    return blocks
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+class BackupStore:
+    def __init__(self, path: str = "backups.db", compression: str = 'zlib'):
+        self.path = path
+        self.compress = (lambda b: lzma.compress(b, preset=6)) if compression == 'lzma' else (lambda b: zlib.compress(b, 6))
+        self.decompress = lzma.decompress if compression == 'lzma' else zlib.decompress
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._uncommitted = 0
+
+    # ─── 写入 ────────────────────────────────────────────────
+    def put(self, device: str, ts: str, text: str, commit_every: int = 1) -> int:
+        """
+        写入一个版本，ts 格式 'YYYY-MM-DD HH:MM:SS'
+        批量导入时把 commit_every 调大（如 500），最后调用 flush()
+        """
+        raw = text.encode('utf-8')
+        sha = _digest(raw)
+        with self.lock:
+            cur = self.db.cursor()
+            # manifest 以整份配置的哈希为键，相同内容（包括未变化的版本）只存一次
+            if not cur.execute("SELECT 1 FROM manifests WHERE hash = ?", (sha,)).fetchone():
+                rows = {}
+                hashes = []
+                for block in split_blocks(text):
+                    data = block.encode('utf-8')
+                    h = _digest(data)
+                    hashes.append(h)
+                    rows[h] = data
+                existing = self._existing(cur, list(rows))
+                cur.executemany("INSERT OR IGNORE INTO blocks (hash, data) VALUES (?, ?)",
+                                [(h, self.compress(d)) for h, d in rows.items() if h not in existing])
+                cur.execute("INSERT INTO manifests (hash, data) VALUES (?, ?)",
+                            (sha, self.compress(b"".join(hashes))))
+            cur.execute("INSERT INTO versions (device, ts, sha, size) VALUES (?, ?, ?, ?)",
+                        (device, ts, sha, len(raw)))
+            version_id = cur.lastrowid
+            self._uncommitted += 1
+            if self._uncommitted >= commit_every:
+                self.db.commit()
+                self._uncommitted = 0
+        return version_id
+
+    def flush(self):
+        with self.lock:
+            self.db.commit()
+            self._uncommitted = 0
+
+    @staticmethod
+    def _existing(cur, hashes: List[bytes]) -> set:
+        found = set()
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            marks = ",".join("?" * len(part))
+            found.update(r[0] for r in cur.execute(f"SELECT hash FROM blocks WHERE hash IN ({marks})", part))
+        return found
+
+    # ─── 读取 ────────────────────────────────────────────────
+    def get(self, device: str, at: Optional[str] = None) -> Optional[str]:
+        """取设备在 at 时刻（含）之前最新的配置；at 为空取最新版本"""
+        with self.lock:
+            cur = self.db.cursor()
+            if at:
+                row = cur.execute("SELECT m.data FROM versions v JOIN manifests m ON m.hash = v.sha "
+                                  "WHERE v.device = ? AND v.ts <= ? ORDER BY v.ts DESC LIMIT 1",
+                                  (device, at)).fetchone()
+            else:
+                row = cur.execute("SELECT m.data FROM versions v JOIN manifests m ON m.hash = v.sha "
+                                  "WHERE v.device = ? ORDER BY v.ts DESC LIMIT 1", (device,)).fetchone()
+            if not row:
+                return None
+            manifest = self.decompress(row[0])
+            hashes = [manifest[i:i + DIGEST_SIZE] for i in range(0, len(manifest), DIGEST_SIZE)]
+            blocks: Dict[bytes, bytes] = {}
+            unique = list(set(hashes))
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                marks = ",".join("?" * len(part))
+                blocks.update(cur.execute(f"SELECT hash, data FROM blocks WHERE hash IN ({marks})", part))
+        return "".join(self.decompress(blocks[h]).decode('utf-8') for h in hashes)
+
+    def history(self, device: str) -> List[Tuple[str, int]]:
+        with self.lock:
+            return self.db.execute("SELECT ts, size FROM versions WHERE device = ? ORDER BY ts",
+                                   (device,)).fetchall()
+
+    def stats(self) -> Dict[str, float]:
+        """逻辑大小（所有版本原文之和）与实际占用的对比"""
+        with self.lock:
+            versions, logical = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM versions").fetchone()
+            blocks, block_bytes = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blocks").fetchone()
+            manifest_bytes = self.db.execute(
+                "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM manifests").fetchone()[0]
+        stored = block_bytes + manifest_bytes
+        return {'versions': versions, 'blocks': blocks, 'logical_bytes': logical,
+                'stored_bytes': stored, 'ratio': logical / stored if stored else 0.0}
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+def parse_backup_filename(filename: str) -> Tuple[str, str]:
+    """'{ip}_{YYYYmmdd_HHMMSS}.cfg' → (ip, 'YYYY-MM-DD HH:MM:SS')"""
+    stem = filename.rsplit('.', 1)[0]
+    device, date, clock = stem.rsplit('_', 2)
+    ts = datetime.strptime(f"{date}_{clock}", "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
+    return device, ts
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("用法：python backup_store.py <backups.db> <设备IP> [\"YYYY-MM-DD HH:MM:SS\"]")
+        sys.exit(1)
+    store = BackupStore(sys.argv[1])
+    at = sys.argv[3] if len(sys.argv) > 3 else None
+    config = store.get(sys.argv[2], at)
+    if config is None:
+        print("没有找到对应版本")
+        print("历史版本：", [ts for ts, _ in store.history(sys.argv[2])])
+    else:
+        print(config)
+    store.close()
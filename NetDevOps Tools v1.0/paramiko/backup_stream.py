@@ -0,0 +1,94 @@
+import ftplib
+import threading
+from typing import Dict, Iterable, List
+
+"""
+流式配置备份：SSH / Telnet 通道里收到的配置行清理后直接写进 FTP 数据连接
+- 不再把整份配置拼成字符串、写本地临时文件、再读出来上传、再删除
+- 每台设备的内存占用只有一个发送块（默认 64KB），与配置大小无关
+- 每个 worker 线程使用自己的 FTP 连接（ftplib 不是线程安全的），同一线程内复用
+- 行的清理用 output_cleaner.iter_clean
+"""
+
+BLOCK_SIZE = 64 * 1024
+
+
+def stream_to_ftp(ftp: ftplib.FTP, filename: str, lines: Iterable[str],
+                  blocksize: int = BLOCK_SIZE) -> int:
+    """
+    按块把行写入 FTP（STOR），返回上传的字节数
+    中途出错时中止传输并尽量删除残缺的文件，然后重新抛出异常
+    """
+    conn = ftp.transfercmd(f'STOR {filename}')
+    total = 0
+    block: List[bytes] = []
+    size = 0
+    try:
+        with conn:
+            for line in lines:
+                data = (line + "\n").encode('utf-8')
+                block.append(data)
+                size += len(data)
+                if size >= blocksize:
+                    conn.sendall(b"".join(block))
+                    total += size
+                    block, size = [], 0
+            if block:
+                conn.sendall(b"".join(block))
+                total += size
+        ftp.voidresp()
+    except Exception:
+        try:
+            ftp.voidresp()
+        except Exception:
+            pass
+        try:
+            ftp.delete(filename)
+        except Exception:
+            pass
+        raise
+    return total
+
+
+class ThreadLocalFTP:
+    """每个线程一个 FTP 连接，断线后下次调用自动重连"""
+
+    def __init__(self, ftp_cfg: Dict[str, str]):
+        self.ftp_cfg = ftp_cfg
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.opened: List[ftplib.FTP] = []
+
+    def get(self) -> ftplib.FTP:
+        ftp = getattr(self.local, 'ftp', None)
+        if ftp is not None:
+            try:
+                ftp.voidcmd('NOOP')
+                return ftp
+            except Exception:
+                self._close(ftp)
+        ftp = ftplib.FTP(self.ftp_cfg['host'], self.ftp_cfg['username'], self.ftp_cfg['password'])
+        ftp.cwd(self.ftp_cfg['directory'])
+        self.local.ftp = ftp
+        with self.lock:
+            self.opened.append(ftp)
+        return ftp
+
+    def _close(self, ftp: ftplib.FTP):
+        self.local.ftp = None
+        with self.lock:
+            if ftp in self.opened:
+                self.opened.remove(ftp)
+        try:
+            ftp.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self.lock:
+            opened, self.opened = self.opened, []
+        for ftp in opened:
+            try:
+                ftp.quit()
+            except Exception:
+                ftp.close()
@@ -0,0 +1,96 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from backup_store import BackupStore
+
+"""
+backup_store 基准测试：模拟 5000 台设备的每日备份历史
+- 每台设备约 400 行配置（思科风格，按 ! 分段）
+- 每天约 5% 设备有小改动（改描述 / VLAN），0.5% 设备有较大改动（新增一批接口）
+- 输出：导入速度、存储压缩比（逻辑大小 / 实际占用、数据库文件大小）、按时间点取回的延迟
+运行：python bench_backup_store.py [设备数=5000] [天数=30]
+"""
+
+
+def make_config(idx: int, rnd: random.Random):
+    lines = [f"hostname SW-{idx:05d}", "!", "service timestamps log datetime msec", "no ip domain-lookup", "!"]
+    for vlan in range(10, 10 + rnd.randint(5, 20)):
+        lines += [f"vlan {vlan}", f" name VLAN_{vlan}", "!"]
+    for port in range(1, 49):
+        lines += [f"interface GigabitEthernet1/0/{port}",
+                  f" description TO-ROOM-{rnd.randint(100, 999)}-PC{port}",
+                  " switchport mode access",
+                  f" switchport access vlan {rnd.randint(10, 20)}",
+                  " spanning-tree portfast", "!"]
+    lines += ["ip ssh version 2", "line vty 0 4", " transport input ssh", "!", "end"]
+    return lines
+
+
+def mutate(lines, rnd: random.Random, big: bool):
+    if big:
+        pos = len(lines) - 6
+        for n in range(rnd.randint(5, 15)):
+            lines[pos:pos] = [f"interface Vlan{rnd.randint(100, 4000)}",
+                              f" ip address 10.{rnd.randint(0, 255)}.{n}.1 255.255.255.0", "!"]
+        return
+    for _ in range(rnd.randint(1, 3)):
+        i = rnd.randrange(len(lines))
+        if lines[i].startswith(" description"):
+            lines[i] = f" description CHANGED-{rnd.randint(0, 10 ** 6)}"
+        elif lines[i].startswith(" switchport access vlan"):
+            lines[i] = f" switchport access vlan {rnd.randint(10, 20)}"
+
+
+if __name__ == '__main__':
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    rnd = random.Random(42)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_backups.db")
+    store = BackupStore(path)
+    configs = {f"10.{i // 250}.{i % 250}.1": make_config(i, rnd) for i in range(devices)}
+    truth = {}  # 抽样记录原文用于校验
+
+    print(f"设备 {devices} 台 × {days} 天，数据库：{path}")
+    start = time.perf_counter()
+    logical = 0
+    for day in range(days):
+        ts = (datetime(2026, 1, 1, 2) + timedelta(days=day)).strftime("%Y-%m-%d %H:%M:%S")
+        for n, (ip, lines) in enumerate(configs.items()):
+            roll = rnd.random()
+            if day and roll < 0.05:
+                mutate(lines, rnd, big=roll < 0.005)
+            text = "\n".join(lines) + "\n"
+            logical += len(text)
+            store.put(ip, ts, text, commit_every=1000)
+            if n % 500 == 0:
+                truth[(ip, ts)] = text
+        store.flush()
+        print(f"  第 {day + 1:>2} 天导入完成，累计 {time.perf_counter() - start:6.1f} 秒")
+    elapsed = time.perf_counter() - start
+    total = devices * days
+
+    stats = store.stats()
+    file_size = sum(os.path.getsize(path + ext) for ext in ("", "-wal") if os.path.exists(path + ext))
+    print(f"\n导入：{total} 个版本，{elapsed:.1f} 秒，{total / elapsed:.0f} 版本/秒，"
+          f"{logical / elapsed / 1024 / 1024:.1f} MB/秒（原文）")
+    print(f"存储：原文 {stats['logical_bytes'] / 1024 / 1024:.1f} MB → 块+清单 "
+          f"{stats['stored_bytes'] / 1024 / 1024:.2f} MB（{stats['ratio']:.0f} 倍），"
+          f"数据库文件 {file_size / 1024 / 1024:.2f} MB（{logical / file_size:.0f} 倍）")
+
+    # 按时间点取回：随机设备 + 随机时间点（取该时刻之前最新的版本）
+    ips = list(configs)
+    start = time.perf_counter()
+    queries = 1000
+    for _ in range(queries):
+        ip = rnd.choice(ips)
+        store.get(ip, (datetime(2026, 1, 1, 12) + timedelta(days=rnd.randrange(days))).strftime("%Y-%m-%d %H:%M:%S"))
+    per_query = (time.perf_counter() - start) / queries
+    print(f"取回：{queries} 次随机时间点查询，平均 {per_query * 1000:.2f} ms/次")
+
+    bad = [k for k, text in truth.items() if store.get(*k) != text]
+    print(f"校验：抽样 {len(truth)} 个版本，{'全部一致' if not bad else f'{len(bad)} 个不一致'}")
+    store.close()
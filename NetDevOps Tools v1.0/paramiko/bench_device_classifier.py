@@ -0,0 +1,73 @@
+import json
+import os
+import random
+import sys
+import time
+from device_classifier import classify, classify_many
+
+"""
+device_classifier 回归校验 + 基准测试
+- 回归：逐条核对 banner_corpus.json（厂商 + 平台），有不一致时退出码为 1
+- 对比：旧版关键字扫描（各脚本里复制的 detect_device_type）在同一语料上的准确率
+- 测速：把语料随机拼上登录提示 / 公告行，批量识别 N 条 banner，输出每秒条数
+运行：python bench_device_classifier.py [条数=200000]
+"""
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "banner_corpus.json")
+
+NOISE_LINES = [
+    "Last login: Tue Feb  3 09:12:11 2026 from 10.0.0.5",
+    "**** Authorized access only. All activity is logged. ****",
+    "Please change the default password after first login.",
+    "The current login time is 2026-02-03 10:12:45.",
+]
+
+
+def legacy_detect(initial_output: str) -> str:
+    """旧版识别逻辑（原样保留，仅用于对比）"""
+    lower_text = initial_output.lower()
+    if any(word in lower_text for word in ['huawei', 'vrp', 'ne', 's series', '<huawei>', '[quidway]', 'sysname']):
+        return 'huawei'
+    if any(word in lower_text for word in ['cisco', 'ios', 'xe', 'catalyst', 'nexus']):
+        return 'cisco'
+    return 'cisco'
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with open(CORPUS_FILE, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    failed = []
+    legacy_ok = 0
+    for case in corpus:
+        got = classify(case['banner'])
+        if (got['vendor'], got['platform']) != (case['vendor'], case['platform']):
+            failed.append((case, got))
+        expected = case['vendor'] if case['vendor'] in ('huawei', 'cisco') else 'cisco'
+        legacy_ok += legacy_detect(case['banner']) == expected
+    print(f"回归：{len(corpus)} 条样本，{len(corpus) - len(failed)} 条通过")
+    for case, got in failed:
+        print(f"  不一致：{case['banner'][:50]!r} 期望 {case['vendor']}/{case['platform']}，"
+              f"得到 {got['vendor']}/{got['platform']}")
+    print(f"旧版关键字扫描：{legacy_ok}/{len(corpus)} 条正确（只区分华为 / 思科，其余按思科计）")
+
+    rnd = random.Random(7)
+    banners = []
+    for _ in range(count):
+        noise = "\r\n".join(rnd.sample(NOISE_LINES, rnd.randint(0, 3)))
+        banners.append(noise + "\r\n" + rnd.choice(corpus)['banner'])
+    size = sum(len(b) for b in banners)
+
+    start = time.perf_counter()
+    classify_many(banners)
+    new_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for b in banners:
+        legacy_detect(b)
+    old_elapsed = time.perf_counter() - start
+
+    print(f"\n测速：{count} 条 banner，共 {size / 1024 / 1024:.1f} MB")
+    print(f"  classify       {new_elapsed:6.2f} 秒  {count / new_elapsed:9.0f} 条/秒")
+    print(f"  旧版关键字扫描 {old_elapsed:6.2f} 秒  {count / old_elapsed:9.0f} 条/秒（不计分、不识别平台）")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,88 @@
+import re
+import sys
+import time
+from output_cleaner import clean_output, iter_clean
+
+"""
+output_cleaner 基准测试：模拟一份 20 万行的 show running-config
+- 开头是命令回显，结尾是提示符，约 2% 的行带 ANSI 颜色码
+- 对比：旧版 clean_output（每次调用重新编译正则、每行做子串查找 + re.match）
+        旧版关键字模式（每行 lower() 后逐个关键字查找）
+        新版整段 clean_output、新版逐行 iter_clean（流式）、新版关键字模式
+- 同时校验新旧两版的结果一致（这份输出里没有会让两者行为不同的行）
+运行：python bench_output_cleaner.py [行数=200000]
+"""
+
+COMMAND = "show running-config"
+
+
+def legacy_clean_output(raw_output: str, sent_command: str) -> str:
+    """旧版（v1.3 / async 引擎）实现，原样保留用于对比"""
+    raw_output = re.sub(r'\x1B\[[0-9;]*[mK]', '', raw_output)
+    lines = raw_output.splitlines()
+    cleaned = []
+    for line in lines:
+        stripped = line.rstrip()
+        if not stripped or sent_command in stripped: continue
+        if re.match(r'^[\w\.-]*[>#\[\]<]\s*$', stripped): continue
+        cleaned.append(stripped)
+    return "\n".join(cleaned).strip()
+
+
+def legacy_keyword_filter(raw_output: str, sent_command: str) -> str:
+    """旧版（v1.1 / v1.2）关键字模式"""
+    raw_output = re.sub(r'\x1B\[[0-9;]*[mK]', '', raw_output)
+    cleaned = []
+    for line in raw_output.splitlines():
+        stripped = line.rstrip()
+        if not stripped:
+            continue
+        if sent_command in stripped or stripped.endswith(sent_command):
+            continue
+        if re.match(r'^[\w\.-]*[>#\[\]<]\s*$', stripped):
+            continue
+        if any(kw in stripped.lower() for kw in ['ok', 'building configuration', 'configuration', '成功', 'committed', 'wrote']):
+            cleaned.append(stripped)
+    return "\n".join(cleaned).strip()
+
+
+def make_output(n_lines: int) -> str:
+    lines = [f"SW-CORE-01#{COMMAND}", "Building configuration...", "", "Current configuration : 123456 bytes", "!"]
+    port = 0
+    while len(lines) < n_lines - 2:
+        port += 1
+        desc = f" description TO-ROOM-{port % 997}-PC{port}"
+        if port % 50 == 0:
+            desc = f"\x1b[1m{desc}\x1b[0m"
+        lines += [f"interface GigabitEthernet{port // 48}/0/{port % 48}", desc,
+                  " switchport mode access", f" switchport access vlan {10 + port % 20}", "!"]
+    lines += ["end", "SW-CORE-01#"]
+    return "\r\n".join(lines)
+
+
+def timed(label: str, func, size_mb: float, n_lines: int):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:6.3f} 秒  {n_lines / elapsed / 1000:8.0f} 千行/秒  {size_mb / elapsed:7.1f} MB/秒")
+    return result
+
+
+if __name__ == '__main__':
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    raw = make_output(n_lines)
+    size_mb = len(raw.encode('utf-8')) / 1024 / 1024
+    print(f"模拟输出：{n_lines} 行，{size_mb:.1f} MB\n")
+
+    old = timed("旧版 clean_output", lambda: legacy_clean_output(raw, COMMAND), size_mb, n_lines)
+    new = timed("新版 clean_output", lambda: clean_output(raw, COMMAND), size_mb, n_lines)
+    streamed = timed("新版 iter_clean（逐行）",
+                     lambda: "\n".join(iter_clean(iter(raw.split("\n")), COMMAND)), size_mb, n_lines)
+    old_kw = timed("旧版关键字模式", lambda: legacy_keyword_filter(raw, COMMAND), size_mb, n_lines)
+    new_kw = timed("新版关键字模式",
+                   lambda: clean_output(raw, COMMAND, keywords=('ok', 'building configuration', 'configuration',
+                                                                '成功', 'committed', 'wrote')), size_mb, n_lines)
+
+    same = old == new == streamed and old_kw == new_kw
+    print(f"\n结果一致：{'是' if same else '否'}（清理后 {old.count(chr(10)) + 1} 行）")
+    sys.exit(0 if same else 1)
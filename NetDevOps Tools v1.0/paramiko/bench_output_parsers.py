@@ -0,0 +1,66 @@
+import sys
+import time
+from fake_device import ip_interface_brief, show_version
+from output_cleaner import clean_output
+from output_parsers import TEMPLATES, Template, get_parser, parse_fleet
+
+"""
+output_parsers 基准测试（模拟设备的输出生成器造数据，不需要真机）
+- 大输出：一份 N 个接口的 show ip interface brief / display ip interface brief，单次解析的行吞吐
+- 批量：M 台设备（思科 / 华为各半）的 version + ip interface brief 结果一起 parse_fleet
+- 对比：每次调用重新编译模板（相当于每台设备都打开模板文件建 TextFSM 对象）与缓存的已编译模板
+- 同时校验解析出的记录数与生成的接口数一致
+运行：python bench_output_parsers.py [接口数=100000] [设备数=20000]
+"""
+
+FLEET_INTERFACES = 24   # 批量测试里每台设备的接口数
+
+
+def timed(label: str, func, n_lines: int):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed:6.3f} 秒  {n_lines / elapsed / 1000:8.0f} 千行/秒")
+    return result
+
+
+def make_fleet(count: int):
+    fleet = []
+    for i in range(count):
+        vendor = 'huawei' if i % 2 else 'cisco'
+        prefix = 'display' if vendor == 'huawei' else 'show'
+        outputs = {f"{prefix} version": show_version(vendor, f"SW-{i}"),
+                   f"{prefix} ip interface brief": ip_interface_brief(vendor, FLEET_INTERFACES)}
+        fleet.append((f"10.{i // 62500}.{i // 250 % 250}.{i % 250}", vendor,
+                      {c: clean_output(o, c) for c, o in outputs.items()}))
+    return fleet
+
+
+if __name__ == '__main__':
+    n_interfaces = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_devices = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    ok = True
+
+    print(f"大输出：{n_interfaces} 个接口")
+    for vendor, command in (('cisco', 'show ip interface brief'), ('huawei', 'display ip interface brief')):
+        text = clean_output(ip_interface_brief(vendor, n_interfaces), command)
+        n_lines = text.count("\n") + 1
+        records = timed(f"{vendor} {command}", lambda: get_parser(vendor, command).parse(text), n_lines)
+        ok &= len(records) == n_interfaces
+
+    fleet = make_fleet(n_devices)
+    n_lines = sum(o.count("\n") + 1 for _, _, outputs in fleet for o in outputs.values())
+    print(f"\n批量：{n_devices} 台设备，共 {n_lines} 行")
+
+    def uncached():
+        return {host: {c: Template(TEMPLATES[(vendor, c)]).parse(o) for c, o in outputs.items()}
+                for host, vendor, outputs in fleet}
+
+    slow = timed("每次重新编译模板", uncached, n_lines)
+    fast = timed("已编译模板缓存（parse_fleet）", lambda: parse_fleet(fleet), n_lines)
+    interfaces = sum(len(r) for parsed in fast.values() for c, r in parsed.items() if 'interface' in c)
+    versions = sum(1 for parsed in fast.values() for c, r in parsed.items() if 'version' in c and r[0]['version'])
+    ok &= slow == fast and interfaces == n_devices * FLEET_INTERFACES and versions == n_devices
+
+    print(f"\n结果校验：{'通过' if ok else '失败'}（接口 {interfaces} 条，版本 {versions} 条）")
+    sys.exit(0 if ok else 1)
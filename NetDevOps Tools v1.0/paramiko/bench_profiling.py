@@ -0,0 +1,60 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from profiling import Profiler
+
+"""
+profiling 自检 + 开销测试：在 Profiler 里跑一批 ThreadPoolExecutor 任务（和 run_fleet 一样在 worker 线程里干活）
+- 校验：不抛异常、三份报告都写出来、CPU 报告里能看到只在 worker 线程里执行的函数、内存报告里能看到 worker 的分配
+- 对比同一批任务剖析前后的用时，给出剖析开销
+运行：python bench_profiling.py [任务数=200] [worker 数=20]
+"""
+
+
+def worker_hot_loop(n: int) -> int:
+    """只在 worker 线程里调用，用来确认 worker 线程被剖析到"""
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def worker_allocate(n: int) -> list:
+    return ["x" * 100 for _ in range(n)]
+
+
+def run_batch(tasks: int, workers: int) -> list:
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        sums = list(pool.map(worker_hot_loop, [20000] * tasks))
+        kept = list(pool.map(worker_allocate, [200] * tasks))
+    return [sums, kept]
+
+
+if __name__ == '__main__':
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    out_dir = tempfile.mkdtemp(prefix="profiles_")
+    print(f"Python {sys.version.split()[0]}：{tasks} 个任务，{workers} 个 worker 线程")
+
+    start = time.perf_counter()
+    run_batch(tasks, workers)
+    plain = time.perf_counter() - start
+
+    profiler = Profiler('selfcheck', out_dir)
+    start = time.perf_counter()
+    with profiler:
+        kept = run_batch(tasks, workers)
+    profiled = time.perf_counter() - start
+    print(f"  不剖析 {plain:.2f}s，剖析 {profiled:.2f}s（含写报告），开销 {profiled / plain:.1f} 倍")
+
+    ok = len(profiler.reports) == 3 and all(os.path.getsize(p) for p in profiler.reports)
+    if ok:
+        cpu = open(profiler.reports[1], encoding='utf-8').read()
+        mem = open(profiler.reports[2], encoding='utf-8').read()
+        ok = 'worker_hot_loop' in cpu and 'bench_profiling.py' in mem
+    print(f"\n结果校验：{'通过' if ok else '失败'}")
+    shutil.rmtree(out_dir)
+    sys.exit(0 if ok else 1)
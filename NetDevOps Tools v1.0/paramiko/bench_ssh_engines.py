@@ -0,0 +1,174 @@
+import asyncio
+import multiprocessing as mp
+import os
+import resource
+import socket
+import statistics
+import sys
+import time
+from queue import Empty
+from typing import Callable, Dict, List, Tuple
+from benchutil import device_addresses, load_script, percentile
+from fake_ssh_device import FakeSSHServer
+
+"""
+SSH 执行器基准测试（对着本地模拟设备跑，不需要 EVE-NG 实验环境）
+- 模拟设备跑在单独的子进程里（fake_ssh_device，思科 / 华为各半，地址 127.0.1.x，同一端口）
+- 每个执行器在自己的子进程里测，CPU / 内存互不干扰：
+  - 单台时延：顺序执行前 SAMPLES 台，统计 平均 / p50 / p95
+  - 批量吞吐：全部设备按并发数同时执行，记录总用时、台/秒、成功数
+  - 每会话资源：批量阶段本进程 CPU 时间 / 台数，峰值 RSS 增量 / 并发数
+- 执行器：v3.0 / v1.2 的 network_ssh_execute、v1.3 的 run_task（DeviceSession）、async_ssh_engine
+- 每台设备的任务相同：登录 → 识别类型 → 提权 → 关闭分页 → 抓取配置
+运行：python bench_ssh_engines.py [设备数=40] [并发=20] [配置行数=2000] [命令延迟毫秒=0]
+"""
+
+USERNAME, PASSWORD, ENABLE = 'admin', 'admin', 'enable'
+COMMANDS = {'cisco': ['show running-config'], 'huawei': ['display current-configuration']}
+SAMPLES = 5
+SERVER_PROCESSES = 2
+EXECUTORS = ['v3.0', 'v1.2', 'v1.3', 'async']
+EXECUTOR_TIMEOUT = 900   # 单个执行器的测试超时（秒）
+
+
+# ─── 模拟设备进程 ────────────────────────────────────────────────
+def serve(addresses: List[str], port: int, overrides: Dict, ready):
+    server = FakeSSHServer(port)
+    for i, address in enumerate(addresses):
+        server.add_device(address, 'cisco' if i % 2 == 0 else 'huawei', **overrides)
+    server.start()
+    ready.set()
+    while True:
+        time.sleep(3600)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.1.1', 0))
+        return s.getsockname()[1]
+
+
+# ─── 执行器 ────────────────────────────────────────────────
+def make_executor(name: str) -> Tuple[Callable[[str, int], bool], Callable[[List[str], int, int], int]]:
+    """返回 (单台执行, 批量执行)；单台返回是否成功，批量返回成功台数"""
+    if name == 'async':
+        import async_ssh_engine
+
+        def one(host: str, port: int) -> bool:
+            device_type, outputs = asyncio.run(async_ssh_engine.network_ssh_execute_async(
+                host, USERNAME, PASSWORD, COMMANDS, port=port, privilege_password=ENABLE, verbose=False))
+            return device_type != 'unknown' and bool(outputs)
+
+        def many(hosts: List[str], port: int, concurrency: int) -> int:
+            results = asyncio.run(async_ssh_engine.run_fleet_async(
+                hosts, USERNAME, PASSWORD, COMMANDS, max_sessions=concurrency,
+                port=port, privilege_password=ENABLE, verbose=False))
+            return sum(1 for device_type, outputs in results.values() if device_type != 'unknown' and outputs)
+        return one, many
+
+    if name == 'v1.3':
+        tools = load_script('2026-3-9-paramiko-tools-v1.3.py')
+
+        def one(host: str, port: int) -> bool:
+            return tools.run_task(host, USERNAME, PASSWORD, 'backup', ENABLE, 'ssh', port=port) is not None
+    else:
+        script = load_script('2026-2-3-paramiko-ssh-v3.0.py' if name == 'v3.0' else '2026-3-3-paramiko-tools-v1.2.py')
+
+        def one(host: str, port: int) -> bool:
+            device_type, outputs = script.network_ssh_execute(
+                host, USERNAME, PASSWORD, COMMANDS, port=port, privilege_password=ENABLE)
+            return device_type != 'unknown' and bool(outputs)
+
+    def many(hosts: List[str], port: int, concurrency: int) -> int:
+        from fleet_executor import run_fleet
+        summary = run_fleet([(h, 'ssh') for h in hosts], lambda h, m: one(h, port) or None,
+                            max_workers=concurrency, protocol_limits={'ssh': concurrency})
+        return summary['success']
+    return one, many
+
+
+def current_rss() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def bench_executor(name: str, hosts: List[str], port: int, concurrency: int, queue):
+    """在子进程里运行；执行器的打印全部丢弃，结果放进 queue"""
+    sys.stdout = open(os.devnull, 'w')
+    one, many = make_executor(name)
+
+    latencies = []
+    for host in hosts[:SAMPLES]:
+        start = time.perf_counter()
+        ok = one(host, port)
+        latencies.append(time.perf_counter() - start if ok else float('nan'))
+
+    rss_before = current_rss()
+    cpu_before = cpu_seconds()
+    start = time.perf_counter()
+    success = many(hosts, port, concurrency)
+    makespan = time.perf_counter() - start
+    cpu = cpu_seconds() - cpu_before
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    ok_latencies = sorted(x for x in latencies if x == x)
+    queue.put({
+        'name': name,
+        'samples': len(ok_latencies),
+        'mean': statistics.mean(ok_latencies) if ok_latencies else float('nan'),
+        'p50': percentile(ok_latencies, 0.5),
+        'p95': percentile(ok_latencies, 0.95),
+        'success': success,
+        'makespan': makespan,
+        'cpu_per_session': cpu / len(hosts),
+        'mem_per_session': max(0, peak - rss_before) / min(concurrency, len(hosts)),
+    })
+
+
+if __name__ == '__main__':
+    n_devices = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    config_lines = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    latency_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+
+    hosts = device_addresses(n_devices)
+    port = free_port()
+    overrides = {'config_lines': config_lines, 'latency': latency_ms / 1000}
+    servers = []
+    for i in range(SERVER_PROCESSES):
+        ready = mp.Event()
+        p = mp.Process(target=serve, args=(hosts[i::SERVER_PROCESSES], port, overrides, ready), daemon=True)
+        p.start()
+        ready.wait(30)
+        servers.append(p)
+    print(f"模拟设备：{n_devices} 台（{SERVER_PROCESSES} 个服务进程，端口 {port}），"
+          f"配置 {config_lines} 行，命令延迟 {latency_ms:.0f} ms；批量并发 {concurrency}\n")
+
+    print(f"{'执行器':<8}{'单台平均':>9}{'p50':>8}{'p95':>8}{'批量用时':>10}{'台/秒':>8}{'成功':>8}"
+          f"{'CPU/台':>10}{'内存/会话':>11}")
+    try:
+        for name in EXECUTORS:
+            queue = mp.Queue()
+            p = mp.Process(target=bench_executor, args=(name, hosts, port, concurrency, queue))
+            p.start()
+            try:
+                r = queue.get(timeout=EXECUTOR_TIMEOUT)
+            except Empty:
+                print(f"{name:<11}超过 {EXECUTOR_TIMEOUT} 秒未完成，跳过")
+                p.terminate()
+                continue
+            p.join()
+            print(f"{r['name']:<11}{r['mean']:>8.2f}s{r['p50']:>7.2f}s{r['p95']:>7.2f}s{r['makespan']:>9.2f}s"
+                  f"{n_devices / r['makespan']:>9.1f}{r['success']:>6}/{n_devices:<4}"
+                  f"{r['cpu_per_session'] * 1000:>7.1f}ms{r['mem_per_session'] / 1024:>9.0f}KB")
+    finally:
+        for p in servers:
+            p.terminate()
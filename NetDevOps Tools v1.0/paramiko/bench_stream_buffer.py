@@ -0,0 +1,55 @@
+import re
+import time
+from stream_buffer import StreamBuffer
+
+"""
+StreamBuffer 性能对比
+- 模拟从通道按 8KB 一块收到 display current-configuration，最后一块带提示符
+- 旧写法：output += chunk，然后对整个 output 做 re.search（平方级）
+- 新写法：StreamBuffer.feed + search_tail（线性）
+运行：python bench_stream_buffer.py
+"""
+
+PROMPT = r'[\<\[][\w\.-]+[\>\]]\s*$'
+CHUNK = 8192
+
+
+def make_chunks(size_bytes: int):
+    line = b" port link-type trunk\r\n port trunk allow-pass vlan 10 20 30\r\n#\r\n"
+    body = line * (size_bytes // len(line)) + b"return\r\n<CORE-SW1>"
+    return [body[i:i + CHUNK] for i in range(0, len(body), CHUNK)]
+
+
+def old_way(chunks):
+    output = ""
+    for chunk in chunks:
+        output += chunk.decode('utf-8', errors='replace')
+        if re.search(PROMPT, output, re.MULTILINE | re.DOTALL):
+            break
+    return output
+
+
+def new_way(chunks):
+    buf = StreamBuffer()
+    for chunk in chunks:
+        buf.feed(chunk)
+        if buf.search_tail(PROMPT, re.MULTILINE):
+            break
+    return buf.getvalue()
+
+
+def timeit(fn, chunks) -> float:
+    start = time.perf_counter()
+    fn(chunks)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    print(f"{'大小':>8} {'旧写法(s)':>12} {'StreamBuffer(s)':>16} {'新写法 MB/s':>12}")
+    for mb in (0.25, 0.5, 1, 2, 4, 16):
+        chunks = make_chunks(int(mb * 1024 * 1024))
+        assert old_way(chunks[:4]) == new_way(chunks[:4])
+        old = timeit(old_way, chunks) if mb <= 4 else float('nan')
+        new = timeit(new_way, chunks)
+        print(f"{mb:>6}MB {old:>12.3f} {new:>16.4f} {mb / new:>12.0f}")
+    print("\n旧写法大小翻倍耗时约翻 4 倍；StreamBuffer 耗时与大小成正比")
@@ -0,0 +1,71 @@
+import contextlib
+import os
+import sys
+import time
+from typing import Callable, Dict
+from benchutil import device_addresses, load_script, percentile
+from fake_telnet_device import FakeTelnetServer
+from fleet_executor import run_fleet
+
+"""
+Telnet 路径基准测试（对着进程内的 fake_telnet_device 跑，不需要真机）
+- 模拟设备：N 台思科（v1.2 的 Telnet 分支只支持思科），地址 127.0.2.x，同一端口
+- 执行器：v1.2 network_telnet_execute（write memory）、v1.3 run_task 的 Telnet 分支（save）
+- 单台时延：顺序执行前 SAMPLES 台
+- 批量：按给定的各档并发（默认 20 / 100 / 300）同时执行全部设备，
+  输出总用时、台/秒、成功数、单台用时 p50 / p95 / 最大，以及模拟设备端的峰值在线会话数
+运行：python bench_telnet.py [设备数=300] [并发档位=20,100,300] [命令延迟毫秒=0]
+"""
+
+USERNAME, PASSWORD, ENABLE = 'admin', 'admin', 'enable'
+SAMPLES = 3
+
+
+def make_executors(port: int) -> Dict[str, Callable[[str], bool]]:
+    v12 = load_script('2026-3-3-paramiko-tools-v1.2.py')
+    v13 = load_script('2026-3-9-paramiko-tools-v1.3.py')
+    return {
+        'v1.2': lambda host: v12.network_telnet_execute(
+            host, USERNAME, PASSWORD, ["write memory"], privilege_password=ENABLE, port=port),
+        'v1.3': lambda host: v13.run_task(
+            host, USERNAME, PASSWORD, 'save', ENABLE, 'telnet', port=port) is not None,
+    }
+
+
+if __name__ == '__main__':
+    n_devices = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    levels = [int(x) for x in sys.argv[2].split(',')] if len(sys.argv) > 2 else [20, 100, 300]
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+    server = FakeTelnetServer()
+    hosts = []
+    for address in device_addresses(n_devices, first_block=2):
+        server.add_device(address, 'cisco', latency=latency_ms / 1000)
+        hosts.append(address)
+    server.start()
+    executors = make_executors(server.port)
+    print(f"模拟设备：{n_devices} 台思科 Telnet（端口 {server.port}），命令延迟 {latency_ms:.0f} ms\n")
+
+    try:
+        for name, worker in executors.items():
+            latencies = []
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                for host in hosts[:SAMPLES]:
+                    start = time.perf_counter()
+                    ok = worker(host)
+                    latencies.append(time.perf_counter() - start if ok else float('nan'))
+            print(f"{name}  单台（顺序 {SAMPLES} 台）：" + "  ".join(f"{x:.2f}s" for x in latencies))
+
+            for concurrency in levels:
+                server.peak_active = 0
+                with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                    summary = run_fleet([(h, 'telnet') for h in hosts], lambda h, m: worker(h) or None,
+                                        max_workers=concurrency, protocol_limits={'telnet': concurrency})
+                elapsed = sorted(r['elapsed'] for r in summary['results'].values())
+                print(f"  并发 {concurrency:>4}：总用时 {summary['elapsed']:6.2f}s  "
+                      f"{n_devices / summary['elapsed']:6.1f} 台/秒  成功 {summary['success']}/{n_devices}  "
+                      f"单台 p50 {percentile(elapsed, 0.5):5.2f}s  p95 {percentile(elapsed, 0.95):5.2f}s  "
+                      f"最大 {elapsed[-1]:5.2f}s  设备端峰值会话 {server.peak_active}")
+            print()
+    finally:
+        server.stop()
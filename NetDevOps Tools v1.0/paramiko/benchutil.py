@@ -0,0 +1,32 @@
+import importlib.util
+import os
+from typing import List
+
+"""
+基准测试 / 模拟脚本共用的小工具（bench_ssh_engines、bench_telnet、fleet_simulator）
+- load_script：按文件名加载带日期前缀的脚本
+- device_addresses：模拟设备的本地回环地址
+- percentile：已排序数据的分位数
+"""
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(filename: str):
+    """按文件名加载带日期前缀的脚本（文件名不是合法模块名）"""
+    name = "script_" + filename.replace('-', '_').replace('.py', '').replace('.', '_')
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def device_addresses(count: int, first_block: int = 1) -> List[str]:
+    """127.0.<first_block>.1 起，每段 250 个地址"""
+    return [f"127.0.{first_block + i // 250}.{1 + i % 250}" for i in range(count)]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+from atomic_file import atomic_write
+
+"""
+配置变化检测：配置没变的设备不再完整下载 / 上传
+- 先发一条很短的厂商命令取“变更标记”（思科的 Last configuration change 时间、华为的配置变更时间）
+  与上次备份时记录的一致 → 直接判定未变化，不传输完整配置
+- 取不到标记的设备（命令不支持等）退回到内容哈希：抓完配置后与上次哈希比较，一致则不上传
+- 状态索引保存在本地 JSON：{ip: {marker, hash, time}}，上传成功后才写入
+"""
+
+STATE_FILE = "backup_state.json"
+
+CHANGE_MARKER_COMMANDS = {
+    'cisco': 'show running-config | include Last configuration change',
+    'huawei': 'display changed-configuration time',   # 部分 VRP 版本不支持，会自动退回哈希比较
+}
+
+ERROR_HINTS = ('% invalid', '% incomplete', '% unrecognized', 'error:', 'unrecognized command', 'wrong parameter')
+
+# 计算哈希时忽略的易变行（时间戳、字节数等，不代表配置变化）
+VOLATILE_LINE = re.compile(
+    r'^(!\s*Last configuration change|!\s*NVRAM config last updated|!\s*No configuration change'
+    r'|Current configuration\s*:|Building configuration|ntp clock-period|!Time:|!Last configuration was)',
+    re.IGNORECASE
+)
+
+
+def normalize_marker(output: str) -> Optional[str]:
+    """清理标记命令的输出；设备不支持该命令或输出为空时返回 None"""
+    lines = [l.strip() for l in output.splitlines() if l.strip()]
+    if not lines or any(h in l.lower() for l in lines for h in ERROR_HINTS):
+        return None
+    return " | ".join(lines)
+
+
+class ConfigHasher:
+    """
+    包装配置行迭代器，边产出边计算哈希（用于流式备份）
+    complete 只有在底层迭代器正常结束（命令回到提示符）后才为 True，中途断开 / 超时 / 没读完的哈希不能入状态索引
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        self.lines = lines
+        self.sha = hashlib.sha256()
+        self.complete = False
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.lines:
+            if not VOLATILE_LINE.match(line):
+                self.sha.update(line.encode('utf-8') + b"\n")
+            yield line
+        self.complete = True
+
+    def hexdigest(self) -> str:
+        return self.sha.hexdigest()
+
+
+def content_hash(config: str) -> str:
+    hasher = ConfigHasher(config.splitlines())
+    for _ in hasher:
+        pass
+    return hasher.hexdigest()
+
+
+# ─── 状态索引 ────────────────────────────────────────────────
+class BackupStateIndex:
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state: Dict[str, Dict[str, str]] = {}
+        self.pending: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取 {path} 失败，当作首次备份: {e}")
+
+    def is_unchanged(self, host: str, marker: Optional[str] = None, digest: Optional[str] = None) -> bool:
+        with self.lock:
+            last = self.state.get(host)
+        if not last:
+            return False
+        if marker is not None:
+            return last.get('marker') == marker
+        return digest is not None and last.get('hash') == digest
+
+    def stage(self, host: str, marker: Optional[str], digest: str):
+        """记录本次结果，等上传成功后 commit"""
+        with self.lock:
+            self.pending[host] = {'marker': marker, 'hash': digest,
+                                  'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+    def commit(self, host: str):
+        with self.lock:
+            entry = self.pending.pop(host, None)
+            if entry:
+                self.state[host] = entry
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.state, ensure_ascii=False, indent=1)
+        atomic_write(self.path, data)
+
+
+def read_change_marker(session) -> Optional[str]:
+    """在已登录的 DeviceSession 上取变更标记"""
+    cmd = CHANGE_MARKER_COMMANDS.get(session.device_type)
+    if not cmd:
+        return None
+    output = session.send_and_wait(cmd, timeout=15)
+    lines = [l for l in output.splitlines() if cmd not in l and not session.prompt_re.search(l)]
+    return normalize_marker("\n".join(lines))
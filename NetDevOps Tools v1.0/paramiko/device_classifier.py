@@ -0,0 +1,100 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+"""
+多厂商设备识别（取代各脚本里复制的 detect_device_type）
+- 规则表：(厂商, 平台, 正则, 权重)，启动时合成一个预编译正则，一次扫描就得到所有命中的规则
+  （关键字规则在转小写后的全文上扫描，提示符外形规则只看最后一行）
+- 每条规则最多计一次分，按厂商累加；得分最高者胜出，置信度 = 最高分 / 所有厂商得分之和
+- 平台取该厂商命中的平台专属规则中权重最高的一个（如 IOS-XE、NX-OS），否则为厂商默认平台
+- 关键字都按单词边界匹配，不再出现 'ne' / 'xe' 这种几乎匹配任何 banner 的误判
+- 新增厂商只需往 RULES 里加行；banner_corpus.json 是回归样本，bench_device_classifier.py 校验并测速
+"""
+
+# 关键字规则 (厂商, 平台, 正则, 权重)：正则写小写，匹配转小写后的文本，开头统一加 \b；平台为 None 表示只给厂商加分
+# 同一位置只有排在前面的规则能命中，所以更具体的写法放在前面
+RULES: List[Tuple[str, Optional[str], str, int]] = [
+    ('huawei', 'vrp', r'versatile\s+routing\s+platform', 5),
+    ('huawei', 'vrp', r'vrp\b', 3),
+    ('huawei', None, r'huawei\b', 4),
+    ('huawei', None, r'quidway\b', 4),
+    ('huawei', None, r'sysname\b', 1),
+    ('h3c', 'comware', r'comware\b', 5),
+    ('h3c', None, r'h3c\b', 4),
+    ('cisco', 'nx-os', r'nx-os\b|nexus\s+operating\s+system\b', 5),
+    ('cisco', 'ios', r'cisco\s+ios\s+software\b', 5),
+    ('cisco', 'ios-xe', r'ios[\s-]xe\b', 5),
+    ('cisco', 'ios-xr', r'ios[\s-]xr\b', 5),
+    ('cisco', 'nx-os', r'nexus\b', 3),
+    ('cisco', None, r'cisco\b', 4),
+    ('cisco', None, r'catalyst\b', 3),
+    ('cisco', None, r'user\s+access\s+verification', 2),
+    ('juniper', 'junos', r'junos\b', 5),
+    ('juniper', None, r'juniper\b', 4),
+    ('arista', 'eos', r'arista\b', 5),
+    ('arista', 'eos', r'eos\b', 2),
+]
+
+# 提示符外形规则，只匹配最后一个非空行（登录后的第一个提示符）
+# <SW1> / [SW1] 华为与 H3C 共用，只给华为加 1 分（H3C 靠关键字区分）；SW1# / SW1> 为思科风格
+PROMPT_RULES: List[Tuple[str, Optional[str], str, int]] = [
+    ('juniper', 'junos', r'[\w.\-]+@[\w.\-]+[>%#]', 2),
+    ('huawei', None, r'[<\[][~*]?[\w.\-/]+[>\]]', 1),
+    ('cisco', None, r'[\w.\-/]+(?:\([\w.\-/]+\))?[>#]', 1),
+]
+
+DEFAULT_PLATFORM = {'huawei': 'vrp', 'h3c': 'comware', 'cisco': 'ios', 'juniper': 'junos', 'arista': 'eos'}
+SUPPORTED = ('huawei', 'cisco')   # DEVICE_CONFIG 里有命令表的厂商
+
+_ALL_RULES = RULES + PROMPT_RULES
+# 先用首字母做一次廉价的前置判断，大部分位置直接跳过，不逐条尝试各分支
+_FIRST_CHARS = re.escape("".join(sorted({rule[2][0] for rule in RULES})))
+_MATCHER = re.compile(rf"\b(?=[{_FIRST_CHARS}])(?:"
+                      + "|".join(f"(?P<r{i}>{rule[2]})" for i, rule in enumerate(RULES)) + ")")
+_PROMPT_MATCHER = re.compile("|".join(f"(?P<r{i + len(RULES)}>{rule[2]})"
+                                      for i, rule in enumerate(PROMPT_RULES)))
+_VENDOR_ORDER = {v: i for i, v in enumerate(dict.fromkeys(r[0] for r in _ALL_RULES))}
+
+
+def classify(text: str) -> Dict:
+    """
+    识别 banner / 初始输出 / SSH 版本串
+    返回 {'vendor', 'platform', 'score', 'confidence'}；无任何命中时 vendor 为 'unknown'
+    """
+    text = text or ""
+    hit = {int(m.lastgroup[1:]) for m in _MATCHER.finditer(text.lower())}
+    last_line = text.rstrip().rsplit("\n", 1)[-1].strip()
+    m = _PROMPT_MATCHER.fullmatch(last_line)
+    if m:
+        hit.add(int(m.lastgroup[1:]))
+    if not hit:
+        return {'vendor': 'unknown', 'platform': None, 'score': 0, 'confidence': 0.0}
+
+    scores: Dict[str, int] = {}
+    platforms: Dict[str, Tuple[int, str]] = {}
+    for i in hit:
+        vendor, platform, _, weight = _ALL_RULES[i]
+        scores[vendor] = scores.get(vendor, 0) + weight
+        if platform and weight > platforms.get(vendor, (0, ""))[0]:
+            platforms[vendor] = (weight, platform)
+
+    vendor = max(scores, key=lambda v: (scores[v], -_VENDOR_ORDER[v]))
+    platform = platforms.get(vendor, (0, DEFAULT_PLATFORM.get(vendor)))[1]
+    return {'vendor': vendor, 'platform': platform, 'score': scores[vendor],
+            'confidence': round(scores[vendor] / sum(scores.values()), 3)}
+
+
+def classify_many(texts: Iterable[str]) -> List[Dict]:
+    return [classify(t) for t in texts]
+
+
+def detect_device_type(initial_output: str, default: str = 'cisco') -> str:
+    """根据初始 banner 判断设备类型，只返回有命令表的厂商；识别不了时用 default 并给出警告"""
+    vendor = classify(initial_output)['vendor']
+    if vendor in SUPPORTED:
+        return vendor
+    if vendor == 'unknown':
+        print(f"警告：无法自动识别设备类型，默认使用 {default.capitalize()} 配置")
+    else:
+        print(f"警告：识别为 {vendor}，暂无对应命令表，按 {default.capitalize()} 处理")
+    return default
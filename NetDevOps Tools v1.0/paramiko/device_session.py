@@ -0,0 +1,408 @@
+import codecs
+import hashlib
+import paramiko
+import re
+import socket
+import telnetlib
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from prompt_expect import (GENERIC_PROMPT, INTERACTIVE_PROMPT, TAIL_SIZE, learn_prompt, prompt_pattern,
+                           channel_reader, telnet_reader, expect, wait_readable)
+from fingerprint import FingerprintCache, plausible_prompt, ssh_remote_version
+from device_classifier import detect_device_type
+from session_metrics import SessionMetrics
+from tracing import Tracer, maybe_span
+
+"""
+设备会话 + 会话池（供 paramiko-tools 等脚本 import 使用）
+- DeviceSession：一次登录完成 认证 → 识别类型 → 提权 → 关闭分页，之后可反复发命令
+  - 登录时学习真实提示符，命令在提示符 / 交互问题出现时立即返回，不再固定 sleep
+  - 传入 FingerprintCache 时，厂商优先由 SSH 版本串 / 指纹缓存确定，登录后写回缓存
+  - 传入 SessionMetrics 时，记录建连 / 认证 / 等提示符 / 提权 / 关分页 / 每条命令的用时和收到的字节数
+  - 传入 Tracer 时，同样的阶段和每条命令记成 span，挂在 run_fleet 的 host span 下面
+- SessionPool：菜单里连续执行多个任务时复用已登录的会话，不再每个任务重新登录
+  - SSH 用 transport keepalive，Telnet 由后台线程定时发 NOP
+  - 空闲超过 idle_timeout 的会话自动关闭
+  - 池中会话数（空闲 + 使用中）不超过 max_sessions：新建会话前先淘汰最久未用的空闲会话，全部在用时等待归还
+"""
+
+BANNER_TIMEOUT = 10.0    # 等待登录后第一个提示符
+COMMAND_TIMEOUT = 30.0   # 单条命令兜底超时，正常情况下提示符一出现就返回
+DEFAULT_PORTS = {'ssh': 22, 'telnet': 23}   # 未指定 port 时使用（模拟设备测试时整体改成本地端口）
+
+COMMAND_STATUS = {0: 'prompt', 1: 'question', -1: 'timeout'}   # send_command 返回值在追踪里的名字
+
+# Telnet 登录后又出现用户名 / 密码提示，说明认证失败
+LOGIN_RETRY_PROMPT = re.compile(r'(?:username|login|password)\s*:\s*$', re.IGNORECASE)
+
+# ─── 配置映射表 ────────────────────────────────────────────────
+DEVICE_CONFIG = {
+    'huawei': {
+        'paging': 'screen-length 0 temporary',
+        'privilege': 'super 3',
+        'save': ['save', 'Y'],
+        'backup': 'display current-configuration',
+        'prompt': r'[\<\[][\w\.-]+[\>\]]\s*$'
+    },
+    'cisco': {
+        'paging': 'terminal length 0',
+        'privilege': 'enable',
+        'save': ['write memory'],
+        'backup': 'show running-config',
+        'prompt': r'[>#]\s*$'
+    }
+}
+
+
+# ─── 单个设备会话 ────────────────────────────────────────────────
+class DeviceSession:
+    """已认证、已提权、已关闭分页的 SSH / Telnet 会话"""
+
+    def __init__(self, host: str, username: str, password: str,
+                 method: str = 'ssh', priv_pwd: Optional[str] = None, timeout: int = 10,
+                 fingerprints: Optional[FingerprintCache] = None, port: Optional[int] = None,
+                 metrics: Optional[SessionMetrics] = None, tracer: Optional[Tracer] = None):
+        self.host = host
+        self.port = port or DEFAULT_PORTS[method]
+        self.username = username
+        self.password = password
+        self.method = method
+        self.priv_pwd = priv_pwd
+        self.timeout = timeout
+        self.fingerprints = fingerprints
+        self.metrics = metrics
+        self.tracer = tracer
+        self.bytes_received = 0
+        self.ssh_version = ""
+        self.client = None
+        self.chan = None
+        self.tn = None
+        self.device_type = None
+        self.cfg = None
+        self.prompt = None
+        self.prompt_re = GENERIC_PROMPT
+        self._read = None
+        self._waitable = None
+        self.last_used = time.time()
+
+    @property
+    def key(self) -> Tuple[str, int, str, str, str]:
+        return session_key(self.host, self.port, self.method, self.username, self.password, self.priv_pwd)
+
+    def open(self) -> 'DeviceSession':
+        print(f"[{self.host}] 正在通过 {self.method.upper()} 连接...")
+        if self.method == 'ssh':
+            # 自己建 TCP 连接再交给 paramiko，建连和握手 / 认证分开计时
+            with self._measure('connect'):
+                sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self.client = paramiko.SSHClient()
+            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            with self._measure('auth'):
+                self.client.connect(self.host, self.port, self.username, self.password,
+                                    timeout=self.timeout, look_for_keys=False, sock=sock)
+                self.ssh_version = ssh_remote_version(self.client)
+                self.chan = self.client.invoke_shell(width=200, height=1000)
+            self._read, self._waitable = self._counted(channel_reader(self.chan)), self.chan
+        else:
+            with self._measure('connect'):
+                self.tn = telnetlib.Telnet(self.host, self.port, timeout=self.timeout)
+            with self._measure('auth'):
+                self.bytes_received += len(self.tn.read_until(b"Username:", timeout=5))
+                self.tn.write(self.username.encode('ascii') + b"\n")
+                self.bytes_received += len(self.tn.read_until(b"Password:", timeout=5))
+                self.tn.write(self.password.encode('ascii') + b"\n")
+            self._read, self._waitable = self._counted(telnet_reader(self.tn)), self.tn.get_socket()
+
+        # 等到第一个提示符出现即可，顺便学习设备真实提示符
+        with self._measure('banner'):
+            idx, initial = expect(self._read, self._waitable, [GENERIC_PROMPT, LOGIN_RETRY_PROMPT],
+                                  BANNER_TIMEOUT)
+        if idx == 1:
+            raise ConnectionError("认证失败（设备重新要求登录）")
+        if idx == -1:
+            raise ConnectionError(f"登录后 {BANNER_TIMEOUT:.0f} 秒内未出现提示符")
+        self._learn(initial)
+        source = self._identify(initial)
+        self.cfg = DEVICE_CONFIG[self.device_type]
+        print(f"[{self.host}] 识别为 {self.device_type.upper()}（{source}），提示符 {self.prompt}")
+
+        # 提权 & 翻页设置（不经过 send_command，特权密码不会出现在按命令统计里）
+        if self.priv_pwd:
+            with self._measure('privilege'):
+                idx, _ = self._exchange(self.cfg['privilege'])
+                if idx == 1:
+                    _, out = self._exchange(self.priv_pwd)
+                    self._learn(out)  # SW1> → SW1#
+        with self._measure('paging'):
+            self._exchange(self.cfg['paging'])
+        if self.fingerprints:
+            self.fingerprints.put(self.host, self.device_type, source, self.ssh_version, self.prompt)
+        self.last_used = time.time()
+        return self
+
+    def _identify(self, banner: str) -> str:
+        """确定设备类型，返回判断依据；指纹与实际提示符不符时丢弃缓存，按 banner 识别"""
+        hint = self.fingerprints.identify(self.host, self.ssh_version) if self.fingerprints else None
+        if hint and hint['vendor'] in DEVICE_CONFIG and plausible_prompt(hint['vendor'], self.prompt):
+            self.device_type = hint['vendor']
+            return hint['source']
+        if hint and hint['source'] == 'cache':
+            self.fingerprints.forget(self.host)
+        self.device_type = detect_device_type(banner)
+        return 'banner'
+
+    @contextmanager
+    def _measure(self, phase: str, command: Optional[str] = None) -> Iterator[Dict]:
+        """阶段计时（SessionMetrics）+ 追踪 span（Tracer），yield 出 span 记录"""
+        with ExitStack() as stack:
+            if self.metrics:
+                stack.enter_context(self.metrics.measure(self.host, phase, command, lambda: self.bytes_received))
+            yield stack.enter_context(maybe_span(self.tracer, command or phase, 'command' if command else 'phase'))
+
+    def trace(self, name: str):
+        """业务阶段（save / backup）只记追踪 span，不进 SessionMetrics 的固定阶段"""
+        return maybe_span(self.tracer, name, 'phase')
+
+    def _counted(self, read):
+        """包一层读取函数，累计收到的字节数"""
+        def _read() -> bytes:
+            data = read()
+            self.bytes_received += len(data)
+            return data
+        return _read
+
+    def _learn(self, output: str):
+        prompt = learn_prompt(output)
+        if prompt:
+            self.prompt = prompt
+            self.prompt_re = prompt_pattern(prompt)
+
+    def send_command(self, cmd: str, timeout: float = COMMAND_TIMEOUT) -> Tuple[int, str]:
+        """
+        发送命令并等待：0=回到提示符，1=设备在提问（[Y/N]、Password: 等），-1=超时
+        返回 (状态, 输出)
+        """
+        with self._measure('command', cmd) as span:
+            idx, output = self._exchange(cmd, timeout)
+            span['args']['status'] = COMMAND_STATUS[idx]
+            return idx, output
+
+    def _exchange(self, cmd: str, timeout: float = COMMAND_TIMEOUT) -> Tuple[int, str]:
+        self._send(cmd)
+        return expect(self._read, self._waitable, [self.prompt_re, INTERACTIVE_PROMPT], timeout)
+
+    def send_and_wait(self, cmd: str, timeout: float = COMMAND_TIMEOUT) -> str:
+        """
+        发送命令，返回回到提示符（或设备提问）时的输出
+        没等到就断开抛 ConnectionError、超时抛 TimeoutError：半截输出不能当结果用，会话状态未知也不能再复用
+        """
+        idx, output = self.send_command(cmd, timeout)
+        if idx == -1:
+            if self._peer_closed():
+                raise ConnectionError(f"等待 {cmd} 的提示符时连接断开")
+            raise TimeoutError(f"等待提示符超时: {cmd}")
+        return output
+
+    def iter_lines(self, cmd: str, timeout: float = COMMAND_TIMEOUT) -> Iterator[str]:
+        """
+        发送命令，边收边按行产出原始输出，回到提示符时结束
+        不缓存整段输出，内存只占一个未完成的行；timeout 为无数据到达的最长等待
+        没等到提示符就断开抛 ConnectionError、超时抛 TimeoutError，调用方不会把半份输出当成完整结果
+        """
+        with self._measure('command', cmd):
+            yield from self._iter_lines(cmd, timeout)
+
+    def _iter_lines(self, cmd: str, timeout: float) -> Iterator[str]:
+        self._send(cmd)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pending = ""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                data = self._read()
+            except EOFError:
+                raise ConnectionError(f"读取 {cmd} 的输出时连接断开") from None
+            if data:
+                deadline = time.time() + timeout
+                pending += decoder.decode(data)
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    yield line.rstrip("\r")
+                # 提示符所在的行没有换行符，留在 pending 里
+                if self.prompt_re.search(pending[-TAIL_SIZE:]):
+                    return
+                continue
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                if self.tracer:
+                    self.tracer.event('timeout', 'command', command=cmd)
+                raise TimeoutError(f"等待提示符超时: {cmd}")
+            wait_readable(self._waitable, remaining)
+
+    def _peer_closed(self) -> bool:
+        if self.method == 'ssh':
+            return self.chan is None or self.chan.closed or self.chan.eof_received
+        return self.tn is None or bool(self.tn.eof)
+
+    def _send(self, cmd: str):
+        if self.method == 'ssh':
+            self.chan.send(cmd + "\n")
+        else:
+            self.tn.write(cmd.encode('ascii') + b"\n")
+
+    def recv_available(self) -> str:
+        """读取当前已到达的数据（不等待）"""
+        if self.method == 'ssh':
+            res = ""
+            while self.chan.recv_ready():
+                res += self.chan.recv(8192).decode('utf-8', 'ignore')
+            return res
+        return self.tn.read_very_eager().decode('ascii', 'ignore')
+
+    def is_alive(self) -> bool:
+        try:
+            if self.method == 'ssh':
+                transport = self.client.get_transport() if self.client else None
+                return bool(transport and transport.is_active() and self.chan and not self.chan.closed)
+            return self.tn is not None and self.tn.get_socket() is not None and not self.tn.eof
+        except Exception:
+            return False
+
+    def keepalive(self):
+        """Telnet 发送 IAC NOP 保活；SSH 由 transport.set_keepalive 负责"""
+        if self.method == 'telnet' and self.tn:
+            self.tn.get_socket().sendall(telnetlib.IAC + telnetlib.NOP)
+
+    def close(self):
+        try:
+            if self.client:
+                self.client.close()
+            if self.tn:
+                self.tn.close()
+        except Exception:
+            pass
+        self.client = self.chan = self.tn = None
+
+
+# ─── 会话池 ────────────────────────────────────────────────
+def session_key(host: str, port: int, method: str, username: str, password: str,
+                priv_pwd: Optional[str]) -> Tuple[str, int, str, str, str]:
+    """会话池的键：凭据只存摘要，密码或提权密码改了就是另一个会话，不会复用旧凭据登录的会话
+    端口也在键里，同一地址不同端口（端口映射 / 模拟设备）是不同的设备"""
+    secret = hashlib.sha256(f"{password}\0{priv_pwd or ''}".encode('utf-8')).hexdigest()
+    return host, port, method, username, secret
+
+
+class SessionPool:
+    """按 (host, port, method, username, 凭据摘要) 复用已登录的会话"""
+
+    def __init__(self, max_sessions: int = 200, idle_timeout: float = 300.0,
+                 keepalive_interval: float = 30.0, fingerprints: Optional[FingerprintCache] = None,
+                 metrics: Optional[SessionMetrics] = None, tracer: Optional[Tracer] = None):
+        self.max_sessions = max_sessions
+        self.fingerprints = fingerprints
+        self.metrics = metrics
+        self.tracer = tracer
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.idle: Dict[tuple, DeviceSession] = {}
+        self.busy = 0
+        self.lock = threading.Lock()
+        self.slot_freed = threading.Condition(self.lock)   # 会话归还 / 丢弃时通知等待名额的 acquire
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._maintain, daemon=True)
+        self._thread.start()
+
+    def acquire(self, host: str, username: str, password: str,
+                method: str = 'ssh', priv_pwd: Optional[str] = None, port: Optional[int] = None) -> DeviceSession:
+        port = port or DEFAULT_PORTS[method]
+        key = session_key(host, port, method, username, password, priv_pwd)
+        evicted = []
+        with self.lock:
+            session = self.idle.pop(key, None)
+            if not session:
+                # 新建会话前先占名额：满了先淘汰最久未用的空闲会话，全部在用时等别的任务归还
+                while len(self.idle) + self.busy >= self.max_sessions:
+                    if self.idle:
+                        lru = min(self.idle, key=lambda k: self.idle[k].last_used)
+                        evicted.append(self.idle.pop(lru))
+                    else:
+                        self.slot_freed.wait()
+            self.busy += 1
+        for s in evicted:
+            s.close()
+        if session:
+            if session.is_alive():
+                session.recv_available()  # 丢弃空闲期间残留的数据
+                print(f"[{host}] 复用已有 {method.upper()} 会话")
+                return session
+            session.close()    # 已断开：名额留给下面新建的会话
+
+        session = DeviceSession(host, username, password, method, priv_pwd,
+                                fingerprints=self.fingerprints, port=port, metrics=self.metrics,
+                                tracer=self.tracer)
+        try:
+            session.open()
+            if method == 'ssh':
+                session.client.get_transport().set_keepalive(int(self.keepalive_interval))
+        except Exception:
+            session.close()
+            with self.lock:
+                self.busy -= 1
+                self.slot_freed.notify()
+            raise
+        return session
+
+    def release(self, session: DeviceSession):
+        """任务成功后归还会话，留待后续任务复用"""
+        session.last_used = time.time()
+        evicted = []
+        with self.lock:
+            self.busy -= 1
+            old = self.idle.pop(session.key, None)
+            if old:
+                evicted.append(old)
+            # 超过上限时淘汰最久未用的空闲会话
+            while self.idle and len(self.idle) + self.busy >= self.max_sessions:
+                lru = min(self.idle, key=lambda k: self.idle[k].last_used)
+                evicted.append(self.idle.pop(lru))
+            if len(self.idle) + self.busy < self.max_sessions:
+                self.idle[session.key] = session
+            else:
+                evicted.append(session)
+            self.slot_freed.notify()
+        for s in evicted:
+            s.close()
+
+    def discard(self, session: DeviceSession):
+        """任务出错时丢弃会话（状态未知，不再复用）"""
+        with self.lock:
+            self.busy -= 1
+            self.slot_freed.notify()
+        session.close()
+
+    def _maintain(self):
+        while not self._stop.wait(self.keepalive_interval):
+            now = time.time()
+            expired = []
+            with self.lock:
+                for key, s in list(self.idle.items()):
+                    if now - s.last_used > self.idle_timeout or not s.is_alive():
+                        expired.append(self.idle.pop(key))
+                        continue
+                    try:
+                        s.keepalive()  # 持锁发送，避免与取出会话的线程同时写
+                    except Exception:
+                        expired.append(self.idle.pop(key))
+            for s in expired:
+                s.close()
+
+    def close_all(self):
+        self._stop.set()
+        with self.lock:
+            sessions = list(self.idle.values())
+            self.idle.clear()
+        for s in sessions:
+            s.close()
@@ -0,0 +1,196 @@
+import asyncio
+import errno
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+from device_classifier import classify
+from telnet_iac import TelnetStripper, refuse_options
+
+"""
+协议发现：把 aliveswitch 的在线结果变成可直接使用的设备清单
+- 对每个在线地址并发探测 TCP 22 / 23（asyncio，同时打开的连接数按文件句柄上限 ulimit -n 计算，每个连接占一个句柄）
+- 22 端口读取 SSH 版本串（如 SSH-2.0-HUAWEI-1.5），23 端口读取登录横幅（自动拒绝所有 Telnet 选项协商）
+- 根据版本串 / 横幅判断厂商与平台（device_classifier）
+- 输出：ip_list_ssh.txt、ip_list_telnet.txt（v1.2 / v1.3 直接读取；同时开 22 和 23 的设备只进 SSH 清单）
+        inventory.json（每台设备的端口、厂商、版本串 / 横幅）
+用法：python discovery.py [alive.txt]
+"""
+
+ALIVE_FILE = "alive.txt"
+SSH_LIST_FILE = "ip_list_ssh.txt"
+TELNET_LIST_FILE = "ip_list_telnet.txt"
+INVENTORY_FILE = "inventory.json"
+
+CONNECT_TIMEOUT = 3.0
+BANNER_TIMEOUT = 5.0
+MAX_SOCKETS = 2000      # 同时打开的探测连接上限（每台设备 22 / 23 各占一个），另受文件句柄上限约束
+FD_RESERVE = 64         # 给标准输入输出、清单文件、事件循环自身留的句柄
+BANNER_LIMIT = 2048
+
+LOGIN_PROMPT = re.compile(r'(username|login|user name|password)\s*:\s*$', re.IGNORECASE)
+
+# 本机资源耗尽（句柄 / 缓冲区 / 内存），与目标端口无关，不能记成"端口不通"
+LOCAL_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM}
+
+
+def socket_budget(limit: int = MAX_SOCKETS) -> int:
+    """可同时打开的探测连接数：min(limit, 句柄软上限 - FD_RESERVE)"""
+    try:
+        import resource
+    except ImportError:     # Windows 没有 resource 模块，也没有 ulimit -n
+        return limit
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return limit
+    return max(1, min(limit, soft - FD_RESERVE))
+
+
+async def connect(host: str, port: int):
+    """建立探测连接；端口不通 / 超时返回 None，本机资源耗尽时抛出 OSError"""
+    try:
+        return await asyncio.wait_for(asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+    except asyncio.TimeoutError:
+        return None
+    except OSError as e:
+        if e.errno in LOCAL_ERRNOS:
+            raise
+        return None
+
+
+async def close(writer: asyncio.StreamWriter):
+    writer.close()
+    try:
+        await asyncio.wait_for(writer.wait_closed(), CONNECT_TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        pass
+
+
+async def probe_ssh(host: str, port: int = 22) -> Optional[str]:
+    """返回 SSH 版本串；端口不通返回 None，通了但没读到版本串返回空串"""
+    conn = await connect(host, port)
+    if conn is None:
+        return None
+    reader, writer = conn
+    try:
+        # 服务器可能先发几行说明文字，版本串是以 SSH- 开头的那一行
+        deadline = time.monotonic() + BANNER_TIMEOUT
+        while time.monotonic() < deadline:
+            line = await asyncio.wait_for(reader.readline(), deadline - time.monotonic())
+            if not line:
+                break
+            if line.startswith(b"SSH-"):
+                return line.decode('ascii', 'ignore').strip()
+        return ""
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return ""
+    finally:
+        await close(writer)
+
+
+async def probe_telnet(host: str, port: int = 23) -> Optional[str]:
+    """返回登录横幅（读到登录提示或超时为止）；端口不通返回 None"""
+    conn = await connect(host, port)
+    if conn is None:
+        return None
+    reader, writer = conn
+    text = b""
+    stripper = TelnetStripper(refuse_options(writer.write))
+    try:
+        deadline = time.monotonic() + BANNER_TIMEOUT
+        while len(text) < BANNER_LIMIT and time.monotonic() < deadline:
+            chunk = await asyncio.wait_for(reader.read(1024), deadline - time.monotonic())
+            if not chunk:
+                break
+            text += stripper.feed(chunk)
+            if LOGIN_PROMPT.search(text.decode('utf-8', 'ignore').rstrip()):
+                break
+    except (OSError, asyncio.TimeoutError):
+        pass
+    finally:
+        await close(writer)
+    return text.decode('utf-8', 'ignore').replace('\r', '').strip()
+
+
+async def probe_host(host: str, sem: asyncio.Semaphore) -> Dict:
+    """sem 按连接计数：22 和 23 的探测各占一个名额"""
+    async def limited(probe):
+        async with sem:
+            return await probe(host)
+
+    ssh_version, telnet_banner = await asyncio.gather(limited(probe_ssh), limited(probe_telnet))
+    # 横幅放在最后，最后一行的登录提示 / 提示符也参与识别
+    found = classify("\n".join(t for t in (ssh_version, telnet_banner) if t))
+    return {
+        'ip': host,
+        'ssh': ssh_version is not None,
+        'telnet': telnet_banner is not None,
+        'vendor': found['vendor'],
+        'platform': found['platform'],
+        'confidence': found['confidence'],
+        'ssh_version': ssh_version or "",
+        'telnet_banner': telnet_banner or "",
+    }
+
+
+async def discover_async(hosts: Iterable[str], max_sockets: Optional[int] = None) -> List[Dict]:
+    """max_sockets 为同时打开的连接数，默认按句柄上限计算；本机资源耗尽时抛出 OSError，不写出半真半假的清单"""
+    sem = asyncio.Semaphore(max_sockets or socket_budget())
+    return await asyncio.gather(*(probe_host(h, sem) for h in hosts))
+
+
+def discover(hosts: Iterable[str], max_sockets: Optional[int] = None) -> List[Dict]:
+    """同步入口，返回与 hosts 顺序一致的清单记录"""
+    return asyncio.run(discover_async(list(hosts), max_sockets))
+
+
+def load_alive(filename: str = ALIVE_FILE) -> List[str]:
+    """读取 aliveswitch 的结果文件（每行 'IP<TAB>xx ms'，跳过表头）"""
+    hosts = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            ip = line.split('\t', 1)[0].strip()
+            if re.fullmatch(r'\d{1,3}(\.\d{1,3}){3}', ip):
+                hosts.append(ip)
+    return hosts
+
+
+def write_inventory(records: List[Dict], directory: str = "."):
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+    ssh = [r['ip'] for r in records if r['ssh']]
+    telnet = [r['ip'] for r in records if r['telnet'] and not r['ssh']]
+    for name, ips in ((SSH_LIST_FILE, ssh), (TELNET_LIST_FILE, telnet)):
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(f"# 由 discovery.py 生成：{stamp}\n")
+            f.writelines(f"{ip}\n" for ip in ips)
+    with open(os.path.join(directory, INVENTORY_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'time': stamp, 'devices': records}, f, ensure_ascii=False, indent=1)
+    return len(ssh), len(telnet)
+
+
+if __name__ == '__main__':
+    alive_file = sys.argv[1] if len(sys.argv) > 1 else ALIVE_FILE
+    if not os.path.exists(alive_file):
+        print(f"找不到 {alive_file}，请先运行 aliveswitch 扫描在线设备")
+        sys.exit(1)
+    hosts = load_alive(alive_file)
+    max_sockets = socket_budget()
+    print(f"读取 {len(hosts)} 个在线地址，开始探测 22/23 端口（同时 {max_sockets} 个连接）...")
+    start = time.time()
+    try:
+        records = discover(hosts, max_sockets)
+    except OSError as e:
+        print(f"本机资源不足，探测中止（未写出清单）：{e}")
+        print("请调大文件句柄上限（ulimit -n）或减小 MAX_SOCKETS 后重试")
+        sys.exit(1)
+    ssh_count, telnet_count = write_inventory(records)
+    vendors: Dict[str, int] = {}
+    for r in records:
+        if r['ssh'] or r['telnet']:
+            vendors[r['vendor']] = vendors.get(r['vendor'], 0) + 1
+    print(f"完成，用时 {time.time() - start:.2f} 秒")
+    print(f"SSH {ssh_count} 台 → {SSH_LIST_FILE}，仅 Telnet {telnet_count} 台 → {TELNET_LIST_FILE}")
+    print("厂商分布：" + ("，".join(f"{k} {v}" for k, v in sorted(vendors.items())) or "无"))
+    print(f"详细清单：{os.path.abspath(INVENTORY_FILE)}")
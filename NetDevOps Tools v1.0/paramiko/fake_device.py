@@ -0,0 +1,396 @@
+import re
+import selectors
+import socket
+import threading
+import time
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+"""
+本地模拟设备的命令行（与传输方式无关，SSH / Telnet 模拟器共用）
+- 模拟 Cisco IOS / Huawei VRP 的提示符、enable / super 提权、分页（--More-- / ---- More ----）
+- 支持脚本里用到的命令：关闭分页、show/display version、ip interface brief、
+  running-config / current-configuration、变更标记、write memory / save [Y/N]
+- 配置行数、接口数、每条命令的响应延迟、认证延迟都可以在 profile 里调整
+- DeviceCLI 只负责“收到一行 → 返回要输出的内容”；run_shell 负责回显、延迟、分页按键
+- DeviceListener：一台设备一个本地地址（127.0.1.1、127.0.1.2 …），共用同一端口，每个连接一个线程；
+  SSH / Telnet 模拟器只需实现 _session(conn, profile)
+"""
+
+PROFILES = {
+    'cisco': {
+        'hostname': 'R1',
+        'ssh_version': 'SSH-2.0-Cisco-1.25',
+        'banner': "\r\n",
+        'telnet_banner': "\r\n\r\nUser Access Verification\r\n\r\n",
+        'login_prompts': ("Username: ", "Password: "),
+        'login_failed': "% Authentication failed\r\n\r\n",
+        'more': " --More-- ",
+    },
+    'huawei': {
+        'hostname': 'HUAWEI',
+        'ssh_version': 'SSH-2.0-HUAWEI-1.5',
+        'banner': "\r\nInfo: The max number of VTY users is 10, and the number\r\n"
+                  "      of current VTY users on line is 1.\r\n",
+        'telnet_banner': "\r\n\r\nLogin authentication\r\n\r\n",
+        'login_prompts': ("Username:", "Password:"),
+        'login_failed': "Error: Local authentication is rejected.\r\n\r\n",
+        'more': "  ---- More ----",
+    },
+}
+
+DEFAULTS = {
+    'username': 'admin',
+    'password': 'admin',
+    'enable_password': 'enable',
+    'latency': 0.0,        # 每条命令返回前的延迟（秒）
+    'auth_delay': 0.0,     # 认证延迟（秒），模拟慢 AAA
+    'config_lines': 200,   # running-config 大约多少行
+    'interfaces': 8,       # ip interface brief 的接口数
+    'page_lines': 24,      # 未关闭分页时每屏行数
+    'silent': False,       # 接受连接但从不响应（模拟死机 / 不可达，客户端只能等超时）
+    'drop_after': 0,       # 命令输出发到这么多字符时直接断开（模拟传输中途断线），0 为不断开
+    'tag': '',             # 会话时长按此分组统计（如故障类型）
+}
+
+
+def make_profile(vendor: str = 'cisco', **overrides) -> Dict:
+    """厂商默认值 + 通用默认值 + 覆盖项"""
+    if vendor not in PROFILES:
+        raise ValueError(f"不支持的厂商：{vendor}")
+    profile = dict(DEFAULTS, vendor=vendor, **PROFILES[vendor])
+    profile.update(overrides)
+    return profile
+
+
+# ─── 命令输出 ────────────────────────────────────────────────
+def _interface_name(vendor: str, i: int) -> str:
+    return f"GigabitEthernet0/0/{i}" if vendor == 'huawei' else f"GigabitEthernet0/{i}"
+
+
+@lru_cache(maxsize=64)
+def running_config(vendor: str, hostname: str, n_lines: int) -> str:
+    """生成大约 n_lines 行的配置（同样的参数只生成一次）"""
+    if vendor == 'huawei':
+        lines = ["!Software Version V200R011C10SPC500", "#", f" sysname {hostname}", "#"]
+        i = 0
+        while len(lines) < n_lines - 1:
+            lines += [f"interface {_interface_name(vendor, i)}", f" description TO-ACCESS-{i}",
+                      " port link-type access", f" port default vlan {10 + i % 20}", "#"]
+            i += 1
+        lines.append("return")
+    else:
+        lines = ["Building configuration...", "", "Current configuration : 0 bytes", "!",
+                 "! Last configuration change at 10:00:00 UTC Mon Mar 9 2026 by admin",
+                 "!", "version 15.2", f"hostname {hostname}", "!"]
+        i = 0
+        while len(lines) < n_lines - 1:
+            lines += [f"interface {_interface_name(vendor, i)}", f" description TO-ACCESS-{i}",
+                      " switchport mode access", f" switchport access vlan {10 + i % 20}", "!"]
+            i += 1
+        lines.append("end")
+    return "\r\n".join(lines)
+
+
+def show_version(vendor: str, hostname: str) -> str:
+    if vendor == 'huawei':
+        return ("Huawei Versatile Routing Platform Software\r\n"
+                "VRP (R) software, Version 5.170 (S5700 V200R011C10SPC500)\r\n"
+                "Copyright (C) 2000-2018 HUAWEI TECH CO., LTD\r\n"
+                "HUAWEI S5700-28C-HI Routing Switch uptime is 12 weeks, 3 days, 4 hours, 5 minutes")
+    return ("Cisco IOS Software, C2960 Software (C2960-LANBASEK9-M), Version 15.2(7)E3, RELEASE SOFTWARE (fc3)\r\n"
+            "Technical Support: http://www.cisco.com/techsupport\r\n"
+            "Copyright (c) 1986-2020 by Cisco Systems, Inc.\r\n"
+            f"\r\n{hostname} uptime is 12 weeks, 3 days, 4 hours, 5 minutes\r\n"
+            "System image file is \"flash:c2960-lanbasek9-mz.152-7.E3.bin\"\r\n"
+            "cisco WS-C2960-24TT-L (PowerPC405) processor (revision B0) with 65536K bytes of memory.")
+
+
+def ip_interface_brief(vendor: str, count: int) -> str:
+    if vendor == 'huawei':
+        lines = ["*down: administratively down", "(l): loopback", "(s): spoofing",
+                 f"The number of interface that is UP in Physical is {count}",
+                 "Interface                         IP Address/Mask      Physical   Protocol"]
+        lines += [f"{'Vlanif' + str(10 + i):<34}{f'10.{i}.0.1/24':<21}{'up':<11}up" for i in range(count)]
+    else:
+        lines = ["Interface              IP-Address      OK? Method Status                Protocol"]
+        lines += [f"{_interface_name(vendor, i):<23}{f'10.{i}.0.1':<16}YES manual up                    up"
+                  for i in range(count)]
+    return "\r\n".join(lines)
+
+
+# ─── 命令行状态机 ────────────────────────────────────────────────
+class DeviceCLI:
+    """一个登录会话的命令行状态：提权级别、分页开关、是否在等密码 / 确认"""
+
+    def __init__(self, profile: Dict):
+        self.profile = profile
+        self.vendor = profile['vendor']
+        self.hostname = profile['hostname']
+        self.privileged = False
+        self.paging = True
+        self.pending: Optional[str] = None   # 'enable' / 'super' / 'save'
+        self.commands = 0
+
+    @property
+    def echo(self) -> bool:
+        """输入密码时不回显"""
+        return self.pending not in ('enable', 'super')
+
+    def prompt(self) -> str:
+        if self.vendor == 'huawei':
+            return f"<{self.hostname}>"
+        return f"{self.hostname}{'#' if self.privileged else '>'}"
+
+    def greeting(self) -> str:
+        """登录成功后的横幅 + 第一个提示符"""
+        return self.profile['banner'] + self.prompt()
+
+    def handle(self, line: str) -> Tuple[str, bool]:
+        """
+        处理一行输入，返回 (输出, 是否断开)
+        输出以下一个提示符（或 Password: / [Y/N] 之类的问题）结尾，不含回显
+        """
+        line = line.strip()
+        if self.pending:
+            return self._answer(line), False
+        cmd = re.sub(r'\s+', ' ', line).lower()
+        if not cmd:
+            return "\r\n" + self.prompt(), False
+        self.commands += 1
+        if cmd in ('exit', 'quit', 'logout'):
+            return "", True
+        body = self._run(cmd)
+        if self.pending:
+            return body, False
+        return (body + "\r\n" if body else "") + self.prompt(), False
+
+    def _answer(self, line: str) -> str:
+        pending, self.pending = self.pending, None
+        if pending == 'save':
+            if line.lower().startswith('y'):
+                return ("Now saving the current configuration to the slot 0.\r\n"
+                        "Save the configuration successfully.\r\n" + self.prompt())
+            return self.prompt()
+        if line != self.profile['enable_password']:
+            if self.vendor == 'huawei':
+                return "Error: Password is wrong.\r\n" + self.prompt()
+            return "% Access denied\r\n\r\n" + self.prompt()
+        self.privileged = True
+        if self.vendor == 'huawei':
+            return ("Now user privilege is level 3, and only those commands whose level is equal to or less\r\n"
+                    "than this can be used.\r\nPrivilege note: 0-VISIT, 1-MONITOR, 2-SYSTEM, 3-MANAGE\r\n"
+                    + self.prompt())
+        return self.prompt()
+
+    def _run(self, cmd: str) -> str:
+        p = self.profile
+        if self.vendor == 'huawei':
+            if cmd == 'screen-length 0 temporary':
+                self.paging = False
+                return "Info: The configuration takes effect on the current user terminal interface only."
+            if cmd.startswith('super'):
+                self.pending = 'super'
+                return "Password:"
+            if cmd == 'display version':
+                return show_version(self.vendor, self.hostname)
+            if cmd == 'display ip interface brief':
+                return ip_interface_brief(self.vendor, p['interfaces'])
+            if cmd == 'display current-configuration':
+                return running_config(self.vendor, self.hostname, p['config_lines'])
+            if cmd == 'display changed-configuration time':
+                return "The time of last changed configuration is 2026-03-09 10:00:00+08:00."
+            if cmd == 'save':
+                self.pending = 'save'
+                return ("The current configuration will be written to the device.\r\n"
+                        "Are you sure to continue?[Y/N]")
+            return f"{' ' * (len(self.prompt()) + 1)}^\r\nError: Unrecognized command found at '^' position."
+
+        if cmd in ('terminal length 0', 'term len 0'):
+            self.paging = False
+            return ""
+        if cmd in ('enable', 'en'):
+            if self.privileged:
+                return ""
+            self.pending = 'enable'
+            return "Password: "
+        if cmd in ('show version', 'sh ver'):
+            return show_version(self.vendor, self.hostname)
+        if cmd in ('show ip interface brief', 'sh ip int br'):
+            return ip_interface_brief(self.vendor, p['interfaces'])
+        if self.privileged:
+            if cmd in ('show running-config', 'show run', 'sh run'):
+                return running_config(self.vendor, self.hostname, p['config_lines'])
+            if cmd == 'show running-config | include last configuration change':
+                return "! Last configuration change at 10:00:00 UTC Mon Mar 9 2026 by admin"
+            if cmd in ('write memory', 'write', 'wr'):
+                return "Building configuration...\r\n[OK]"
+        return f"{' ' * (len(self.prompt()) + 1)}^\r\n% Invalid input detected at '^' marker.\r\n"
+
+    def pages(self, output: str) -> List[str]:
+        """
+        开启分页时按 page_lines 切屏，屏与屏之间由传输层发 more 提示并等按键
+        最后一屏带提示符；关闭分页或内容不足一屏时原样返回一段
+        """
+        size = self.profile['page_lines']
+        if not self.paging or output.count("\n") <= size:
+            return [output]
+        lines = output.split("\r\n")
+        return ["\r\n".join(lines[i:i + size]) + ("\r\n" if i + size < len(lines) else "")
+                for i in range(0, len(lines), size)]
+
+
+class LineBuffer:
+    """把收到的字符切成行；\r、\n、\r\n 都算一次回车（Telnet 客户端的 \r\0 也一样）"""
+
+    def __init__(self):
+        self.buf = ""
+        self.cr = False
+
+    def feed(self, text: str):
+        text = text.replace("\0", "")
+        if self.cr and text.startswith("\n"):
+            text = text[1:]
+        if text:
+            self.cr = text.endswith("\r")
+        self.buf += text.replace("\r\n", "\n").replace("\r", "\n")
+
+    def line(self) -> Optional[str]:
+        """取出一整行，还没收到回车时返回 None"""
+        if "\n" not in self.buf:
+            return None
+        line, self.buf = self.buf.split("\n", 1)
+        return line
+
+    def key(self) -> Optional[str]:
+        """分页时取一个按键"""
+        if not self.buf:
+            return None
+        key, self.buf = self.buf[0], self.buf[1:]
+        return key
+
+
+def check_login(profile: Dict, username: str, password: str) -> bool:
+    """认证；auth_delay 由传输层按各自方式等待（线程 sleep / asyncio.sleep）"""
+    return username == profile['username'] and password == profile['password']
+
+
+# ─── 会话驱动 ────────────────────────────────────────────────
+def run_shell(conn, cli: DeviceCLI, reader) -> None:
+    """
+    驱动一个交互会话直到 quit / 连接断开
+    conn 只需要 sendall(str)；reader 提供 readline() / readkey()，连接断开时返回 None
+    """
+    more = cli.profile['more']
+    conn.sendall(cli.greeting())
+    while True:
+        line = reader.readline()
+        if line is None:
+            return
+        conn.sendall(line + "\r\n" if cli.echo else "\r\n")
+        output, closed = cli.handle(line)
+        if closed:
+            return
+        if cli.profile['latency']:
+            time.sleep(cli.profile['latency'])
+        if cli.profile['drop_after'] and len(output) > cli.profile['drop_after']:
+            conn.sendall(output[:cli.profile['drop_after']])
+            return
+        pages = cli.pages(output)
+        for i, page in enumerate(pages):
+            conn.sendall(page)
+            if i == len(pages) - 1:
+                break
+            conn.sendall(more)
+            key = reader.readkey()
+            conn.sendall("\r" + " " * len(more) + "\r")  # 像真机一样擦掉 more 提示
+            if key is None:
+                return
+            if key in 'qQ':
+                conn.sendall("\r\n" + cli.prompt())
+                break
+
+
+# ─── 监听 ────────────────────────────────────────────────
+class DeviceListener:
+    """
+    模拟设备集合：add_device 挂一台设备到一个本地地址，所有设备共用 port
+    port=0 时第一台设备绑定后由系统分配，之后的设备沿用该端口
+    """
+
+    def __init__(self, port: int = 0):
+        self.port = port
+        self.devices: Dict[str, Dict] = {}
+        self.sessions = 0
+        self.active = 0
+        self.peak_active = 0
+        self.durations: Dict[str, array] = {}   # {tag: 每个会话从接入到断开的秒数}
+        self.lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_device(self, address: str = '127.0.0.1', vendor: str = 'cisco', **overrides) -> Tuple[str, int]:
+        profile = make_profile(vendor, **overrides)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((address, self.port))
+        sock.listen(512)
+        sock.setblocking(False)
+        self.port = sock.getsockname()[1]
+        self.devices[address] = profile
+        self._selector.register(sock, selectors.EVENT_READ, profile)
+        return address, self.port
+
+    def start(self):
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            for key, _ in self._selector.select(timeout=0.5):
+                try:
+                    conn, _ = key.fileobj.accept()
+                except OSError:
+                    continue
+                conn.setblocking(True)
+                threading.Thread(target=self._serve, args=(conn, key.data), daemon=True).start()
+
+    def _serve(self, conn: socket.socket, profile: Dict):
+        with self.lock:
+            self.sessions += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        start = time.monotonic()
+        try:
+            if profile['silent']:
+                while conn.recv(4096):
+                    pass
+            else:
+                self._session(conn, profile)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            with self.lock:
+                self.active -= 1
+                self.durations.setdefault(profile['tag'], array('f')).append(time.monotonic() - start)
+
+    def _session(self, conn: socket.socket, profile: Dict):
+        raise NotImplementedError
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
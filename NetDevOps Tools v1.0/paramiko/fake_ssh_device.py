@@ -0,0 +1,121 @@
+import sys
+import threading
+import time
+from typing import Dict, Optional
+import paramiko
+from fake_device import DeviceCLI, DeviceListener, LineBuffer, check_login, run_shell
+
+"""
+本地模拟 SSH 设备（paramiko ServerInterface），脱离 EVE-NG 实验环境测试 / 测速各 SSH 执行器
+- 一个服务器可挂多台设备：每台设备一个回环地址（127.0.1.1、127.0.1.2 …），共用同一个端口（fake_device.DeviceListener）
+- 握手时发送对应厂商的版本串（SSH-2.0-Cisco-1.25 / SSH-2.0-HUAWEI-1.5），指纹识别走真实路径
+- 交互 shell 由 fake_device.DeviceCLI 模拟：提示符、enable / super、分页、save [Y/N]
+- 每条命令的延迟、认证延迟、配置行数在 profile 里配置（见 fake_device.DEFAULTS）
+- 每个连接一个线程（paramiko 本身也是每个 Transport 一个线程），适合几百个并发会话
+用法：python fake_ssh_device.py [cisco|huawei] [端口=2222]，用户名 / 密码 admin / admin，特权密码 enable
+"""
+
+HOST_KEY_BITS = 2048
+_host_key = None
+_host_key_lock = threading.Lock()
+
+
+def host_key() -> paramiko.RSAKey:
+    """进程内共用一把主机密钥（生成一次）"""
+    global _host_key
+    with _host_key_lock:
+        if _host_key is None:
+            _host_key = paramiko.RSAKey.generate(HOST_KEY_BITS)
+        return _host_key
+
+
+class _ShellServer(paramiko.ServerInterface):
+    def __init__(self, profile: Dict):
+        self.profile = profile
+        self.shell_ready = threading.Event()
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if self.profile['auth_delay']:
+            time.sleep(self.profile['auth_delay'])
+        if check_login(self.profile, username, password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_ready.set()
+        return True
+
+
+class _LineReader:
+    """从通道按行 / 按键读取，连接断开时返回 None"""
+
+    def __init__(self, chan):
+        self.chan = chan
+        self.lines = LineBuffer()
+
+    def _fill(self) -> bool:
+        data = self.chan.recv(4096)
+        if not data:
+            return False
+        self.lines.feed(data.decode('utf-8', 'ignore'))
+        return True
+
+    def readline(self) -> Optional[str]:
+        line = self.lines.line()
+        while line is None and self._fill():
+            line = self.lines.line()
+        return line
+
+    def readkey(self) -> Optional[str]:
+        key = self.lines.key()
+        while key is None and self._fill():
+            key = self.lines.key()
+        return key
+
+
+class FakeSSHServer(DeviceListener):
+    """SSH 模拟设备：握手、密码认证、pty + shell，之后交给 run_shell"""
+
+    def start(self) -> 'FakeSSHServer':
+        host_key()  # 先生成密钥，避免第一批连接一起等
+        return super().start()
+
+    def _session(self, conn, profile: Dict):
+        transport = paramiko.Transport(conn)
+        transport.local_version = profile['ssh_version']
+        transport.add_server_key(host_key())
+        server = _ShellServer(profile)
+        try:
+            transport.start_server(server=server)
+            chan = transport.accept(20)
+            if chan is not None and server.shell_ready.wait(10):
+                run_shell(chan, DeviceCLI(profile), _LineReader(chan))
+        except paramiko.SSHException:
+            pass
+        finally:
+            transport.close()
+
+
+if __name__ == '__main__':
+    vendor = sys.argv[1] if len(sys.argv) > 1 else 'cisco'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 2222
+    server = FakeSSHServer(port)
+    server.add_device('127.0.0.1', vendor)
+    server.start()
+    print(f"模拟 {vendor} 设备：ssh admin@127.0.0.1 -p {server.port}（密码 admin，特权密码 enable），Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,89 @@
+import socket
+import sys
+import time
+from typing import Dict, Optional
+from fake_device import DeviceCLI, DeviceListener, LineBuffer, check_login, run_shell
+from telnet_iac import IAC, WILL, TelnetStripper
+
+"""
+本地模拟 Telnet 设备（在测试进程内运行），给 v1.2 network_telnet_execute 和 v1.3 run_task 的 Telnet 分支当测试目标
+- 连接后像思科一样先发 WILL ECHO / WILL SGA，客户端的选项协商、NOP 保活一律忽略
+- Username: / Password: 登录（华为为 Username: / Password: 不带空格），认证失败三次断开
+- 登录后的命令行与 SSH 模拟器相同（fake_device.DeviceCLI + run_shell）：提示符、enable / super、分页、save [Y/N]
+- 认证延迟、每条命令延迟、配置行数都在 profile 里配置
+用法：python fake_telnet_device.py [cisco|huawei] [端口=2323]，用户名 / 密码 admin / admin，特权密码 enable
+"""
+
+ECHO, SGA = 1, 3
+LOGIN_ATTEMPTS = 3
+
+
+class _TelnetIO:
+    """socket 上的文本收发：发送时编码，接收时去掉 Telnet 协商字节后按行切分"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.lines = LineBuffer()
+        self.stripper = TelnetStripper()
+
+    def sendall(self, text: str):
+        self.sock.sendall(text.encode('utf-8'))
+
+    def _fill(self) -> bool:
+        data = self.sock.recv(4096)
+        if not data:
+            return False
+        self.lines.feed(self.stripper.feed(data).decode('utf-8', 'ignore'))
+        return True
+
+    def readline(self) -> Optional[str]:
+        line = self.lines.line()
+        while line is None and self._fill():
+            line = self.lines.line()
+        return line
+
+    def readkey(self) -> Optional[str]:
+        key = self.lines.key()
+        while key is None and self._fill():
+            key = self.lines.key()
+        return key
+
+
+class FakeTelnetServer(DeviceListener):
+    """Telnet 模拟设备：登录提示 → 认证 → run_shell"""
+
+    def _session(self, conn: socket.socket, profile: Dict):
+        io = _TelnetIO(conn)
+        conn.sendall(bytes([IAC, WILL, ECHO, IAC, WILL, SGA]))
+        io.sendall(profile['telnet_banner'])
+        user_prompt, password_prompt = profile['login_prompts']
+        for _ in range(LOGIN_ATTEMPTS):
+            io.sendall(user_prompt)
+            username = io.readline()
+            if username is None:
+                return
+            io.sendall(username + "\r\n" + password_prompt)
+            password = io.readline()
+            if password is None:
+                return
+            io.sendall("\r\n")
+            if profile['auth_delay']:
+                time.sleep(profile['auth_delay'])
+            if check_login(profile, username.strip(), password.strip()):
+                run_shell(io, DeviceCLI(profile), io)
+                return
+            io.sendall(profile['login_failed'])
+
+
+if __name__ == '__main__':
+    vendor = sys.argv[1] if len(sys.argv) > 1 else 'cisco'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 2323
+    server = FakeTelnetServer(port)
+    server.add_device('127.0.0.1', vendor)
+    server.start()
+    print(f"模拟 {vendor} 设备：telnet 127.0.0.1 {server.port}（admin / admin，特权密码 enable），Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,125 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+from atomic_file import atomic_write
+
+"""
+设备指纹：在打开 shell 之前判断厂商，并按 IP 缓存
+- SSH 握手阶段就能拿到对端版本串（transport.remote_version），如 SSH-2.0-HUAWEI-1.5、SSH-2.0-Cisco-1.25，
+  大多数设备据此即可确定厂商，无需 invoke_shell 后再收集 banner
+- 版本串看不出来的（OpenSSH 等）用缓存：上次登录识别出的厂商 + 提示符，保存在本地 JSON，过期自动失效
+- 缓存的提示符与登录后实际提示符风格不符（设备被替换等）时丢弃缓存，退回 banner 识别
+- discovery.py 生成的 inventory.json 可以直接导入作为初始指纹
+"""
+
+FINGERPRINT_FILE = "fingerprints.json"
+FINGERPRINT_TTL = 7 * 24 * 3600   # 缓存有效期（秒）
+
+SSH_VERSION_RULES = [
+    ('huawei', re.compile(r'^SSH-[\d.]+-(HUAWEI|VRP)', re.IGNORECASE)),
+    ('cisco', re.compile(r'^SSH-[\d.]+-Cisco', re.IGNORECASE)),
+    ('h3c', re.compile(r'^SSH-[\d.]+-Comware', re.IGNORECASE)),
+]
+
+# 各厂商提示符的外形，用于校验缓存是否还可信
+PROMPT_SHAPES = {
+    'huawei': re.compile(r'^[<\[].*[>\]]$'),
+    'h3c': re.compile(r'^[<\[].*[>\]]$'),
+    'cisco': re.compile(r'^[^<\[].*[>#]$'),
+}
+
+
+def vendor_from_ssh_version(version: Optional[str]) -> Optional[str]:
+    """SSH 版本串 → 厂商，看不出来返回 None"""
+    if not version:
+        return None
+    for vendor, pattern in SSH_VERSION_RULES:
+        if pattern.search(version.strip()):
+            return vendor
+    return None
+
+
+def ssh_remote_version(client) -> str:
+    """已连接的 paramiko.SSHClient 的对端版本串"""
+    transport = client.get_transport()
+    return (transport.remote_version or "") if transport else ""
+
+
+def plausible_prompt(vendor: str, prompt: Optional[str]) -> bool:
+    shape = PROMPT_SHAPES.get(vendor)
+    return not prompt or shape is None or bool(shape.match(prompt.strip()))
+
+
+class FingerprintCache:
+    """{ip: {vendor, source, ssh_version, prompt, time}}，线程安全，save() 原子写入"""
+
+    def __init__(self, path: str = FINGERPRINT_FILE, ttl: float = FINGERPRINT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取 {path} 失败，忽略指纹缓存: {e}")
+
+    def get(self, host: str) -> Optional[Dict]:
+        with self.lock:
+            entry = self.entries.get(host)
+        if not entry or time.time() - entry.get('time', 0) > self.ttl:
+            return None
+        return entry
+
+    def put(self, host: str, vendor: str, source: str, ssh_version: str = "", prompt: str = ""):
+        with self.lock:
+            old = self.entries.get(host)
+            if source == 'cache' and old:
+                source = old.get('source', source)  # 保留最初的判断依据
+            self.entries[host] = {'vendor': vendor, 'source': source, 'ssh_version': ssh_version,
+                                  'prompt': prompt or "", 'time': time.time()}
+            self.dirty = True
+
+    def forget(self, host: str):
+        with self.lock:
+            if self.entries.pop(host, None):
+                self.dirty = True
+
+    def identify(self, host: str, ssh_version: Optional[str] = None) -> Optional[Dict]:
+        """
+        登录前判断厂商：先看版本串，再看缓存
+        返回 {'vendor', 'source', 'prompt'}，判断不了返回 None
+        """
+        cached = self.get(host)
+        vendor = vendor_from_ssh_version(ssh_version)
+        if vendor:
+            prompt = cached['prompt'] if cached and cached['vendor'] == vendor else ""
+            return {'vendor': vendor, 'source': 'ssh-version', 'prompt': prompt}
+        if cached:
+            return {'vendor': cached['vendor'], 'source': 'cache', 'prompt': cached.get('prompt', "")}
+        return None
+
+    def import_inventory(self, path: str) -> int:
+        """导入 discovery.py 生成的 inventory.json，返回导入条数（已有且未过期的记录不覆盖）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            devices = json.load(f).get('devices', [])
+        count = 0
+        for d in devices:
+            vendor = vendor_from_ssh_version(d.get('ssh_version')) or d.get('vendor')
+            if vendor and vendor != 'unknown' and not self.get(d['ip']):
+                self.put(d['ip'], vendor, 'inventory', d.get('ssh_version', ""))
+                count += 1
+        return count
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or not self.path:
+                return
+            data = json.dumps(self.entries, ensure_ascii=False, indent=1)
+            self.dirty = False
+        atomic_write(self.path, data)
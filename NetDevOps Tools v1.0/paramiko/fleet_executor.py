@@ -0,0 +1,169 @@
+import io
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from tracing import Tracer, maybe_span
+
+"""
+并发批量执行器（供 paramiko-tools 等脚本 import 使用）
+- 有界并发：总 worker 数 + 按协议 (ssh / telnet) 单独限流（提交时限流，等协议名额的设备不占 worker）
+- 每台设备的打印输出先缓存在自己的缓冲区，设备完成后整块输出，不会互相穿插
+- 每台设备的结果 / 异常 / 耗时独立保存，最后返回汇总
+- 总耗时取决于最慢的设备，而不是所有设备耗时之和
+- 传入 Tracer 时记录 run → host span（queued 为排队时长，含等 worker 和等协议名额），worker 内的会话 / 命令 span 挂在 host 下面
+"""
+
+DEFAULT_MAX_WORKERS = 20
+DEFAULT_PROTOCOL_LIMITS = {'ssh': 20, 'telnet': 5}
+
+
+# ─── 按线程隔离的标准输出 ────────────────────────────────────────────────
+class _PerThreadStdout:
+    """worker 线程的 print 写入各自缓冲区，其他线程直接写原 stdout"""
+
+    def __init__(self, real):
+        self.real = real
+        self.local = threading.local()
+
+    def begin(self):
+        self.local.buf = io.StringIO()
+
+    def end(self) -> str:
+        buf = getattr(self.local, 'buf', None)
+        self.local.buf = None
+        return buf.getvalue() if buf else ""
+
+    def write(self, text):
+        buf = getattr(self.local, 'buf', None)
+        if buf is not None:
+            return buf.write(text)
+        return self.real.write(text)
+
+    def flush(self):
+        self.real.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.real, name)
+
+
+# ─── 执行器 ────────────────────────────────────────────────
+def run_fleet(
+        tasks: List[Tuple[str, str]],
+        worker: Callable[[str, str], Any],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        protocol_limits: Optional[Dict[str, int]] = None,
+        on_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+        isolate_output: bool = True,
+        tracer: Optional[Tracer] = None
+) -> Dict[str, Any]:
+    """
+    并发执行 worker(host, method)
+    tasks: [(host, method), ...]，method 为 'ssh' / 'telnet'；同一 IP 可以 ssh / telnet 各出现一次，
+           完全相同的 (host, method) 只执行一次
+    on_done: 每台设备完成后在主线程回调（可在里面做上传等非线程安全的操作）
+    返回 {'results': {(host, method): 记录}, 'total', 'success', 'failed', 'elapsed'}
+    worker 返回 None 或抛异常都算失败
+    tracer: 传入时记录追踪 span（见 tracing.py）
+    """
+    tasks = list(dict.fromkeys(tasks))
+    max_workers = max(1, max_workers)
+    limits = dict(DEFAULT_PROTOCOL_LIMITS)
+    limits.update(protocol_limits or {})
+    limits = {proto: max(1, n) for proto, n in limits.items()}
+
+    stdout = _PerThreadStdout(sys.stdout) if isolate_output else None
+
+    def _run_one(host: str, method: str, queued_at: float, run_id: Optional[int]) -> Dict[str, Any]:
+        record = {'host': host, 'method': method, 'ok': False,
+                  'result': None, 'error': None, 'elapsed': 0.0, 'log': ""}
+        picked = time.perf_counter()
+        if stdout:
+            stdout.begin()
+        start = time.time()
+        try:
+            with maybe_span(tracer, host, 'host', parent=run_id, method=method,
+                            queued=round(picked - queued_at, 6)) as span:
+                record['result'] = worker(host, method)
+                record['ok'] = record['result'] is not None
+                span['args']['ok'] = record['ok']
+        except Exception as e:
+            record['error'] = str(e)
+            print(f"[{host}] 执行异常: {e}")
+        finally:
+            record['elapsed'] = time.time() - start
+            if stdout:
+                record['log'] = stdout.end()
+        return record
+
+    # 协议限流在主线程提交时控制：超出协议上限的任务留在各自的待提交队列里，不占线程池的 worker
+    waiting: Dict[str, deque] = {}
+    for index, (host, method) in enumerate(tasks):
+        waiting.setdefault(method, deque()).append((index, host))
+    running = dict.fromkeys(waiting, 0)
+    futures: Dict[Future, str] = {}
+
+    def _submit_ready(pool: ThreadPoolExecutor, queued_at: float, run_id: Optional[int]):
+        while len(futures) < max_workers:
+            ready = [m for m, q in waiting.items() if q and running[m] < limits.get(m, max_workers)]
+            if not ready:
+                return
+            method = min(ready, key=lambda m: waiting[m][0][0])   # 多个协议都有空位时按任务原顺序提交
+            _, host = waiting[method].popleft()
+            running[method] += 1
+            futures[pool.submit(_run_one, host, method, queued_at, run_id)] = method
+
+    results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    start = time.time()
+    if stdout:
+        sys.stdout = stdout
+    try:
+        with maybe_span(tracer, 'run', 'run', tasks=len(tasks), max_workers=max_workers) as run_span, \
+                ThreadPoolExecutor(max_workers=max_workers) as pool:
+            queued_at = time.perf_counter()
+            _submit_ready(pool, queued_at, run_span['id'])
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running[futures.pop(future)] -= 1
+                # 先补上空出来的位置，再处理结果（on_done 里的上传等操作不耽误下一批设备开始）
+                _submit_ready(pool, queued_at, run_span['id'])
+                for future in done:
+                    record = future.result()
+                    results[(record['host'], record['method'])] = record
+                    if record['log']:
+                        print(f"\n{'-' * 50}\n设备: {record['host']} ({record['method'].upper()})"
+                              f"  用时 {record['elapsed']:.1f}s")
+                        print(record['log'], end="")
+                    if on_done:
+                        try:
+                            on_done(record)
+                        except Exception as e:
+                            print(f"[{record['host']}] 结果处理失败: {e}")
+    finally:
+        if stdout:
+            sys.stdout = stdout.real
+
+    success = sum(1 for r in results.values() if r['ok'])
+    return {
+        'results': results,
+        'total': len(tasks),
+        'success': success,
+        'failed': len(tasks) - success,
+        'elapsed': time.time() - start,
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    """打印汇总结果，失败设备单独列出，并给出最慢的设备"""
+    print(f"\n{'═' * 60}")
+    print(f"完成：成功 {summary['success']} / 总计 {summary['total']}，"
+          f"总用时 {summary['elapsed']:.1f} 秒")
+    failed = [r for r in summary['results'].values() if not r['ok']]
+    for r in sorted(failed, key=lambda x: x['host']):
+        print(f"  失败 → {r['host']:15} ({r['method']}) {r['error'] or ''}")
+    if summary['results']:
+        slowest = max(summary['results'].values(), key=lambda x: x['elapsed'])
+        print(f"最慢设备：{slowest['host']} ({slowest['elapsed']:.1f} 秒)")
@@ -0,0 +1,297 @@
+import builtins
+import math
+import multiprocessing as mp
+import os
+import random
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+from queue import Empty
+from typing import Dict, List, Optional, Tuple
+from benchutil import load_script, percentile
+from fake_ssh_device import FakeSSHServer
+from fake_telnet_device import FakeTelnetServer
+
+"""
+批量流程压测：几千到几万台模拟设备 + 原样运行 process_all / batch_save_config
+- 设备地址 127.10.x.y，SSH / Telnet 各用一个本地端口，分散到多个设备进程（单进程文件句柄有上限）
+- 每台设备的画像按比例随机生成（固定种子，可复现）：
+  厂商（华为 / 思科）、协议（SSH / Telnet）、每条命令延迟（对数正态分布）
+  故障：dead 接受连接但不响应（客户端只能等超时）、slow_aaa 认证慢、huge_config 超大配置、auth_fail 密码不对
+- 流程在单独的进程里运行：临时目录下生成 ip_list_ssh.txt / ip_list_telnet.txt / ftp_config.txt（备份存本地目录），
+  交互输入自动应答，端口通过 device_session.DEFAULT_PORTS / v1.2 的 SSH_PORT、TELNET_PORT 指向模拟设备
+- 报告：总用时、设备端会话时长 p50 / p95 / p99 / 最大（按故障类型分组），
+  流程进程的峰值内存（ru_maxrss）、峰值文件句柄数、峰值线程数
+运行：python fleet_simulator.py [设备数=5000] [流程=v1.3-save|v1.3-backup|v1.2-save] [并发=脚本默认]
+"""
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+USERNAME, PASSWORD, ENABLE = 'admin', 'admin', 'enable'
+SEED = 20260309
+
+# ─── 设备画像比例 ────────────────────────────────────────────────
+HUAWEI_SHARE = 0.4
+TELNET_SHARE = 0.2
+LATENCY_MEDIAN_MS = 30        # 每条命令延迟的中位数
+LATENCY_SIGMA = 0.8           # 对数正态分布的 sigma，越大长尾越明显
+LATENCY_CAP_MS = 3000
+FAILURE_MIX = {               # 其余为 normal
+    'dead': 0.01,
+    'slow_aaa': 0.03,
+    'huge_config': 0.01,
+    'auth_fail': 0.02,
+}
+SLOW_AAA_SECONDS = 4.0
+HUGE_CONFIG_LINES = 100000
+NORMAL_CONFIG_LINES = 800
+
+FARM_PROCESSES = 2
+FDS_PER_FARM_RESERVE = 2000   # 每个设备进程给会话连接预留的句柄数
+SAMPLE_INTERVAL = 0.2         # 资源采样间隔（秒）
+
+FLOWS = ('v1.3-save', 'v1.3-backup', 'v1.2-save')
+ANSWERS = [                   # 交互输入自动应答，按顺序取第一个包含关键字的
+    ("用户名", USERNAME),
+    ("需要进入特权模式", "y"),
+    ("特权级别", "3"),
+    ("特权密码", ENABLE),
+    ("密码", PASSWORD),
+]
+
+
+def device_address(i: int) -> str:
+    block = i // 250
+    return f"127.{10 + block // 250}.{block % 250 + 1}.{i % 250 + 1}"
+
+
+def make_fleet(count: int, seed: int = SEED) -> List[Tuple[str, str, str, Dict]]:
+    """[(地址, 协议, 厂商, profile 覆盖项)]"""
+    rnd = random.Random(seed)
+    fleet = []
+    for i in range(count):
+        roll = rnd.random()
+        kind = 'normal'
+        for name, share in FAILURE_MIX.items():
+            if roll < share:
+                kind = name
+                break
+            roll -= share
+        latency_ms = min(LATENCY_CAP_MS, rnd.lognormvariate(math.log(LATENCY_MEDIAN_MS), LATENCY_SIGMA))
+        overrides = {'tag': kind, 'latency': latency_ms / 1000, 'config_lines': NORMAL_CONFIG_LINES,
+                     'hostname': f"SW-{i:05d}"}
+        if kind == 'dead':
+            overrides['silent'] = True
+        elif kind == 'slow_aaa':
+            overrides['auth_delay'] = SLOW_AAA_SECONDS
+        elif kind == 'huge_config':
+            overrides['config_lines'] = HUGE_CONFIG_LINES
+        elif kind == 'auth_fail':
+            overrides['password'] = 'not-' + PASSWORD
+        protocol = 'telnet' if rnd.random() < TELNET_SHARE else 'ssh'
+        vendor = 'huawei' if rnd.random() < HUAWEI_SHARE else 'cisco'
+        fleet.append((device_address(i), protocol, vendor, overrides))
+    return fleet
+
+
+def raise_fd_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def free_port(address: str) -> int:
+    with socket.socket() as s:
+        s.bind((address, 0))
+        return s.getsockname()[1]
+
+
+# ─── 设备进程 ────────────────────────────────────────────────
+def run_farm(devices: List[Tuple[str, str, str, Dict]], ports: Dict[str, int], ready, stop, results):
+    raise_fd_limit()
+    servers = {'ssh': FakeSSHServer(ports['ssh']), 'telnet': FakeTelnetServer(ports['telnet'])}
+    for address, protocol, vendor, overrides in devices:
+        servers[protocol].add_device(address, vendor, **overrides)
+    for server in servers.values():
+        server.start()
+    ready.set()
+    stop.wait()
+    durations: Dict[str, List[float]] = {}
+    for server in servers.values():
+        with server.lock:
+            for tag, values in server.durations.items():
+                durations.setdefault(tag, []).extend(values)
+        server.stop()
+    results.put(durations)
+
+
+# ─── 流程进程 ────────────────────────────────────────────────
+def scripted_input(prompt: str = "", *args, **kwargs) -> str:
+    for key, answer in ANSWERS:
+        if key in prompt:
+            return answer
+    return ""
+
+
+class ResourceSampler:
+    """后台线程定时记录本进程的文件句柄数、线程数峰值"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_fds = 0
+        self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        try:
+            fds = len(os.listdir('/proc/self/fd'))
+        except OSError:
+            fds = 0
+        self.peak_fds = max(self.peak_fds, fds)
+        self.peak_threads = max(self.peak_threads, threading.active_count())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> 'ResourceSampler':
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def run_flow(flow: str, workdir: str, ports: Dict[str, int], concurrency: Optional[int], results):
+    raise_fd_limit()
+    os.chdir(workdir)
+    sys.path.insert(0, HERE)
+    log = open('flow.log', 'w', encoding='utf-8')
+    sys.stdout = sys.stderr = log
+    builtins.input = scripted_input
+    import pwinput
+    pwinput.pwinput = scripted_input
+
+    if flow.startswith('v1.3'):
+        import device_session
+        device_session.DEFAULT_PORTS.update(ports)
+        tools = load_script('2026-3-9-paramiko-tools-v1.3.py')
+        if concurrency:
+            tools.MAX_WORKERS = concurrency
+            tools.PROTOCOL_LIMITS = {'ssh': concurrency, 'telnet': concurrency}
+        tools.BACKUP_MODE = 'pipeline'
+        run = lambda: tools.process_all(flow.split('-')[1])
+    else:
+        tools = load_script('2026-3-3-paramiko-tools-v1.2.py')
+        tools.SSH_PORT, tools.TELNET_PORT = ports['ssh'], ports['telnet']
+        run = tools.batch_save_config
+
+    with ResourceSampler() as sampler:
+        start = time.perf_counter()
+        outcome = run()
+        makespan = time.perf_counter() - start
+    if isinstance(outcome, dict):
+        success = outcome['success']
+    else:
+        success = outcome
+    log.close()
+    results.put({
+        'makespan': makespan,
+        'success': success,
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'peak_fds': sampler.peak_fds,
+        'peak_threads': sampler.peak_threads,
+    })
+
+
+# ─── 报告 ────────────────────────────────────────────────
+def print_report(flow: str, n_devices: int, result: Dict, durations: Dict[str, List[float]], workdir: str):
+    print(f"\n{'═' * 64}")
+    print(f"流程 {flow}：成功 {result['success']} / {n_devices}，总用时 {result['makespan']:.1f} 秒"
+          f"（{n_devices / result['makespan']:.1f} 台/秒）")
+    print(f"流程进程：峰值内存 {result['max_rss'] / 1024 / 1024:.1f} MB，"
+          f"峰值文件句柄 {result['peak_fds']}，峰值线程 {result['peak_threads']}")
+    print("设备端会话时长（秒）：")
+    print(f"  {'类型':<12}{'会话数':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'最大':>9}")
+    everything = []
+    for tag in ['normal'] + list(FAILURE_MIX):
+        values = sorted(durations.get(tag, []))
+        everything += values
+        if values:
+            print(f"  {tag:<14}{len(values):>8}{percentile(values, 0.5):>9.2f}{percentile(values, 0.95):>9.2f}"
+                  f"{percentile(values, 0.99):>9.2f}{values[-1]:>9.2f}")
+    everything.sort()
+    if everything:
+        print(f"  {'全部':<12}{len(everything):>8}{percentile(everything, 0.5):>9.2f}"
+              f"{percentile(everything, 0.95):>9.2f}{percentile(everything, 0.99):>9.2f}{everything[-1]:>9.2f}")
+    print(f"流程输出：{os.path.join(workdir, 'flow.log')}")
+
+
+if __name__ == '__main__':
+    n_devices = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    flow = sys.argv[2] if len(sys.argv) > 2 else 'v1.3-save'
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    if flow not in FLOWS:
+        print(f"流程只能是 {' / '.join(FLOWS)}")
+        sys.exit(1)
+
+    fleet = make_fleet(n_devices)
+    workdir = tempfile.mkdtemp(prefix="fleet_sim_")
+    with open(os.path.join(workdir, "ip_list_ssh.txt"), 'w', encoding='utf-8') as f:
+        f.writelines(f"{address}\n" for address, protocol, _, _ in fleet if protocol == 'ssh')
+    with open(os.path.join(workdir, "ip_list_telnet.txt"), 'w', encoding='utf-8') as f:
+        f.writelines(f"{address}\n" for address, protocol, _, _ in fleet if protocol == 'telnet')
+    with open(os.path.join(workdir, "ftp_config.txt"), 'w', encoding='utf-8') as f:
+        f.write(f"local_dir={os.path.join(workdir, 'backups')}\n")
+
+    hard_limit = raise_fd_limit()
+    farms = max(FARM_PROCESSES, math.ceil(n_devices / max(1, hard_limit - FDS_PER_FARM_RESERVE)))
+    ports = {'ssh': free_port(device_address(0)), 'telnet': free_port(device_address(0))}
+    kinds: Dict[str, int] = {}
+    for _, _, _, overrides in fleet:
+        kinds[overrides['tag']] = kinds.get(overrides['tag'], 0) + 1
+    print(f"模拟设备：{n_devices} 台（{farms} 个设备进程，SSH 端口 {ports['ssh']}，Telnet 端口 {ports['telnet']}）")
+    print("画像：" + "，".join(f"{k} {v}" for k, v in sorted(kinds.items())))
+
+    stop = mp.Event()
+    farm_results = mp.Queue()
+    farm_procs = []
+    started = time.perf_counter()
+    for i in range(farms):
+        ready = mp.Event()
+        p = mp.Process(target=run_farm, args=(fleet[i::farms], ports, ready, stop, farm_results), daemon=True)
+        p.start()
+        farm_procs.append((p, ready))
+    for p, ready in farm_procs:
+        ready.wait()
+    print(f"设备就绪，用时 {time.perf_counter() - started:.1f} 秒；开始运行 {flow}（输出在 {workdir}/flow.log）...")
+
+    flow_results = mp.Queue()
+    flow_proc = mp.Process(target=run_flow, args=(flow, workdir, ports, concurrency, flow_results))
+    flow_proc.start()
+    result = None
+    while result is None and (flow_proc.is_alive() or not flow_results.empty()):
+        try:
+            result = flow_results.get(timeout=1)
+        except Empty:
+            pass
+    flow_proc.join()
+
+    stop.set()
+    durations: Dict[str, List[float]] = {}
+    for _ in farm_procs:
+        for tag, values in farm_results.get().items():
+            durations.setdefault(tag, []).extend(values)
+    for p, _ in farm_procs:
+        p.join(5)
+    if result is None:
+        print(f"流程进程异常退出（退出码 {flow_proc.exitcode}），详见 {workdir}/flow.log")
+        sys.exit(1)
+    print_report(flow, n_devices, result, durations, workdir)
@@ -0,0 +1,216 @@
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional
+from sweep_targets import SweepResults, TargetSet, int_to_ip, ip_to_int
+
+"""
+高速并发 ICMP 扫描引擎（供 aliveswitch 使用）
+- 一个 ICMP socket 同时发出成百上千个探测，按 (目标地址, 序号) 匹配回包，不再逐个 ping 等超时
+- 优先用原始套接字（需要 root / CAP_NET_RAW），其次用 Linux 非特权 ICMP 套接字
+  （net.ipv4.ping_group_range 允许时），都不可用则退回到 ping3 + 线程池
+- 令牌桶限速（每秒发包数 pps），避免打爆网关或触发 ICMP 限速
+- 语义与 aliveswitch v1.0 相同：每个地址探测 attempts 次，任意一次有回应即在线，RTT 取成功各次的平均值
+- 目标与结果都是整数 / 紧凑数组（见 sweep_targets），按需生成地址，/12 规模也不会堆出上百万个字符串
+"""
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo(ident: int, seq: int, payload: bytes = b"netdevops-sweep") -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    chk = _checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, chk, ident, seq) + payload
+
+
+class TokenBucket:
+    """每秒 rate 个令牌，最多积攒 burst 个"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate / 10)))
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def wait_time(self) -> float:
+        """还需等待多久才有令牌（0 表示现在就有）"""
+        with self.lock:
+            self._refill()
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+
+    def acquire(self):
+        """阻塞直到拿到令牌（线程池模式使用）"""
+        while True:
+            delay = self.wait_time()
+            if delay <= 0:
+                self.consume()
+                return
+            time.sleep(delay)
+
+
+def open_icmp_socket():
+    """返回 (socket, 是否原始套接字)；都失败时返回 (None, False)"""
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+    except PermissionError:
+        pass
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except (PermissionError, OSError):
+        return None, False
+
+
+# ─── 扫描引擎 ────────────────────────────────────────────────
+class IcmpSweeper:
+    def __init__(self, timeout: float = 2.0, attempts: int = 3, interval: float = 0.3,
+                 pps: float = 2000, workers: int = 256,
+                 on_reply: Optional[Callable[[str, int, float], None]] = None):
+        """
+        timeout: 单个探测等待回包的时间（秒）
+        attempts: 每个地址探测次数；interval: 同一地址两次探测的最小间隔（秒）
+        pps: 每秒最多发出的探测包数；workers: 退回 ping3 模式时的线程数
+        on_reply(ip, 第几次, rtt_ms): 每收到一个回包回调一次（可用于实时打印）
+        """
+        self.timeout = timeout
+        self.attempts = attempts
+        self.interval = interval
+        self.pps = pps
+        self.workers = workers
+        self.on_reply = on_reply
+        self.ident = os.getpid() & 0xFFFF
+
+    def sweep(self, targets: Iterable[str]) -> Dict[str, float]:
+        """返回 {在线 IP: 平均 RTT(ms)}，按地址顺序；适合小规模目标列表"""
+        results = self.sweep_compact(TargetSet(targets, skip_network_broadcast=False))
+        return {int_to_ip(ip): ms for ip, ms in results.iter_alive()}
+
+    def sweep_compact(self, targets: TargetSet, results: Optional[SweepResults] = None) -> SweepResults:
+        """大规模扫描：结果按目标序号存入位图 / 数组；传入 results 时清空后复用"""
+        if results is None:
+            results = SweepResults(targets)
+        else:
+            results.reset()
+        sock, raw = open_icmp_socket()
+        if sock is None:
+            self._sweep_ping3(targets, results)
+            return results
+        try:
+            self._sweep_socket(sock, raw, targets, results)
+        finally:
+            sock.close()
+        return results
+
+    def _sweep_socket(self, sock, raw: bool, targets: TargetSet, results: SweepResults):
+        bucket = TokenBucket(self.pps)
+        sock.setblocking(False)
+        inflight: Dict[tuple, float] = {}        # (ip 整数, seq) → 发送时间
+        expiry: deque = deque()                  # (发送时间, key)，用于清理超时的探测
+        round_start = [0.0] * self.attempts
+
+        def receive(wait: float):
+            readable, _, _ = select.select([sock], [], [], max(0.0, wait))
+            while readable:
+                try:
+                    packet, (src, _) = sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                now = time.monotonic()
+                icmp = packet[(packet[0] & 0x0F) * 4:] if raw else packet
+                if len(icmp) < 8:
+                    continue
+                kind, _, _, ident, seq = struct.unpack("!BBHHH", icmp[:8])
+                if kind != ICMP_ECHO_REPLY or (raw and ident != self.ident):
+                    continue
+                ip = ip_to_int(src)
+                sent = inflight.pop((ip, seq), None)
+                if sent is None or now - sent > self.timeout:
+                    continue
+                index = targets.index_of(ip)
+                if index is None:
+                    continue
+                ms = (now - sent) * 1000
+                results.record(index, ms)
+                if self.on_reply:
+                    self.on_reply(src, seq + 1, ms)
+            while expiry and time.monotonic() - expiry[0][0] > self.timeout:
+                inflight.pop(expiry.popleft()[1], None)
+
+        for attempt in range(self.attempts):
+            # 同一地址两次探测之间至少间隔 interval
+            if attempt:
+                gap = round_start[attempt - 1] + self.interval - time.monotonic()
+                while gap > 0:
+                    receive(gap)
+                    gap = round_start[attempt - 1] + self.interval - time.monotonic()
+            round_start[attempt] = time.monotonic()
+            packet = build_echo(self.ident, attempt)
+            for ip in targets:
+                wait_for = bucket.wait_time()
+                while wait_for > 0:
+                    receive(wait_for)
+                    wait_for = bucket.wait_time()
+                bucket.consume()
+                try:
+                    sock.sendto(packet, (int_to_ip(ip), 0))
+                except OSError:
+                    continue  # 无路由等，当作不通
+                now = time.monotonic()
+                inflight[(ip, attempt)] = now
+                expiry.append((now, (ip, attempt)))
+                receive(0)
+
+        deadline = time.monotonic() + self.timeout
+        while inflight and time.monotonic() < deadline:
+            receive(deadline - time.monotonic())
+
+    def _sweep_ping3(self, targets: TargetSet, results: SweepResults):
+        from ping3 import ping  # 只有退回模式才需要 ping3
+        bucket = TokenBucket(self.pps)
+        lock = threading.Lock()
+
+        def probe(index: int, ip: str):
+            for attempt in range(1, self.attempts + 1):
+                bucket.acquire()
+                delay = ping(ip, timeout=self.timeout, unit='ms')
+                if delay:
+                    with lock:
+                        results.record(index, delay)
+                    if self.on_reply:
+                        self.on_reply(ip, attempt, delay)
+                if attempt < self.attempts:
+                    time.sleep(self.interval)
+
+        # 分批提交，未完成的任务最多 workers * 4 个，不为全部目标预先创建 Future
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            for index, ip in enumerate(targets):
+                if len(pending) >= self.workers * 4:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(pool.submit(probe, index, int_to_ip(ip)))
+            wait(pending)
@@ -0,0 +1,188 @@
+import json
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+"""
+巡检结果库（SQLite）：v3.0 巡检每台设备的 {命令: 清理后输出} 落库，不再打印完就丢
+- 一次运行一行 runs，每台设备每条命令一行 results（run_id, host, device_type, command, ts, output,
+  parsed = output_parsers 解析出的记录 JSON，没有模板的命令为空）
+- 索引：(command, ts)、(host, command, ts)、(device_type, command)、(run_id)，
+  “昨晚哪些设备跑的是版本 X” 是按命令 + 时间窗的一次索引查询，不用重跑也不用翻日志
+- 写入按 BATCH_SIZE 行攒批，一个事务 executemany 一次写入
+- 保留期：打开时删除 RETENTION_DAYS 天前的运行及其结果
+用法：python inspection_store.py inspections.db                                   列出最近的运行
+      python inspection_store.py inspections.db "show version,display version" 15.2 ["起始时间"] ["结束时间"]
+                                                     输出包含 15.2 的设备（每台取时间窗内最新一条）
+"""
+
+BATCH_SIZE = 500
+RETENTION_DAYS = 30
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id        INTEGER PRIMARY KEY,
+    started   TEXT NOT NULL,
+    finished  TEXT,
+    devices   INTEGER NOT NULL DEFAULT 0,
+    failed    INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    id           INTEGER PRIMARY KEY,
+    run_id       INTEGER NOT NULL,
+    host         TEXT NOT NULL,
+    device_type  TEXT NOT NULL,
+    command      TEXT NOT NULL,
+    ts           TEXT NOT NULL,
+    output       TEXT NOT NULL,
+    parsed       TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_command_ts ON results (command, ts);
+CREATE INDEX IF NOT EXISTS idx_results_host_command_ts ON results (host, command, ts);
+CREATE INDEX IF NOT EXISTS idx_results_type_command ON results (device_type, command);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started);
+"""
+
+
+def _now() -> str:
+    return datetime.now().strftime(TS_FORMAT)
+
+
+class InspectionStore:
+    def __init__(self, path: str = "inspections.db", retention_days: Optional[int] = RETENTION_DAYS):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(results)")}
+        if 'parsed' not in columns:   # 早期版本建的库没有 parsed 列
+            self.db.execute("ALTER TABLE results ADD COLUMN parsed TEXT")
+        self._pending: List[Tuple] = []
+        if retention_days:
+            self.prune(retention_days)
+
+    # ─── 写入 ────────────────────────────────────────────────
+    def begin_run(self) -> int:
+        with self.lock:
+            run_id = self.db.execute("INSERT INTO runs (started) VALUES (?)", (_now(),)).lastrowid
+            self.db.commit()
+        return run_id
+
+    def add(self, run_id: int, host: str, device_type: str, outputs: Dict[str, str], ts: Optional[str] = None,
+            parsed: Optional[Dict[str, List[Dict]]] = None):
+        """
+        记录一台设备的结果；outputs 为空视为失败，只计数不写行
+        parsed: output_parsers.parse_results 的结果，按命令存成 JSON
+        """
+        ts = ts or _now()
+        parsed = parsed or {}
+        with self.lock:
+            self.db.execute("UPDATE runs SET devices = devices + 1, failed = failed + ? WHERE id = ?",
+                            (0 if outputs else 1, run_id))
+            self._pending.extend((run_id, host, device_type, command, ts, output,
+                                  json.dumps(parsed[command], ensure_ascii=False) if command in parsed else None)
+                                 for command, output in outputs.items())
+            if len(self._pending) >= BATCH_SIZE:
+                self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self.db.executemany("INSERT INTO results (run_id, host, device_type, command, ts, output, parsed) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+        self.db.commit()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def finish_run(self, run_id: int):
+        with self.lock:
+            self._flush()
+            self.db.execute("UPDATE runs SET finished = ? WHERE id = ?", (_now(), run_id))
+            self.db.commit()
+
+    def prune(self, days: int) -> int:
+        """删除 days 天前开始的运行及其结果，返回删除的结果行数"""
+        cutoff = (datetime.now() - timedelta(days=days)).strftime(TS_FORMAT)
+        with self.lock:
+            old = [r[0] for r in self.db.execute("SELECT id FROM runs WHERE started < ?", (cutoff,))]
+            deleted = 0
+            for i in range(0, len(old), 500):
+                part = old[i:i + 500]
+                marks = ",".join("?" * len(part))
+                deleted += self.db.execute(f"DELETE FROM results WHERE run_id IN ({marks})", part).rowcount
+                self.db.execute(f"DELETE FROM runs WHERE id IN ({marks})", part)
+            self.db.commit()
+        return deleted
+
+    # ─── 查询 ────────────────────────────────────────────────
+    def find(self, commands: Sequence[str], contains: Optional[str] = None, since: Optional[str] = None,
+             until: Optional[str] = None, latest: bool = True) -> List[Dict]:
+        """
+        按命令（可多条，如思科 / 华为各一条）+ 时间窗查结果，contains 为输出里要包含的文本
+        latest=True 时每台设备只保留时间窗内最新的一条；有解析结果时 parsed 为记录列表
+        """
+        sql = ("SELECT host, device_type, command, ts, run_id, output, parsed FROM results "
+               f"WHERE command IN ({','.join('?' * len(commands))})")
+        params: List = list(commands)
+        if since:
+            sql += " AND ts >= ?"
+            params.append(since)
+        if until:
+            sql += " AND ts <= ?"
+            params.append(until)
+        if contains:
+            sql += " AND instr(output, ?) > 0"
+            params.append(contains)
+        sql += " ORDER BY ts, id"
+        with self.lock:
+            self._flush()
+            rows = self.db.execute(sql, params).fetchall()
+        keys = ('host', 'device_type', 'command', 'ts', 'run_id', 'output', 'parsed')
+        records = [dict(zip(keys, row)) for row in rows]
+        for r in records:
+            r['parsed'] = json.loads(r['parsed']) if r['parsed'] else None
+        if latest:
+            newest = {r['host']: r for r in records}   # 已按时间排序，后面的覆盖前面的
+            records = sorted(newest.values(), key=lambda r: r['host'])
+        return records
+
+    def history(self, host: str, command: str) -> List[Tuple[str, str]]:
+        with self.lock:
+            self._flush()
+            return self.db.execute("SELECT ts, output FROM results WHERE host = ? AND command = ? ORDER BY ts",
+                                   (host, command)).fetchall()
+
+    def runs(self, limit: int = 20) -> List[Tuple]:
+        with self.lock:
+            return self.db.execute("SELECT id, started, finished, devices, failed FROM runs "
+                                   "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("用法：python inspection_store.py <inspections.db> [命令1,命令2 输出包含的文本 [起始时间] [结束时间]]")
+        sys.exit(1)
+    store = InspectionStore(sys.argv[1], retention_days=None)
+    if len(sys.argv) < 4:
+        for run_id, started, finished, devices, failed in store.runs():
+            print(f"#{run_id}  {started} → {finished or '未完成'}  设备 {devices}，失败 {failed}")
+    else:
+        since = sys.argv[4] if len(sys.argv) > 4 else None
+        until = sys.argv[5] if len(sys.argv) > 5 else None
+        found = store.find(sys.argv[2].split(','), sys.argv[3], since, until)
+        for r in found:
+            print(f"{r['host']:15} {r['device_type']:8} {r['ts']}  {r['command']}")
+        print(f"共 {len(found)} 台")
+    store.close()
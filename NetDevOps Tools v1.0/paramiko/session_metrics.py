@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from atomic_file import atomic_write
+
+"""
+会话分阶段计时（DeviceSession 登录与执行的每一步用时 + 收到的字节数）
+- 阶段：connect（TCP 建连）、auth（SSH 握手 + 认证 / Telnet 用户名密码）、banner（等第一个提示符）、
+        privilege（enable / super）、paging（关闭分页）、command（每条命令，另按命令文本汇总）
+- 每个阶段一个固定分桶的直方图（线程安全，几万台设备也只占几 KB），按桶估算 p50 / p95 / p99
+- 按设备累计各阶段用时，报告里列出最慢的设备，方便找离群设备
+- 导出：JSON 报告（write_json）和 Prometheus 文本格式（write_prometheus，可交给 node_exporter textfile 收集）
+"""
+
+PHASES = ('connect', 'auth', 'banner', 'privilege', 'paging', 'command')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+SLOWEST_HOSTS = 20
+METRIC_PREFIX = "netdevops_session"
+
+
+class Histogram:
+    """固定分桶直方图；最后一个桶是 +Inf"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = array('Q', [0] * (len(buckets) + 1))
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """桶内线性插值估算分位数（与 Prometheus histogram_quantile 相同的做法）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict:
+        return {'count': self.count, 'sum': round(self.sum, 4),
+                'mean': round(self.sum / self.count, 4) if self.count else 0.0,
+                'p50': round(self.quantile(0.5), 4), 'p95': round(self.quantile(0.95), 4),
+                'p99': round(self.quantile(0.99), 4), 'max': round(self.max, 4)}
+
+
+class SessionMetrics:
+    """所有会话共用一个实例；DeviceSession 通过 measure() 上报"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self.errors = {phase: 0 for phase in PHASES}
+        self.commands: Dict[str, Dict] = {}
+        self.hosts: Dict[str, Dict[str, float]] = {}
+        self.bytes_received = 0
+        self.started = time.time()
+
+    def observe(self, host: str, phase: str, seconds: float, nbytes: int = 0,
+                command: Optional[str] = None, failed: bool = False):
+        with self.lock:
+            self.phases[phase].observe(seconds)
+            if failed:
+                self.errors[phase] += 1
+            self.bytes_received += nbytes
+            per_host = self.hosts.setdefault(host, {'total': 0.0, 'bytes': 0})
+            per_host[phase] = per_host.get(phase, 0.0) + seconds
+            per_host['total'] += seconds
+            per_host['bytes'] += nbytes
+            if command is not None:
+                stats = self.commands.setdefault(command, {'count': 0, 'sum': 0.0, 'max': 0.0, 'bytes': 0})
+                stats['count'] += 1
+                stats['sum'] += seconds
+                stats['bytes'] += nbytes
+                stats['max'] = max(stats['max'], seconds)
+
+    @contextmanager
+    def measure(self, host: str, phase: str, command: Optional[str] = None,
+                bytes_counter: Optional[Callable[[], int]] = None) -> Iterator[None]:
+        """计时一个阶段；bytes_counter 返回会话累计收到的字节数，前后相减即本阶段字节数"""
+        before = bytes_counter() if bytes_counter else 0
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            nbytes = (bytes_counter() - before) if bytes_counter else 0
+            self.observe(host, phase, time.perf_counter() - start, nbytes, command, failed)
+
+    # ─── 导出 ────────────────────────────────────────────────
+    def report(self, slowest: int = SLOWEST_HOSTS) -> Dict:
+        with self.lock:
+            phases = {p: dict(h.summary(), errors=self.errors[p]) for p, h in self.phases.items()}
+            commands = {c: {'count': s['count'], 'sum': round(s['sum'], 4), 'max': round(s['max'], 4),
+                            'mean': round(s['sum'] / s['count'], 4), 'bytes': s['bytes']}
+                        for c, s in self.commands.items()}
+            ranked = sorted(self.hosts.items(), key=lambda kv: kv[1]['total'], reverse=True)[:slowest]
+            hosts = [dict({k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()}, host=host)
+                     for host, stats in ranked]
+            total_bytes = self.bytes_received
+        busiest = max(phases, key=lambda p: phases[p]['sum'])
+        return {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'elapsed': round(time.time() - self.started, 3),
+            'sessions': phases['connect']['count'],
+            'bytes_received': total_bytes,
+            'dominant_phase': busiest if phases[busiest]['sum'] else None,
+            'phases': phases,
+            'commands': commands,
+            'slowest_hosts': hosts,
+        }
+
+    def prometheus(self) -> str:
+        lines = [f"# HELP {METRIC_PREFIX}_phase_seconds 会话各阶段用时",
+                 f"# TYPE {METRIC_PREFIX}_phase_seconds histogram"]
+        with self.lock:
+            for phase, h in self.phases.items():
+                cumulative = 0
+                for bound, n in zip(h.buckets + (float('inf'),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float('inf') else repr(bound)
+                    lines.append(f'{METRIC_PREFIX}_phase_seconds_bucket{{phase="{phase}",le="{le}"}} {cumulative}')
+                lines.append(f'{METRIC_PREFIX}_phase_seconds_sum{{phase="{phase}"}} {h.sum:.6f}')
+                lines.append(f'{METRIC_PREFIX}_phase_seconds_count{{phase="{phase}"}} {h.count}')
+            lines += [f"# HELP {METRIC_PREFIX}_phase_errors_total 阶段内抛出异常的次数",
+                      f"# TYPE {METRIC_PREFIX}_phase_errors_total counter"]
+            lines += [f'{METRIC_PREFIX}_phase_errors_total{{phase="{p}"}} {n}' for p, n in self.errors.items()]
+            lines += [f"# HELP {METRIC_PREFIX}_command_seconds 按命令汇总的执行用时",
+                      f"# TYPE {METRIC_PREFIX}_command_seconds summary"]
+            for command, s in self.commands.items():
+                label = command.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{METRIC_PREFIX}_command_seconds_sum{{command="{label}"}} {s["sum"]:.6f}')
+                lines.append(f'{METRIC_PREFIX}_command_seconds_count{{command="{label}"}} {s["count"]}')
+            lines += [f"# HELP {METRIC_PREFIX}_received_bytes_total 从设备收到的字节数",
+                      f"# TYPE {METRIC_PREFIX}_received_bytes_total counter",
+                      f"{METRIC_PREFIX}_received_bytes_total {self.bytes_received}"]
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        atomic_write(path, json.dumps(self.report(), ensure_ascii=False, indent=1))
+
+    def write_prometheus(self, path: str):
+        atomic_write(path, self.prometheus())
+
+
+def print_phase_table(report: Dict):
+    """控制台打印各阶段汇总 + 最慢的几台设备"""
+    print(f"\n{'阶段':<10}{'次数':>8}{'总计(s)':>10}{'平均':>8}{'p95':>8}{'最大':>8}{'失败':>6}")
+    for phase, s in report['phases'].items():
+        if s['count']:
+            print(f"{phase:<12}{s['count']:>8}{s['sum']:>10.1f}{s['mean']:>8.2f}{s['p95']:>8.2f}"
+                  f"{s['max']:>8.2f}{s['errors']:>6}")
+    if report['dominant_phase']:
+        print(f"用时最多的阶段：{report['dominant_phase']}")
+    for h in report['slowest_hosts'][:5]:
+        print(f"  慢设备 {h['host']:15} 共 {h['total']:.1f}s")
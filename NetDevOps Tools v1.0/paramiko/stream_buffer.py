@@ -0,0 +1,54 @@
+import codecs
+import re
+from typing import List, Optional, Pattern, Union
+
+"""
+增量接收缓冲区（所有执行器共用）
+- 收到的数据按块追加到列表，最后一次性 join，不做 output += chunk
+- 增量解码，多字节字符（中文 banner 等）被切在两个块之间也不会乱码
+- 只保留末尾一小段 tail 用来匹配提示符，每次匹配的代价与总输出大小无关
+  （原来每 80ms 对整个输出 re.search 一次，几 MB 的配置会退化成平方级）
+"""
+
+DEFAULT_TAIL = 256
+
+
+class StreamBuffer:
+    def __init__(self, tail_size: int = DEFAULT_TAIL, encoding: str = 'utf-8'):
+        self.tail_size = tail_size
+        self.chunks: List[str] = []
+        self.size = 0
+        self.tail = ""
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    def feed(self, data: Union[bytes, str]) -> str:
+        """追加一块数据，返回解码后的文本"""
+        text = self._decoder.decode(data) if isinstance(data, bytes) else data
+        if text:
+            self.chunks.append(text)
+            self.size += len(text)
+            if len(text) >= self.tail_size:
+                self.tail = text[-self.tail_size:]
+            else:
+                self.tail = (self.tail + text)[-self.tail_size:]
+        return text
+
+    def search_tail(self, pattern: Union[str, Pattern], flags: int = 0) -> Optional[re.Match]:
+        """只在末尾窗口中匹配（提示符总是出现在输出末尾）"""
+        if isinstance(pattern, str):
+            return re.search(pattern, self.tail, flags)
+        return pattern.search(self.tail)
+
+    def getvalue(self) -> str:
+        if len(self.chunks) > 1:
+            self.chunks = ["".join(self.chunks)]
+        return self.chunks[0] if self.chunks else ""
+
+    def clear(self):
+        self.chunks = []
+        self.size = 0
+        self.tail = ""
+        self._decoder.reset()
+
+    def __len__(self) -> int:
+        return self.size
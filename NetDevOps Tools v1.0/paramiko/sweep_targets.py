@@ -0,0 +1,154 @@
+import bisect
+import ipaddress
+import socket
+import struct
+from array import array
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+"""
+扫描目标与结果的紧凑表示（供 icmp_sweeper / aliveswitch 使用）
+- 目标：任意多个 CIDR / 地址段 / 单个地址，支持排除；内部是合并后的整数区间，按需逐个生成，不预先展开
+- 结果：按目标序号存储，在线用位图（每地址 1 bit），RTT 用 array('f') 累加 + array('B') 计次
+  100 万个地址约占 5MB，不需要上百万个 IP 字符串
+支持的写法：10.0.0.0/16、10.0.0.1-10.0.0.50、10.0.0.1-50、10.0.0.8
+"""
+
+
+def ip_to_int(ip: str) -> int:
+    return struct.unpack("!I", socket.inet_aton(ip))[0]
+
+
+def int_to_ip(value: int) -> str:
+    return socket.inet_ntoa(struct.pack("!I", value))
+
+
+def parse_spec(spec: str, skip_network_broadcast: bool = True) -> Tuple[int, int]:
+    """把一条目标写法解析为闭区间 (起始, 结束)"""
+    spec = spec.strip()
+    if '/' in spec:
+        net = ipaddress.IPv4Network(spec, strict=False)
+        start, end = int(net.network_address), int(net.broadcast_address)
+        if skip_network_broadcast and net.prefixlen <= 30:
+            start, end = start + 1, end - 1
+        return start, end
+    if '-' in spec:
+        left, right = spec.split('-', 1)
+        start = ip_to_int(left)
+        if '.' in right:
+            end = ip_to_int(right)
+        else:
+            # a.b.c.d-N 简写：N 只是最后一段，超过 255 时按位或会改写前面几段，得到另一个网段
+            last = int(right)
+            if not 0 <= last <= 255:
+                raise ValueError(f"地址段末位超出 0-255：{spec}")
+            end = (start & 0xFFFFFF00) | last
+        if end < start:
+            raise ValueError(f"地址段起止颠倒：{spec}")
+        return start, end
+    value = ip_to_int(spec)
+    return value, value
+
+
+def _merge(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class TargetSet:
+    """多个区间减去排除区间后的目标集合；序号按地址从小到大"""
+
+    def __init__(self, specs: Iterable[str], exclude: Iterable[str] = (),
+                 skip_network_broadcast: bool = True):
+        ranges = _merge([parse_spec(s, skip_network_broadcast) for s in specs if s.strip()])
+        excluded = _merge([parse_spec(s, False) for s in exclude if s.strip()])
+        self.ranges = self._subtract(ranges, excluded)
+        # offsets[i] = 第 i 个区间之前的地址总数，用于 地址 ↔ 序号 的二分查找
+        self.offsets = array('Q', [0])
+        for start, end in self.ranges:
+            self.offsets.append(self.offsets[-1] + end - start + 1)
+        self.starts = array('I', (start for start, _ in self.ranges))
+
+    @staticmethod
+    def _subtract(ranges, excluded):
+        result = []
+        for start, end in ranges:
+            for ex_start, ex_end in excluded:
+                if ex_end < start or ex_start > end:
+                    continue
+                if ex_start > start:
+                    result.append((start, ex_start - 1))
+                start = ex_end + 1
+                if start > end:
+                    break
+            if start <= end:
+                result.append((start, end))
+        return result
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self.ranges:
+            yield from range(start, end + 1)
+
+    def index_of(self, value: int) -> Optional[int]:
+        """地址（整数）→ 序号；不在集合内返回 None"""
+        i = bisect.bisect_right(self.starts, value) - 1
+        if i < 0 or value > self.ranges[i][1]:
+            return None
+        return self.offsets[i] + value - self.ranges[i][0]
+
+    def at(self, index: int) -> int:
+        """序号 → 地址（整数）"""
+        i = bisect.bisect_right(self.offsets, index) - 1
+        return self.ranges[i][0] + index - self.offsets[i]
+
+
+class SweepResults:
+    """按序号存储的扫描结果：在线位图 + RTT 累加数组"""
+
+    def __init__(self, targets: TargetSet):
+        self.targets = targets
+        n = len(targets)
+        self.alive = bytearray((n + 7) // 8)
+        self.rtt_sum = array('f', [0.0]) * n
+        self.hits = array('B', [0]) * n
+
+    def reset(self):
+        """清空结果以便下一轮复用（监控模式每轮不重新分配）"""
+        n = len(self.targets)
+        self.alive[:] = bytes(len(self.alive))
+        self.rtt_sum[:] = array('f', [0.0]) * n
+        self.hits[:] = array('B', [0]) * n
+
+    def rtt(self, index: int) -> float:
+        """平均 RTT；不在线返回 NaN"""
+        hits = self.hits[index]
+        return self.rtt_sum[index] / hits if hits else float('nan')
+
+    def record(self, index: int, rtt_ms: float):
+        self.alive[index >> 3] |= 1 << (index & 7)
+        if self.hits[index] < 255:
+            self.rtt_sum[index] += rtt_ms
+            self.hits[index] += 1
+
+    def is_alive(self, index: int) -> bool:
+        return bool(self.alive[index >> 3] & (1 << (index & 7)))
+
+    def count_alive(self) -> int:
+        return sum(bin(b).count('1') for b in self.alive)
+
+    def iter_alive(self) -> Iterator[Tuple[int, float]]:
+        """按地址顺序产出 (地址整数, 平均 RTT ms)"""
+        for byte_idx, byte in enumerate(self.alive):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (1 << bit):
+                    index = (byte_idx << 3) | bit
+                    yield self.targets.at(index), self.rtt_sum[index] / self.hits[index]
@@ -0,0 +1,62 @@
+from typing import Callable, Optional
+
+"""
+Telnet 协商字节（IAC 序列）的去除，discovery 的横幅探测和本地 Telnet 模拟设备共用
+- 按流处理：被分包截断的 IAC / 选项协商 / 子协商序列先留在 pending 里，和下一块数据拼起来再解析，
+  不会把半个序列当成正文，也不会漏掉跨包的 DO / WILL
+- IAC IAC 还原为一个 0xFF 数据字节；DO / DONT / WILL / WONT 交给 on_option 回调（如一律拒绝），其余命令直接丢弃
+"""
+
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+
+
+class TelnetStripper:
+    """feed(数据块) 返回去掉协商字节后的正文；on_option(命令, 选项) 在每个完整的选项协商上调用"""
+
+    def __init__(self, on_option: Optional[Callable[[int, int], None]] = None):
+        self.on_option = on_option
+        self.pending = b""   # 被分包截断的协商序列
+
+    def feed(self, data: bytes) -> bytes:
+        data, self.pending = self.pending + data, b""
+        out = bytearray()
+        i = 0
+        while i < len(data):
+            b = data[i]
+            if b != IAC:
+                out.append(b)
+                i += 1
+                continue
+            if i + 1 >= len(data):
+                self.pending = data[i:]
+                break
+            cmd = data[i + 1]
+            if cmd == IAC:
+                out.append(IAC)
+                i += 2
+            elif cmd in (DO, DONT, WILL, WONT):
+                if i + 2 >= len(data):
+                    self.pending = data[i:]
+                    break
+                if self.on_option:
+                    self.on_option(cmd, data[i + 2])
+                i += 3
+            elif cmd == SB:
+                end = data.find(bytes([IAC, SE]), i)
+                if end < 0:
+                    self.pending = data[i:]
+                    break
+                i = end + 2
+            else:
+                i += 2
+        return bytes(out)
+
+
+def refuse_options(send: Callable[[bytes], None]) -> Callable[[int, int], None]:
+    """on_option 回调：对 DO 回 WONT、对 WILL 回 DONT（什么选项都不启用）"""
+    def on_option(cmd: int, option: int):
+        if cmd == DO:
+            send(bytes([IAC, WONT, option]))
+        elif cmd == WILL:
+            send(bytes([IAC, DONT, option]))
+    return on_option
@@ -0,0 +1,128 @@
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+from atomic_file import atomic_write
+
+"""
+批量任务的 span 追踪（一次运行从头到尾：哪些设备并行、worker 在哪里空等、哪条命令卡住）
+- 层级：run（run_fleet 一次调用）→ host（一台设备）→ phase（connect / auth / banner / privilege / paging / save / backup）
+        → command（send_command / send_and_wait / iter_lines 的每条命令）
+- 时间戳取 time.perf_counter()（单调时钟），相对 Tracer 创建时刻；父 span 按线程自动确定，跨线程时显式传 parent
+- 导出：JSONL（每行一个 span）和 Chrome trace（chrome://tracing、Perfetto 直接打开，每个 worker 线程一条泳道）
+"""
+
+TRACE_PROCESS_ID = 1
+
+
+class Tracer:
+    """所有线程共用一个实例；span 结束时才写入列表"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+        self.threads: Dict[int, str] = {}
+        self.origin = time.perf_counter()
+        self.started = time.time()
+        self.local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _stack(self) -> List[int]:
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def current(self) -> Optional[int]:
+        """当前线程最内层 span 的 id"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name: str, cat: str, parent: Optional[int] = None, **args) -> Iterator[Dict[str, Any]]:
+        """
+        记录一个 span；yield 出 span 记录，调用方可往 span['args'] 里补充结果
+        parent 不传时取当前线程最内层的 span；抛异常时记下 error 后继续上抛
+        """
+        stack = self._stack()
+        record = {'id': next(self._ids), 'parent': parent if parent is not None else self.current(),
+                  'name': name, 'cat': cat, 'thread': threading.get_ident(), 'args': args}
+        stack.append(record['id'])
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['args']['error'] = str(e) or type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            # 生成器里的 span 可能晚于内层 span 被关闭，按 id 移除而不是直接 pop
+            if stack and stack[-1] == record['id']:
+                stack.pop()
+            elif record['id'] in stack:
+                stack.remove(record['id'])
+            self._finish(record, start, end)
+
+    def record(self, name: str, cat: str, start: float, end: float,
+               parent: Optional[int] = None, **args) -> Dict[str, Any]:
+        """补记一个已经结束的 span（start / end 为 perf_counter 取值）"""
+        record = {'id': next(self._ids), 'parent': parent if parent is not None else self.current(),
+                  'name': name, 'cat': cat, 'thread': threading.get_ident(), 'args': args}
+        self._finish(record, start, end)
+        return record
+
+    def event(self, name: str, cat: str, **args):
+        """瞬时事件（如等待提示符超时），duration 为 0"""
+        now = time.perf_counter()
+        self.record(name, cat, now, now, **args)['instant'] = True
+
+    def _finish(self, record: Dict[str, Any], start: float, end: float):
+        record['start'] = round(start - self.origin, 6)
+        record['duration'] = round(end - start, 6)
+        with self.lock:
+            if record['thread'] not in self.threads:
+                self.threads[record['thread']] = threading.current_thread().name
+            self.spans.append(record)
+
+    # ─── 导出 ────────────────────────────────────────────────
+    def write_jsonl(self, path: str):
+        with self.lock:
+            spans = sorted(self.spans, key=lambda s: s['start'])
+        atomic_write(path, "".join(json.dumps(s, ensure_ascii=False, default=str) + "\n" for s in spans))
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Chrome trace event 格式：完整 span 用 'X'，瞬时事件用 'i'，线程名用 'M'"""
+        with self.lock:
+            spans = list(self.spans)
+            threads = dict(self.threads)
+        first_seen: Dict[int, float] = {}
+        for s in spans:
+            first_seen[s['thread']] = min(s['start'], first_seen.get(s['thread'], s['start']))
+        # 泳道按线程第一次出现的先后编号，主线程通常排第一
+        lanes = {ident: n for n, ident in enumerate(sorted(first_seen, key=first_seen.get), 1)}
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': TRACE_PROCESS_ID, 'tid': lanes[ident],
+                   'args': {'name': threads[ident]}} for ident in lanes]
+        for s in spans:
+            event = {'name': s['name'], 'cat': s['cat'], 'pid': TRACE_PROCESS_ID, 'tid': lanes[s['thread']],
+                     'ts': round(s['start'] * 1e6, 1),
+                     'args': dict(s['args'], id=s['id'], parent=s['parent'])}
+            if s.get('instant'):
+                event.update(ph='i', s='t')
+            else:
+                event.update(ph='X', dur=round(s['duration'] * 1e6, 1))
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started))}}
+
+    def write_chrome(self, path: str):
+        atomic_write(path, json.dumps(self.chrome_trace(), ensure_ascii=False, default=str))
+
+
+def maybe_span(tracer: Optional[Tracer], name: str, cat: str, **args):
+    """tracer 为 None 时什么也不记录（yield 出一个空记录，调用方不用判断）"""
+    if tracer is None:
+        return nullcontext({'id': None, 'args': {}})
+    return tracer.span(name, cat, **args)
+